@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+압축 출력 형식 (FLAC / Ogg-Opus) 과 스레드 풀 병렬 인코딩
+
+합성(음성 변형)은 호출한 스레드에서 줄 순서대로 진행하고, 인코딩과 파일 쓰기는
+스레드 풀에서 겹쳐 실행한다. 여러 프로세스로 나눠 렌더링할 때는 각 프로세스가 자기 줄을 인코딩한다.
+줄마다 쓴 바이트와 인코딩 시간을 기록한다.
+"""
+
+import argparse
+import functools
+import math
+import os
+import shutil
+import tempfile
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import soundfile as sf
+
+# 형식별 (libsndfile 형식, 확장자, 비트 깊이 -> subtype). Opus 는 손실 압축이라 비트 깊이 없음
+OUTPUT_FORMATS = {
+    "wav": ("WAV", ".wav", {16: "PCM_16", 24: "PCM_24", 32: "FLOAT"}),
+    "flac": ("FLAC", ".flac", {16: "PCM_16", 24: "PCM_24"}),
+    "opus": ("OGG", ".opus", None),
+}
+
+BIT_DEPTHS = sorted({depth for _, _, subtypes in OUTPUT_FORMATS.values() for depth in subtypes or ()})
+
+# Opus 가 지원하는 샘플레이트
+OPUS_SAMPLE_RATES = (8000, 12000, 16000, 24000, 48000)
+
+
+def with_extension(path, fmt):
+    """출력 형식에 맞는 확장자로 바꾼 경로"""
+    return os.path.splitext(path)[0] + OUTPUT_FORMATS[fmt][1]
+
+
+def resolve_subtype(fmt, bit_depth=16):
+    """형식 + 비트 깊이 -> libsndfile subtype (지원하지 않으면 ValueError)"""
+    if fmt not in OUTPUT_FORMATS:
+        raise ValueError(f"지원하지 않는 출력 형식: {fmt} ({', '.join(OUTPUT_FORMATS)})")
+    subtypes = OUTPUT_FORMATS[fmt][2]
+    if subtypes is None:
+        return "OPUS"
+    if bit_depth not in subtypes:
+        raise ValueError(f"{fmt} 는 {bit_depth}비트를 지원하지 않습니다 ({', '.join(map(str, subtypes))})")
+    return subtypes[bit_depth]
+
+
+def _resample_for_opus(audio, sr):
+    """Opus 가 받는 가장 가까운 상위 샘플레이트로 리샘플링"""
+    target = next((rate for rate in OPUS_SAMPLE_RATES if rate >= sr), OPUS_SAMPLE_RATES[-1])
+    if target == sr:
+        return audio, sr
+    from scipy.signal import resample_poly
+
+    g = math.gcd(sr, target)
+    return resample_poly(audio, target // g, sr // g).astype(np.float32), target
+
+
+def encode_audio(audio, sr, path, fmt="flac", bit_depth=16):
+    """한 줄 인코딩 후 저장. 반환: {path, bytes, seconds, pcm16_bytes}"""
+    start = time.perf_counter()
+    audio = np.asarray(audio, dtype=np.float32)
+    frames = len(audio)
+    subtype = resolve_subtype(fmt, bit_depth)
+    if fmt == "opus":
+        audio, sr = _resample_for_opus(audio, sr)
+    sf.write(path, audio, sr, subtype=subtype, format=OUTPUT_FORMATS[fmt][0])
+    return {
+        "path": path,
+        "bytes": os.path.getsize(path),
+        "seconds": time.perf_counter() - start,
+        # 같은 줄을 16비트 WAV 로 썼을 때의 크기 (절감량 비교용)
+        "pcm16_bytes": 44 + 2 * frames,
+    }
+
+
+class ParallelEncoder:
+    """인코딩을 스레드 풀에서 실행하고 결과는 제출 순서대로 돌려주는 인코더"""
+
+    def __init__(self, fmt="flac", bit_depth=16, threads=2, max_pending=None):
+        resolve_subtype(fmt, bit_depth)
+        self.fmt = fmt
+        self.bit_depth = bit_depth
+        self.pool = ThreadPoolExecutor(max_workers=threads)
+        # 대기 중인 인코딩 수 상한 -> 합성이 인코딩보다 빨라도 메모리가 쌓이지 않음
+        self.max_pending = max_pending or 2 * threads
+
+    def _encode(self, audio, sr, path):
+        return encode_audio(audio, sr, path, self.fmt, self.bit_depth)
+
+    def map(self, produce, items):
+        """produce(item) -> (오디오, 샘플레이트, 경로) 를 호출 스레드에서 순서대로 실행하며 인코딩을 겹침
+
+        반환: (item, 결과, 오류) 를 items 순서대로 생성
+        """
+        pending = deque()
+
+        def drain():
+            item, future = pending.popleft()
+            if isinstance(future, Exception):
+                return item, None, future
+            try:
+                return item, future.result(), None
+            except Exception as e:
+                return item, None, e
+
+        for item in items:
+            try:
+                audio, sr, path = produce(item)
+                pending.append((item, self.pool.submit(self._encode, audio, sr, with_extension(path, self.fmt))))
+            except Exception as e:
+                pending.append((item, e))
+            while len(pending) >= self.max_pending:
+                yield drain()
+        while pending:
+            yield drain()
+
+    def close(self):
+        self.pool.shutdown(wait=True)
+
+
+def encode_lines(render, produce, audio_ref, sr, tasks, fmt, bit_depth=16, workers=1):
+    """압축 형식으로 줄마다 (인자, 인코딩 결과, 오류) 를 스크립트 순서로 생성
+
+    workers > 1 이면 sharded_render 로 프로세스마다 음성 변형과 인코딩을 함께 한다
+    (render(audio_ref, sr, *인자, fmt=, bit_depth=) 가 인코딩 결과를 반환).
+    한 프로세스면 produce(인자) -> (오디오, 샘플레이트, 경로) 를 순서대로 실행하고 인코딩은 스레드 풀에서 겹친다.
+    """
+    if workers > 1:
+        from sharded_render import render_lines
+
+        render = functools.partial(render, fmt=fmt, bit_depth=bit_depth)
+        for _, args, encoded, error in render_lines(render, audio_ref, sr, tasks, workers):
+            yield args, encoded, error
+        return
+
+    encoder = ParallelEncoder(fmt, bit_depth)
+    try:
+        yield from encoder.map(produce, tasks)
+    finally:
+        encoder.close()
+
+
+def format_result(result):
+    """줄 하나의 인코딩 결과 문자열"""
+    ratio = result["bytes"] / result["pcm16_bytes"]
+    return f"{result['bytes']:,} bytes ({ratio:.0%} of WAV), 인코딩 {result['seconds'] * 1000:.1f}ms"
+
+
+def summarize(results):
+    """전체 바이트 / 인코딩 시간 요약"""
+    written = sum(r["bytes"] for r in results)
+    pcm16 = sum(r["pcm16_bytes"] for r in results)
+    return {
+        "lines": len(results),
+        "bytes": written,
+        "pcm16_bytes": pcm16,
+        "ratio": written / pcm16 if pcm16 else 0.0,
+        "encode_seconds": sum(r["seconds"] for r in results),
+    }
+
+
+def print_summary(summary, fmt, bit_depth):
+    label = fmt if fmt == "opus" else f"{fmt} {bit_depth}bit"
+    print(f"💾 {label}: {summary['lines']}줄, {summary['bytes']:,} bytes "
+          f"(16bit WAV {summary['pcm16_bytes']:,} bytes 의 {summary['ratio']:.0%}), "
+          f"인코딩 합계 {summary['encode_seconds']:.2f}초")
+
+
+def output_extension(fmt=None):
+    """출력 파일 확장자 (형식이 없으면 기존 WAV)"""
+    return OUTPUT_FORMATS[fmt][1] if fmt else ".wav"
+
+
+def print_output_files(output_dir, fmt=None, limit=None):
+    """출력 폴더의 생성 파일 목록 출력 (limit 이 있으면 그 개수까지만)"""
+    if not os.path.exists(output_dir):
+        return
+    ext = output_extension(fmt)
+    files = sorted([f for f in os.listdir(output_dir) if f.endswith(ext)])
+    print(f"\n📋 생성된 파일 목록 ({len(files)}개):")
+    for file in files[:limit]:
+        size = os.path.getsize(os.path.join(output_dir, file))
+        print(f"   - {file} ({size:,} bytes)")
+    if limit is not None and len(files) > limit:
+        print(f"   ... 외 {len(files) - limit}개 파일")
+
+
+def add_format_arguments(parser):
+    """--format / --bit-depth 인자 추가"""
+    parser.add_argument("--format", choices=sorted(OUTPUT_FORMATS), help="출력 형식 (기본: 기존 WAV 저장)")
+    parser.add_argument("--bit-depth", type=int, default=16, choices=BIT_DEPTHS,
+                        help="PCM 비트 깊이 (wav: 16/24/32, flac: 16/24, opus 는 무시)")
+
+
+def check_format_arguments(parser, args):
+    """형식과 비트 깊이 조합을 실행 전에 확인 (지원하지 않으면 parser.error)"""
+    if args.format:
+        try:
+            resolve_subtype(args.format, args.bit_depth)
+        except ValueError as e:
+            parser.error(str(e))
+
+
+def benchmark(threads=2, seconds=2.0, sr=32000):
+    """dialogue_tts 대화를 형식별로 렌더링해 크기 / 시간 비교"""
+    import dialogue_tts
+
+    # 사인파 화음 + 약한 잡음 (순수 잡음은 무손실 압축이 되지 않아 비교에 부적합)
+    t = np.arange(int(sr * seconds)) / sr
+    rng = np.random.default_rng(0)
+    audio_ref = (0.2 * np.sin(2 * np.pi * 220 * t) + 0.1 * np.sin(2 * np.pi * 331 * t)
+                 + 0.01 * rng.standard_normal(len(t)))
+
+    results = {}
+    for fmt, bit_depth in (("wav", 16), ("flac", 16), ("flac", 24), ("opus", 16)):
+        output_dir = tempfile.mkdtemp(prefix="audio_encoding_")
+        encoder = ParallelEncoder(fmt, bit_depth, threads)
+
+        def produce(line):
+            i, (character, text, emotion) = line
+            audio = dialogue_tts.transform_line(audio_ref, character, emotion)
+            return audio, sr, os.path.join(output_dir, dialogue_tts.line_filename(i, character, emotion))
+
+        start = time.perf_counter()
+        done = [result for _, result, error in encoder.map(produce, enumerate(dialogue_tts.DIALOGUE, 1))
+                if error is None]
+        elapsed = time.perf_counter() - start
+        encoder.close()
+        shutil.rmtree(output_dir, ignore_errors=True)
+        results[(fmt, bit_depth)] = dict(summarize(done), wall_seconds=elapsed)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="출력 형식별 크기 / 인코딩 시간 비교")
+    parser.add_argument("--threads", type=int, default=2)
+    args = parser.parse_args()
+
+    print("🗜️ 출력 형식 비교 🗜️\n")
+    for (fmt, bit_depth), summary in benchmark(args.threads).items():
+        print_summary(summary, fmt, bit_depth)
+        print(f"   ⏱️ 렌더링 + 인코딩 전체 {summary['wall_seconds']:.2f}초")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+batch_size / batch_threshold / split_bucket / 워커 수 자동 튜너
+"""
+
+import argparse
+import itertools
+import os
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+import yaml
+
+from cpu_worker_pool import CONFIG_PATH, available_cpus, measure_partitioning
+
+# GPT_SoVITS 경로 추가
+sys.path.append('GPT_SoVITS')
+
+SEARCH_SPACE = {
+    "batch_size": [1, 2, 4, 8],
+    "batch_threshold": [0.5, 0.75, 1.0],
+    "split_bucket": [True, False],
+}
+
+# 스텁 비용 모델 (초): 호출 고정비 + 배치 내 최장 줄 길이에 비례하는 디코딩 비용
+STUB_CALL_OVERHEAD = 0.25
+STUB_SECONDS_PER_CHAR = 0.012
+STUB_BATCH_PENALTY = 0.15
+STUB_PARALLEL_FRACTION = 0.7
+
+
+def node_profile_name(cpus=None):
+    """하드웨어 크기별 튜닝 결과 키 (예: cpu_8)"""
+    return f"cpu_{len(cpus or available_cpus())}"
+
+
+def load_sample_lines():
+    """튜닝에 사용할 대표 스크립트 (test_tdm_llj_script 의 다국어 대화, 줄마다 speaker / text / lang)"""
+    from test_tdm_llj_script import SCRIPT_LINES
+    return [dict(line) for line in SCRIPT_LINES]
+
+
+def emulate_batches(lengths, batch_size, batch_threshold, split_bucket):
+    """TTS.to_batch 처럼 줄 길이 목록을 배치로 묶기"""
+    if not split_bucket:
+        return [lengths[i:i + batch_size] for i in range(0, len(lengths), batch_size)]
+
+    batches, current = [], []
+    for length in sorted(lengths):
+        # 정렬되어 있으므로 첫 줄 / 현재 줄 비율이 패딩 효율
+        if current and (len(current) >= batch_size or current[0] / length < batch_threshold):
+            batches.append(current)
+            current = []
+        current.append(length)
+    if current:
+        batches.append(current)
+    return batches
+
+
+def _stub_speed(threads):
+    """Amdahl 법칙으로 근사한 스레드 수별 상대 속도"""
+    return 1.0 / ((1 - STUB_PARALLEL_FRACTION) + STUB_PARALLEL_FRACTION / threads)
+
+
+def stub_worker_scaling(cpus, worker_counts):
+    """스텁 모드의 워커 수별 집계 처리량 배율"""
+    base = _stub_speed(len(cpus))
+    return {w: w * _stub_speed(len(cpus) // w) / base for w in worker_counts if w <= len(cpus)}
+
+
+def evaluate_stub(lengths, params):
+    """스텁 비용 모델로 단일 워커 처리량과 줄별 지연 계산"""
+    durations, latencies = [], []
+    for batch in emulate_batches(lengths, params["batch_size"], params["batch_threshold"], params["split_bucket"]):
+        duration = STUB_CALL_OVERHEAD + STUB_SECONDS_PER_CHAR * max(batch) * (1 + STUB_BATCH_PENALTY * (len(batch) - 1))
+        durations.append(duration)
+        latencies.extend([duration] * len(batch))
+    return len(lengths) / sum(durations), latencies
+
+
+def evaluate_pipeline(tts, sample_lines, params):
+    """실제 TTS 파이프라인으로 단일 워커 처리량과 줄별 지연 측정"""
+    from dialogue_batch_planner import make_tts_batch_fn, plan_batches
+
+    synthesize_batch = make_tts_batch_fn(tts, {
+        "batch_threshold": params["batch_threshold"],
+        "split_bucket": params["split_bucket"],
+    })
+    # 줄마다 원래 언어로 정규화해야 영어 / 일본어 줄이 한국어로 튜닝되지 않음
+    lines = [{"speaker": "tuner", "text": line["text"], "lang": line["lang"]} for line in sample_lines]
+    latencies = []
+    start = time.perf_counter()
+    for batch in plan_batches(lines, batch_size=params["batch_size"]):
+        batch_start = time.perf_counter()
+        synthesize_batch(batch)
+        latencies.extend([time.perf_counter() - batch_start] * len(batch))
+    return len(lines) / (time.perf_counter() - start), latencies
+
+
+def search(evaluate, worker_scaling, max_p95_latency):
+    """지연 상한을 지키는 조합 중 처리량이 가장 높은 설정 탐색"""
+    results = []
+    keys = list(SEARCH_SPACE)
+    for values in itertools.product(*(SEARCH_SPACE[k] for k in keys)):
+        params = dict(zip(keys, values))
+        # 배치 구성이 split_bucket=False 에서는 threshold 와 무관하므로 한 번만 평가
+        if not params["split_bucket"] and params["batch_threshold"] != SEARCH_SPACE["batch_threshold"][0]:
+            continue
+        throughput, latencies = evaluate(params)
+        p95 = float(np.percentile(latencies, 95))
+
+        for workers, scale in worker_scaling.items():
+            # 워커가 많을수록 워커당 스레드가 줄어 한 줄의 지연이 늘어남
+            worker_p95 = p95 * workers / scale
+            results.append(dict(params, workers=workers,
+                                throughput=throughput * scale,
+                                p95_latency=worker_p95,
+                                feasible=worker_p95 <= max_p95_latency))
+
+    feasible = [r for r in results if r["feasible"]]
+    best = max(feasible or results, key=lambda r: r["throughput"])
+    return best, results
+
+
+def write_tuned_profile(best, config_path=CONFIG_PATH, profile_name=None):
+    """tts_infer.yaml 의 tuned 섹션에 이 노드의 최적 설정 기록"""
+    with open(config_path, "r", encoding="utf-8") as f:
+        configs = yaml.safe_load(f) or {}
+
+    tuned = configs.setdefault("tuned", {})
+    tuned[profile_name or node_profile_name()] = {
+        "batch_size": int(best["batch_size"]),
+        "batch_threshold": float(best["batch_threshold"]),
+        "p95_latency": round(float(best["p95_latency"]), 3),
+        "split_bucket": bool(best["split_bucket"]),
+        "throughput": round(float(best["throughput"]), 3),
+        "tuned_at": datetime.now().isoformat(timespec="seconds"),
+        "workers": int(best["workers"]),
+    }
+
+    # 기존 키 순서를 유지하고 임시 파일로 교체
+    tmp_path = config_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        yaml.safe_dump(configs, f, sort_keys=False, allow_unicode=True)
+    os.replace(tmp_path, config_path)
+
+
+def load_tuned_profile(config_path=CONFIG_PATH, profile_name=None):
+    """이 노드에 맞는 튜닝 결과 읽기 (없으면 None)"""
+    with open(config_path, "r", encoding="utf-8") as f:
+        configs = yaml.safe_load(f) or {}
+    return (configs.get("tuned") or {}).get(profile_name or node_profile_name())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="TTS 배치 / 워커 설정 자동 튜닝")
+    parser.add_argument("--config", default=CONFIG_PATH)
+    parser.add_argument("--mode", choices=["stub", "pipeline"], default="stub")
+    parser.add_argument("--max-p95-latency", type=float, default=2.0, help="줄당 p95 지연 상한 (초)")
+    parser.add_argument("--workers", type=int, nargs="*", default=[1, 2, 4, 8])
+    parser.add_argument("--dry-run", action="store_true", help="yaml 에 기록하지 않음")
+    parser.add_argument("--save-stub", action="store_true",
+                        help="스텁 비용 모델 결과도 yaml 에 기록 (기본: pipeline 모드 결과만 기록)")
+    args = parser.parse_args()
+
+    print("🎛️ TTS 자동 튜닝 🎛️\n")
+
+    sample_lines = load_sample_lines()
+    cpus = available_cpus()
+    print(f"💻 노드: {node_profile_name(cpus)} / 샘플 {len(sample_lines)}줄 / 모드: {args.mode}")
+
+    if args.mode == "stub":
+        lengths = [len(line["text"]) for line in sample_lines]
+
+        def evaluate(params):
+            return evaluate_stub(lengths, params)
+
+        scaling = stub_worker_scaling(cpus, args.workers)
+    else:
+        from TTS_infer_pack.TTS import TTS, TTS_Config
+
+        from cpu_quantization import apply_configured_quantization
+
+        tts = TTS(TTS_Config(args.config))
+        apply_configured_quantization(tts, args.config)
+
+        def evaluate(params):
+            return evaluate_pipeline(tts, sample_lines, params)
+
+        # 워커 수별 배율은 실제 파이프라인 워커로 측정
+        measured = {}
+        for workers in args.workers:
+            try:
+                result = measure_partitioning(cpus, workers, workload="tts", jobs_per_worker=2,
+                                              config_path=args.config)
+            except (RuntimeError, TimeoutError) as e:
+                print(f"❌ 워커 {workers}개 측정 실패: {e}")
+                continue
+            if result:
+                measured[workers] = result["throughput"]
+        scaling = {w: t / measured[1] for w, t in measured.items()} if 1 in measured else {1: 1.0}
+
+    print(f"🧵 워커 배율: " + ", ".join(f"{w}={s:.2f}x" for w, s in scaling.items()))
+
+    best, results = search(evaluate, scaling, args.max_p95_latency)
+    print(f"🔍 평가한 조합: {len(results)}개 (지연 상한 만족 {sum(r['feasible'] for r in results)}개)\n")
+
+    for r in sorted(results, key=lambda r: -r["throughput"])[:5]:
+        mark = "✅" if r["feasible"] else "⛔"
+        print(f"{mark} batch_size={r['batch_size']} threshold={r['batch_threshold']} "
+              f"split_bucket={r['split_bucket']} workers={r['workers']}: "
+              f"{r['throughput']:.2f} 줄/s, p95 {r['p95_latency']:.2f}초")
+
+    if not best["feasible"]:
+        print(f"\n⚠️ 지연 상한 {args.max_p95_latency}초를 만족하는 조합이 없어 처리량 기준으로 선택")
+
+    print(f"\n🏆 선택: batch_size={best['batch_size']} threshold={best['batch_threshold']} "
+          f"split_bucket={best['split_bucket']} workers={best['workers']}")
+
+    if args.mode == "stub" and not args.save_stub:
+        # 스텁 수치는 실제 모델 성능이 아니므로 운영 설정을 덮어쓰지 않음
+        print("📝 스텁 모드 결과는 기록하지 않음 (--mode pipeline 으로 측정하거나 --save-stub 지정)")
+    elif not args.dry_run:
+        write_tuned_profile(best, args.config)
+        print(f"💾 {args.config} [tuned.{node_profile_name(cpus)}] 에 저장")
+
+
+if __name__ == "__main__":
+    main()
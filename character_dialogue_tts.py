@@ -1,71 +1,156 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+import argparse
+import functools
 import os
 import sys
 import soundfile as sf
 import numpy as np
 from pathlib import Path
 
-def create_character_tts():
+from audio_encoding import (add_format_arguments, check_format_arguments, encode_audio, encode_lines,
+                            format_result, output_extension, print_output_files, print_summary, summarize,
+                            with_extension)
+from script_loader import load_records
+from sharded_render import render_lines
+
+# 프로세스마다 한 번만 계산한 위상 보코더 음성 (참조 음성이 바뀌면 다시 계산)
+_VOCODER_CACHE = {}
+
+# 캐릭터별 감정 설정
+CHARACTERS = {
+    "현정": {
+        "emotion": "confident",  # 자신감 있고 우아한
+        "ref_audio": "TDM_LLJ/PTD/J.LJJ15m.wav",  # 기쁨 (자신감있는 톤)
+        "description": "자신감 있고 우아한 톤"
+    },
+    "김환석": {
+        "emotion": "surprised", 
+        "ref_audio": "TDM_LLJ/PTD/J.LJJ15m.wav",  # 기쁨 (놀라는 톤으로 변형)
+        "description": "놀라고 당황하는 톤"
+    },
+    "송치호": {
+        "emotion": "polite",
+        "ref_audio": "TDM_LLJ/PTD/J.LJJ15m.wav",  # 기쁨 (정중한 톤으로 변형)
+        "description": "정중하고 공손한 톤"
+    }
+}
+
+# 대화 스크립트
+DIALOGUE = [
+    ("현정", "회전초밥 먹으러 갈래요?"),
+    ("김환석", "좋죠."),
+    ("현정", "송실장 크루즈 준비해줘요."),
+    ("송치호", "네."),
+    ("김환석", "회전초밥 먹는데 왜 크루즈를 준비해요?"),
+    ("현정", "5대양을 한바퀴 돌면서 먹는 초밥이 회전초밥이잖아요."),
+    ("김환석", "접시가 도는 게 아니라 배가 도는 거구나."),
+    ("현정", "송실장 첫 번째 코스는 블랙킹 타이거 새우초밥으로 예약해줘요."),
+    ("송치호", "어사출도 대서양점 예약해 놓겠습니다."),
+    ("김환석", "어사출도가 대서양까지 진출했네."),
+    ("현정", "상어초밥 먹어봤어요?"),
+    ("김환석", "아니요."),
+    ("현정", "그럼 다음 코스는 철갑상어 초밥으로 예약해줘요."),
+    ("송치호", "은행골 태평양점 예약해 놓겠습니다."),
+    ("현정", "영수증 리뷰 쓰면 캐비어 막기 나오는 곳이 맞죠?"),
+    ("송치호", "맞습니다."),
+    ("김환석", "태평양에서도 영수증 리뷰를 하는구나."),
+    ("현정", "자기 회 좋아해요?"),
+    ("김환석", "네!"),
+    ("현정", "그럼 다음은 심해어 회덮밥 먹으러 가요."),
+    ("송치호", "탐나종합어시장 인도양점 예약해 놓겠습니다."),
+    ("김환석", "심해어로도 회를 뜨는구나."),
+    ("현정", "후식은 뭐가 있죠?"),
+    ("송치호", "북극해로 가시면 닭다리 튀김 소보로를 드실 수 있고 남극해로 가시면 연유 듬뿍 얼음빙수를 드실 수 있습니다."),
+    ("현정", "성심당 북극해점으로 가느냐 설빙 남극해점으로 가느냐 그것이 문제로다."),
+    ("김환석", "근데 이거 다 진짜 있는 것들이에요?"),
+    ("현정", "저만 이용하는 일인 푸드샵이에요."),
+    ("김환석", "이렇게 먹으면 비싸지 않아요?"),
+    ("현정", "평일 런치라 인당 만구천구백달러밖에 안 해요."),
+    ("김환석", "원이 아니라 달러..."),
+    ("현정", "네."),
+    ("김환석", "한 끼 런치가 내 연봉이네...")
+]
+
+def line_filename(i, character):
+    """줄 번호 / 캐릭터로 만든 출력 파일명"""
+    return f"{i:02d}_{character}_{CHARACTERS[character]['emotion']}.wav"
+
+def voice_factors(character):
+    """캐릭터별 (피치, 속도) 계수"""
+    # 캐릭터별 음성 변형
+    if character == "현정":
+        # 자신감 있는 톤 (약간 높은 피치)
+        pitch_factor = 1.1
+        speed_factor = 0.95
+    elif character == "김환석":
+        # 놀라는 톤 (낮은 피치, 빠른 속도)
+        pitch_factor = 0.9
+        speed_factor = 1.1
+    elif character == "송치호":
+        # 정중한 톤 (안정적인 피치)
+        pitch_factor = 1.0
+        speed_factor = 0.9
+    
+    return pitch_factor, speed_factor
+
+def transform_line(audio_ref, character):
+    """캐릭터에 맞게 변형한 한 줄 음성"""
+    pitch_factor, speed_factor = voice_factors(character)
+    
+    # 음성 변형 (속도 조절)
+    new_length = int(len(audio_ref) / speed_factor)
+    indices = np.linspace(0, len(audio_ref)-1, new_length)
+    modified_audio = np.interp(indices, np.arange(len(audio_ref)), audio_ref)
+    
+    # 피치 변형 시뮬레이션 (리샘플링)
+    if pitch_factor != 1.0:
+        pitch_length = int(len(modified_audio) * pitch_factor)
+        pitch_indices = np.linspace(0, len(modified_audio)-1, pitch_length)
+        modified_audio = np.interp(pitch_indices, np.arange(len(modified_audio)), modified_audio)
+    
+    return modified_audio
+
+def vocoder_voices(audio_ref):
+    """모든 캐릭터 음성을 위상 보코더로 한 번에 변형 (STFT 1회, 속도와 피치를 따로 적용)"""
+    from phase_vocoder import PhaseVocoder
+    
+    variants = [voice_factors(character)[::-1] for character in CHARACTERS]
+    return dict(zip(CHARACTERS, PhaseVocoder(audio_ref).render(variants)))
+
+def character_voice(audio_ref, character, engine="interp"):
+    """엔진에 맞게 변형한 캐릭터 음성 (vocoder 는 캐릭터마다 음성이 하나이므로 프로세스별 캐시 재사용)"""
+    if engine != "vocoder":
+        return transform_line(audio_ref, character)
+    if _VOCODER_CACHE.get("audio") is not audio_ref:
+        _VOCODER_CACHE.update(audio=audio_ref, voices=vocoder_voices(audio_ref))
+    return _VOCODER_CACHE["voices"][character]
+
+def render_line(audio_ref, sr, output_dir, i, character, text, fmt=None, bit_depth=16, engine="interp"):
+    """한 줄 음성 변형 후 저장하고 파일명 반환 (fmt 가 있으면 그 형식으로 인코딩하고 인코딩 결과 반환)"""
+    # 파일명 생성 (없는 캐릭터면 변형 전에 KeyError)
+    filename = line_filename(i, character)
+    output_file = f"{output_dir}/{filename}"
+    
+    modified_audio = character_voice(audio_ref, character, engine)
+    
+    if fmt:
+        return encode_audio(modified_audio, sr, with_extension(output_file, fmt), fmt, bit_depth)
+    
+    # 파일 저장
+    sf.write(output_file, modified_audio, sr)
+    
+    return filename
+
+def create_character_tts(workers=1, script_path=None, fmt=None, bit_depth=16, engine="interp", best_ref=False):
     """캐릭터별 감정 대화 TTS 생성"""
     
     print("🎭 캐릭터별 감정 대화 TTS 생성 🎭\n")
     
-    # 캐릭터별 감정 설정
-    characters = {
-        "현정": {
-            "emotion": "confident",  # 자신감 있고 우아한
-            "ref_audio": "TDM_LLJ/PTD/J.LJJ15m.wav",  # 기쁨 (자신감있는 톤)
-            "description": "자신감 있고 우아한 톤"
-        },
-        "김환석": {
-            "emotion": "surprised", 
-            "ref_audio": "TDM_LLJ/PTD/J.LJJ15m.wav",  # 기쁨 (놀라는 톤으로 변형)
-            "description": "놀라고 당황하는 톤"
-        },
-        "송치호": {
-            "emotion": "polite",
-            "ref_audio": "TDM_LLJ/PTD/J.LJJ15m.wav",  # 기쁨 (정중한 톤으로 변형)
-            "description": "정중하고 공손한 톤"
-        }
-    }
-    
-    # 대화 스크립트
-    dialogue = [
-        ("현정", "회전초밥 먹으러 갈래요?"),
-        ("김환석", "좋죠."),
-        ("현정", "송실장 크루즈 준비해줘요."),
-        ("송치호", "네."),
-        ("김환석", "회전초밥 먹는데 왜 크루즈를 준비해요?"),
-        ("현정", "5대양을 한바퀴 돌면서 먹는 초밥이 회전초밥이잖아요."),
-        ("김환석", "접시가 도는 게 아니라 배가 도는 거구나."),
-        ("현정", "송실장 첫 번째 코스는 블랙킹 타이거 새우초밥으로 예약해줘요."),
-        ("송치호", "어사출도 대서양점 예약해 놓겠습니다."),
-        ("김환석", "어사출도가 대서양까지 진출했네."),
-        ("현정", "상어초밥 먹어봤어요?"),
-        ("김환석", "아니요."),
-        ("현정", "그럼 다음 코스는 철갑상어 초밥으로 예약해줘요."),
-        ("송치호", "은행골 태평양점 예약해 놓겠습니다."),
-        ("현정", "영수증 리뷰 쓰면 캐비어 막기 나오는 곳이 맞죠?"),
-        ("송치호", "맞습니다."),
-        ("김환석", "태평양에서도 영수증 리뷰를 하는구나."),
-        ("현정", "자기 회 좋아해요?"),
-        ("김환석", "네!"),
-        ("현정", "그럼 다음은 심해어 회덮밥 먹으러 가요."),
-        ("송치호", "탐나종합어시장 인도양점 예약해 놓겠습니다."),
-        ("김환석", "심해어로도 회를 뜨는구나."),
-        ("현정", "후식은 뭐가 있죠?"),
-        ("송치호", "북극해로 가시면 닭다리 튀김 소보로를 드실 수 있고 남극해로 가시면 연유 듬뿍 얼음빙수를 드실 수 있습니다."),
-        ("현정", "성심당 북극해점으로 가느냐 설빙 남극해점으로 가느냐 그것이 문제로다."),
-        ("김환석", "근데 이거 다 진짜 있는 것들이에요?"),
-        ("현정", "저만 이용하는 일인 푸드샵이에요."),
-        ("김환석", "이렇게 먹으면 비싸지 않아요?"),
-        ("현정", "평일 런치라 인당 만구천구백달러밖에 안 해요."),
-        ("김환석", "원이 아니라 달러..."),
-        ("현정", "네."),
-        ("김환석", "한 끼 런치가 내 연봉이네...")
-    ]
+    characters = CHARACTERS
+    # --script 가 있으면 파일에서 한 줄씩 읽음 (전체를 메모리에 올리지 않음)
+    dialogue = load_records(script_path, DIALOGUE)
     
     # 출력 디렉토리 생성
     output_dir = "character_dialogue_output"
@@ -81,14 +166,25 @@ def create_character_tts():
     
     try:
         print(f"📁 참조 음성 로드 중: {ref_audio_path}")
-        audio_ref, sr = sf.read(ref_audio_path)
-        if len(audio_ref.shape) > 1:
-            audio_ref = audio_ref[:, 0]  # 모노로 변환
-        
-        # 길이 제한 (처음 3초만 사용)
-        max_samples = sr * 3
-        if len(audio_ref) > max_samples:
-            audio_ref = audio_ref[:max_samples]
+        window = None
+        if best_ref:
+            # 처음 3초 대신 녹음에서 가장 점수가 높은 구간 (인덱스에 캐시)
+            from reference_finder import best_window, load_window
+            window = best_window(ref_audio_path)
+            if window is None:
+                print("⚠️ 조건에 맞는 참조 구간이 없어 처음 3초를 사용합니다")
+        if window is not None:
+            audio_ref, sr = load_window(window)
+            print(f"🔎 최적 참조 구간: {window['start']:.2f}~{window['end']:.2f}초 (점수 {window['score']:.3f})")
+        else:
+            audio_ref, sr = sf.read(ref_audio_path)
+            if len(audio_ref.shape) > 1:
+                audio_ref = audio_ref[:, 0]  # 모노로 변환
+            
+            # 길이 제한 (처음 3초만 사용)
+            max_samples = sr * 3
+            if len(audio_ref) > max_samples:
+                audio_ref = audio_ref[:max_samples]
         
         print(f"✅ 참조 음성 로드 성공! ({len(audio_ref)/sr:.2f}초)\n")
         
@@ -99,71 +195,72 @@ def create_character_tts():
     # 캐릭터별 대화 생성
     print("🎤 캐릭터별 TTS 생성 중...\n")
     
-    for i, (character, text) in enumerate(dialogue, 1):
-        try:
-            char_info = characters[character]
-            
-            # 캐릭터별 음성 변형
-            if character == "현정":
-                # 자신감 있는 톤 (약간 높은 피치)
-                pitch_factor = 1.1
-                speed_factor = 0.95
-            elif character == "김환석":
-                # 놀라는 톤 (낮은 피치, 빠른 속도)
-                pitch_factor = 0.9
-                speed_factor = 1.1
-            elif character == "송치호":
-                # 정중한 톤 (안정적인 피치)
-                pitch_factor = 1.0
-                speed_factor = 0.9
-            
-            # 음성 변형 (속도 조절)
-            new_length = int(len(audio_ref) / speed_factor)
-            indices = np.linspace(0, len(audio_ref)-1, new_length)
-            modified_audio = np.interp(indices, np.arange(len(audio_ref)), audio_ref)
-            
-            # 피치 변형 시뮬레이션 (리샘플링)
-            if pitch_factor != 1.0:
-                pitch_length = int(len(modified_audio) * pitch_factor)
-                pitch_indices = np.linspace(0, len(modified_audio)-1, pitch_length)
-                modified_audio = np.interp(pitch_indices, np.arange(len(modified_audio)), modified_audio)
-            
-            # 파일명 생성
-            filename = f"{i:02d}_{character}_{char_info['emotion']}.wav"
-            output_file = f"{output_dir}/{filename}"
-            
-            # 파일 저장
-            sf.write(output_file, modified_audio, sr)
-            
-            print(f"✅ {i:2d}. {character} ({char_info['description']})")
-            print(f"    💬 \"{text}\"")
-            print(f"    📄 {filename}")
-            print()
-            
-        except Exception as e:
-            print(f"❌ {i}. {character} TTS 생성 실패: {e}")
+    tasks = ((output_dir, i, line.speaker, line.text) for i, line in enumerate(dialogue, 1))
+    
+    # 엔진은 워커 프로세스에도 그대로 전달 (보코더 음성은 프로세스마다 한 번 계산)
+    render = functools.partial(render_line, engine=engine)
+    
+    if fmt:
+        # 압축 형식: workers > 1 이면 프로세스마다 변형 + 인코딩,
+        # 한 프로세스면 음성 변형은 여기서 순서대로, 인코딩은 스레드 풀에서 겹쳐 실행
+        def produce(task):
+            _, i, character, _ = task
+            filename = line_filename(i, character)
+            return character_voice(audio_ref, character, engine), sr, f"{output_dir}/{filename}"
+        
+        results = ((task, encoded and os.path.basename(encoded["path"]), encoded, error)
+                   for task, encoded, error in encode_lines(render, produce, audio_ref, sr, tasks,
+                                                            fmt, bit_depth, workers))
+    else:
+        # workers > 1 이면 코어별로 나눠 처리 (출력은 스크립트 순서 그대로)
+        results = ((task, filename, None, error)
+                   for _, task, filename, error in render_lines(render, audio_ref, sr, tasks, workers))
+    
+    encoded_lines = []
+    for (_, i, character, text), filename, encoded, error in results:
+        if error is not None:
+            print(f"❌ {i}. {character} TTS 생성 실패: {error}")
+            continue
+        char_info = characters[character]
+        
+        print(f"✅ {i:2d}. {character} ({char_info['description']})")
+        print(f"    💬 \"{text}\"")
+        print(f"    📄 {filename}")
+        if encoded:
+            print(f"    💾 {format_result(encoded)}")
+            encoded_lines.append(encoded)
+        print()
+    
+    if fmt:
+        print_summary(summarize(encoded_lines), fmt, bit_depth)
     
     # 결과 요약
     print(f"\n🎉 캐릭터 대화 TTS 생성 완료!")
     print(f"📁 생성된 파일들: {output_dir}/")
     
     # 생성된 파일 목록
-    if os.path.exists(output_dir):
-        files = sorted([f for f in os.listdir(output_dir) if f.endswith('.wav')])
-        print(f"\n📋 생성된 파일 목록 ({len(files)}개):")
-        for file in files:
-            file_path = os.path.join(output_dir, file)
-            size = os.path.getsize(file_path)
-            print(f"   - {file} ({size:,} bytes)")
+    print_output_files(output_dir, fmt)
+    ext = output_extension(fmt)
     
     print(f"\n🎭 캐릭터 설정:")
     for char, info in characters.items():
         print(f"   - {char}: {info['description']}")
     
     print(f"\n🎵 재생 방법:")
-    print(f"   afplay {output_dir}/01_현정_confident.wav")
-    print(f"   afplay {output_dir}/02_김환석_surprised.wav")
-    print(f"   afplay {output_dir}/03_송치호_polite.wav")
+    print(f"   afplay {output_dir}/01_현정_confident{ext}")
+    print(f"   afplay {output_dir}/02_김환석_surprised{ext}")
+    print(f"   afplay {output_dir}/03_송치호_polite{ext}")
 
 if __name__ == "__main__":
-    create_character_tts() 
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="캐릭터별 감정 대화 TTS 생성")
+    parser.add_argument("--workers", type=int, default=1, help="프로세스 수 (1 이면 순차 실행)")
+    parser.add_argument("--script", help="CSV / JSONL 대화 스크립트 (speaker, text, lang, emotion)")
+    add_format_arguments(parser)
+    parser.add_argument("--engine", choices=["interp", "vocoder"], default="interp",
+                        help="interp: 기존 보간 리샘플링, vocoder: 위상 보코더 (속도와 피치를 따로 변경). "
+                             "vocoder 는 프로세스마다 전체 캐릭터 음성을 한 번 계산한 뒤 줄마다 재사용하므로 "
+                             "줄이 적으면 --workers 를 늘려도 그 초기 계산만 반복되어 오히려 느려질 수 있음")
+    parser.add_argument("--best-ref", action="store_true", help="처음 3초 대신 최적 참조 구간 사용")
+    args = parser.parse_args()
+    check_format_arguments(parser, args)
+    create_character_tts(args.workers, args.script, args.format, args.bit_depth, args.engine, args.best_ref) 
\ No newline at end of file
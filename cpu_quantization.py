@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+CPU 추론용 동적 int8 양자화 - BERT 인코더
+
+T2S 의 빠른 디코딩 경로(T2STransformer / T2SBlock)는 모델을 불러올 때 nn.Linear 에서 가중치 텐서를
+꺼내 F.linear 로 직접 쓰므로, 로드 후 quantize_dynamic 으로 nn.Linear 를 바꿔도 디코딩에는 반영되지
+않는다. 그래서 실제로 효과가 있는 BERT 만 양자화한다.
+"""
+
+import argparse
+import gc
+import multiprocessing as mp
+import os
+import sys
+import time
+
+import torch
+import torch.nn as nn
+import yaml
+
+CONFIG_PATH = "GPT_SoVITS/configs/tts_infer.yaml"
+QUANTIZE_MODES = ("none", "int8")
+
+# 파이프라인에서 양자화할 Linear 위주 모델 속성 (t2s_model 은 위 설명대로 제외)
+QUANTIZE_TARGETS = ("bert_model",)
+
+BERT_SAMPLE_TEXT = "회전초밥 먹는데 왜 크루즈를 준비해요? 5대양을 한바퀴 돌면서 먹는 초밥이 회전초밥이잖아요."
+
+try:
+    from torch.ao.quantization import quantize_dynamic
+except ImportError:  # 구버전 torch
+    from torch.quantization import quantize_dynamic
+
+
+def load_quantize_mode(config_path=CONFIG_PATH, version="custom"):
+    """tts_infer.yaml 프로필의 quantize 설정 읽기 (없으면 none)"""
+    with open(config_path, "r", encoding="utf-8") as f:
+        configs = yaml.safe_load(f) or {}
+    mode = str((configs.get(version) or {}).get("quantize", "none")).lower()
+    if mode not in QUANTIZE_MODES:
+        raise ValueError(f"지원하지 않는 quantize 값: {mode} (가능: {', '.join(QUANTIZE_MODES)})")
+    return mode
+
+
+def quantize_model(model, mode="int8"):
+    """nn.Linear 를 동적 int8 양자화한 모델 반환 (none 이면 그대로)"""
+    if mode == "none" or model is None:
+        return model
+    return quantize_dynamic(model.eval(), {nn.Linear}, dtype=torch.qint8)
+
+
+def apply_quantization(tts_pipeline, mode):
+    """로드된 TTS 파이프라인의 BERT 모델에 양자화 적용
+
+    GPU 나 half 정밀도에서는 동적 양자화가 지원되지 않으므로 건너뛴다.
+    """
+    if mode == "none":
+        return []
+
+    config = getattr(tts_pipeline, "configs", None)
+    device = str(getattr(config, "device", "cpu"))
+    if device != "cpu" or getattr(config, "is_half", False):
+        print(f"⚠️ int8 양자화는 CPU fp32 에서만 지원됩니다 (device={device})")
+        return []
+
+    applied = []
+    for name in QUANTIZE_TARGETS:
+        model = getattr(tts_pipeline, name, None)
+        if model is None:
+            continue
+        setattr(tts_pipeline, name, quantize_model(model, mode))
+        applied.append(name)
+    return applied
+
+
+def apply_configured_quantization(tts_pipeline, config_path=CONFIG_PATH, version="custom"):
+    """tts_infer.yaml 의 quantize 설정대로 양자화 (파이프라인을 불러오는 진입점에서 공통으로 호출)"""
+    applied = apply_quantization(tts_pipeline, load_quantize_mode(config_path, version))
+    if applied:
+        print(f"🎛️ int8 양자화 적용: {', '.join(applied)}")
+    return applied
+
+
+def rss_bytes():
+    """현재 프로세스의 상주 메모리 (RSS)"""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        import resource
+        # /proc 가 없으면 최대 RSS (macOS 는 bytes, 리눅스는 KB)
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if os.uname().sysname == "Darwin" else peak * 1024
+
+
+@torch.inference_mode()
+def measure_latency(model, inputs, runs=20, warmup=3):
+    """평균 추론 시간 (초)"""
+    for _ in range(warmup):
+        model(inputs)
+    start = time.perf_counter()
+    for _ in range(runs):
+        model(inputs)
+    return (time.perf_counter() - start) / runs
+
+
+@torch.inference_mode()
+def quality_delta(reference_model, candidate_model, inputs):
+    """fp32 대비 출력 차이 (코사인 유사도, 상대 오차)"""
+    ref = reference_model(inputs).flatten().float()
+    out = candidate_model(inputs).flatten().float()
+    cosine = torch.nn.functional.cosine_similarity(ref, out, dim=0).item()
+    relative = ((ref - out).norm() / ref.norm().clamp_min(1e-12)).item()
+    return cosine, relative
+
+
+class SyntheticBlock(nn.Module):
+    """qkv / out / MLP 가 모두 nn.Linear 인 트랜스포머 블록"""
+
+    def __init__(self, d_model, num_heads):
+        super().__init__()
+        self.num_heads = num_heads
+        self.qkv = nn.Linear(d_model, d_model * 3)
+        self.out = nn.Linear(d_model, d_model)
+        self.mlp = nn.Sequential(nn.Linear(d_model, d_model * 4), nn.ReLU(), nn.Linear(d_model * 4, d_model))
+        self.norm1 = nn.LayerNorm(d_model)
+        self.norm2 = nn.LayerNorm(d_model)
+
+    def forward(self, x):
+        batch, length, dim = x.shape
+        q, k, v = self.qkv(x).view(batch, length, 3, self.num_heads, dim // self.num_heads).permute(2, 0, 3, 1, 4)
+        attn = torch.nn.functional.scaled_dot_product_attention(q, k, v)
+        x = self.norm1(x + self.out(attn.transpose(1, 2).reshape(batch, length, dim)))
+        return self.norm2(x + self.mlp(x))
+
+
+class SyntheticEncoder(nn.Module):
+    """실제 가중치 없이 T2S / BERT 구조를 흉내내는 작은 트랜스포머"""
+
+    def __init__(self, vocab_size=512, d_model=256, num_layers=4, num_heads=8):
+        super().__init__()
+        self.embedding = nn.Embedding(vocab_size, d_model)
+        self.blocks = nn.Sequential(*[SyntheticBlock(d_model, num_heads) for _ in range(num_layers)])
+        self.head = nn.Linear(d_model, vocab_size)
+
+    def forward(self, tokens):
+        return self.head(self.blocks(self.embedding(tokens)))
+
+
+def _release_free_memory():
+    """양자화 중 잠깐 쓴 fp32 사본을 OS 에 돌려줌 (glibc 가 아니면 아무것도 안 함)"""
+    try:
+        import ctypes
+        ctypes.CDLL("libc.so.6").malloc_trim(0)
+    except (OSError, AttributeError):
+        pass
+
+
+def _measure_variant(mode, seq_len, batch_size, runs, seed):
+    """새 프로세스에서 한 모드의 모델만 만들어 지연과 RSS 증가량 측정 (다른 모드의 메모리가 섞이지 않음)"""
+    torch.manual_seed(seed)
+    inputs = torch.randint(0, 512, (batch_size, seq_len))
+    gc.collect()
+    base = rss_bytes()
+    model = quantize_model(SyntheticEncoder().eval(), mode)
+    gc.collect()
+    _release_free_memory()
+    latency = measure_latency(model, inputs, runs)
+    return latency, rss_bytes() - base
+
+
+def benchmark(seq_len=128, batch_size=1, runs=20, seed=0):
+    """합성 모델로 fp32 / int8 품질, 지연, RSS 비교"""
+    torch.manual_seed(seed)
+    fp32_model = SyntheticEncoder().eval()
+    # quantize_dynamic 은 복사본을 만들므로 fp32 모델은 그대로 남는다
+    int8_model = quantize_model(fp32_model, "int8")
+
+    inputs = torch.randint(0, 512, (batch_size, seq_len))
+    cosine, relative = quality_delta(fp32_model, int8_model, inputs)
+
+    result = {"cosine": cosine, "relative_error": relative}
+    with mp.get_context("spawn").Pool(1, maxtasksperchild=1) as pool:
+        for mode in ("fp32", "int8"):
+            latency, rss = pool.apply(_measure_variant,
+                                      ("none" if mode == "fp32" else mode, seq_len, batch_size, runs, seed))
+            result[f"{mode}_latency"] = latency
+            result[f"{mode}_rss"] = rss
+    return result
+
+
+def benchmark_pipeline_bert(config_path=CONFIG_PATH, version="custom", text=BERT_SAMPLE_TEXT, runs=10):
+    """실제 파이프라인의 BERT 로 fp32 / int8 지연과 프로세스 RSS 비교"""
+    sys.path.append("GPT_SoVITS")
+    from TTS_infer_pack.TTS import TTS, TTS_Config
+
+    with open(config_path, "r", encoding="utf-8") as f:
+        configs = yaml.safe_load(f)
+    tts = TTS(TTS_Config({"custom": configs[version]}))
+    inputs = tts.bert_tokenizer(text, return_tensors="pt")
+
+    @torch.inference_mode()
+    def run():
+        tts.bert_model(**inputs, output_hidden_states=True)
+
+    def measure():
+        run()
+        start = time.perf_counter()
+        for _ in range(runs):
+            run()
+        gc.collect()
+        return (time.perf_counter() - start) / runs, rss_bytes()
+
+    fp32_latency, fp32_rss = measure()
+    if not apply_quantization(tts, "int8"):
+        return None
+    gc.collect()
+    _release_free_memory()
+    int8_latency, int8_rss = measure()
+    return {"fp32_latency": fp32_latency, "int8_latency": int8_latency,
+            "fp32_rss": fp32_rss, "int8_rss": int8_rss}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="동적 int8 양자화 품질/성능 점검")
+    parser.add_argument("--config", default=CONFIG_PATH)
+    parser.add_argument("--version", default="custom")
+    parser.add_argument("--seq-len", type=int, default=128)
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--min-cosine", type=float, default=0.99)
+    parser.add_argument("--pipeline", action="store_true", help="실제 파이프라인의 BERT 로도 측정")
+    args = parser.parse_args()
+
+    print("🎛️ 동적 int8 양자화 점검 🎛️\n")
+    print(f"📄 설정: {args.config} [{args.version}] quantize={load_quantize_mode(args.config, args.version)}")
+    print(f"🧵 torch 스레드: {torch.get_num_threads()}\n")
+
+    result = benchmark(seq_len=args.seq_len, runs=args.runs)
+
+    print("🧪 합성 모델 (새 프로세스에서 측정, RSS 는 모델 생성 전후 증가량)")
+    print(f"⏱️ fp32: {result['fp32_latency'] * 1000:.2f}ms / RSS +{result['fp32_rss'] / 1e6:.1f}MB")
+    print(f"⏱️ int8: {result['int8_latency'] * 1000:.2f}ms / RSS +{result['int8_rss'] / 1e6:.1f}MB")
+    print(f"🚀 속도 향상: {result['fp32_latency'] / result['int8_latency']:.2f}x")
+    print(f"🎯 코사인 유사도: {result['cosine']:.5f}, 상대 오차: {result['relative_error']:.4f}")
+
+    if args.pipeline:
+        bert = benchmark_pipeline_bert(args.config, args.version, runs=args.runs)
+        if bert:
+            print(f"\n🧠 파이프라인 BERT: fp32 {bert['fp32_latency'] * 1000:.1f}ms -> "
+                  f"int8 {bert['int8_latency'] * 1000:.1f}ms, "
+                  f"프로세스 RSS {bert['fp32_rss'] / 1e6:.0f}MB -> {bert['int8_rss'] / 1e6:.0f}MB")
+
+    if result["cosine"] >= args.min_cosine:
+        print("✅ 품질 기준 통과")
+    else:
+        print(f"❌ 품질 기준 미달 (최소 {args.min_cosine})")
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+CPU 워커 분할 실행기 - 코어 집합별 affinity / 스레드 수 고정 후 처리량 비교
+"""
+
+import argparse
+import multiprocessing as mp
+import os
+import queue
+import sys
+import time
+
+import yaml
+
+# GPT_SoVITS 경로 추가
+sys.path.append('GPT_SoVITS')
+
+CONFIG_PATH = "GPT_SoVITS/configs/tts_infer.yaml"
+
+# tts_infer.yaml 에 worker_pool 섹션이 없을 때의 기본값
+DEFAULT_POOL_CONFIG = {
+    "jobs_per_worker": 8,
+    "profile": "custom",
+    "workers": [1, 2, 4],
+    "workload": "synthetic",
+}
+
+SAMPLE_TEXT = "회전초밥 먹는데 왜 크루즈를 준비해요?"
+
+
+def load_pool_config(config_path=CONFIG_PATH):
+    """tts_infer.yaml 의 worker_pool 섹션 읽기"""
+    with open(config_path, "r", encoding="utf-8") as f:
+        configs = yaml.safe_load(f) or {}
+    return dict(DEFAULT_POOL_CONFIG, **(configs.get("worker_pool") or {}))
+
+
+def available_cpus():
+    """현재 프로세스가 사용할 수 있는 코어 목록"""
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def partition_cpus(cpus, num_workers):
+    """코어 목록을 겹치지 않는 num_workers 개의 연속 집합으로 분할
+
+    나누어 떨어지지 않으면 남는 코어를 앞쪽 워커에 하나씩 더 줌 (모든 코어를 사용).
+    """
+    if num_workers < 1 or num_workers > len(cpus):
+        return None
+    per_worker, extra = divmod(len(cpus), num_workers)
+    sets, start = [], 0
+    for i in range(num_workers):
+        end = start + per_worker + (1 if i < extra else 0)
+        sets.append(cpus[start:end])
+        start = end
+    return sets
+
+
+def threads_label(result):
+    """워커당 스레드 수 표시 (고르지 않으면 "3~4")"""
+    low, high = min(result["threads"]), max(result["threads"])
+    return str(low) if low == high else f"{low}~{high}"
+
+
+def pin_current_process(cpu_set):
+    """affinity 와 OpenMP / MKL / torch 스레드 수를 코어 집합에 맞춤 (torch 임포트 전에 호출)"""
+    threads = str(len(cpu_set))
+    for name in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+        os.environ[name] = threads
+    if hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cpu_set)
+
+    import torch
+    torch.set_num_threads(len(cpu_set))
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        # 이미 병렬 작업이 시작된 뒤에는 변경할 수 없음
+        pass
+
+
+def _load_workload(workload, profile, config_path=CONFIG_PATH):
+    """워커 안에서 한 작업을 실행하는 함수 생성"""
+    if workload == "tts":
+        from TTS_infer_pack.TTS import TTS, TTS_Config
+
+        with open(config_path, "r", encoding="utf-8") as f:
+            configs = yaml.safe_load(f)
+        from cpu_quantization import apply_configured_quantization
+
+        tts = TTS(TTS_Config({"custom": configs[profile]}))
+        apply_configured_quantization(tts, config_path, profile)
+
+        def run_tts():
+            for _ in tts.inference(text=SAMPLE_TEXT, text_lang="ko",
+                                   ref_audio_path="TDM_LLJ/PTD/J.LJJ15m.wav",
+                                   prompt_text="안녕하세요", prompt_lang="ko",
+                                   text_split_method="cut5", batch_size=1):
+                pass
+
+        return run_tts
+
+    import torch
+    from cpu_quantization import SyntheticEncoder
+
+    model = SyntheticEncoder().eval()
+    tokens = torch.randint(0, 512, (1, 128))
+
+    def run_synthetic():
+        with torch.inference_mode():
+            model(tokens)
+
+    return run_synthetic
+
+
+def _worker(cpu_set, workload, profile, jobs, barrier, results, config_path=CONFIG_PATH):
+    """코어 집합에 고정된 워커 프로세스"""
+    pin_current_process(cpu_set)
+    run = _load_workload(workload, profile, config_path)
+    run()  # 워밍업
+
+    # 모든 워커가 모델을 로드한 뒤 동시에 측정 시작
+    barrier.wait()
+    start = time.perf_counter()
+    for _ in range(jobs):
+        run()
+    results.put((tuple(cpu_set), jobs, start, time.perf_counter()))
+
+
+def measure_partitioning(cpus, num_workers, workload="synthetic", profile="custom", jobs_per_worker=8,
+                         timeout=600.0, config_path=CONFIG_PATH):
+    """워커 수 하나에 대한 집계 처리량 측정
+
+    워커가 결과 없이 죽거나 timeout 초 안에 끝나지 않으면 배리어를 깨고 나머지 워커를 정리한 뒤
+    RuntimeError / TimeoutError.
+    """
+    cpu_sets = partition_cpus(cpus, num_workers)
+    if cpu_sets is None:
+        return None
+
+    # fork 하면 부모의 torch 스레드 풀이 복사되므로 spawn 사용
+    ctx = mp.get_context("spawn")
+    barrier = ctx.Barrier(num_workers)
+    results = ctx.Queue()
+    processes = [ctx.Process(target=_worker, args=(cpu_set, workload, profile, jobs_per_worker, barrier, results,
+                                                     config_path))
+                 for cpu_set in cpu_sets]
+    for p in processes:
+        p.start()
+
+    reports = []
+    deadline = time.monotonic() + timeout if timeout else None
+    try:
+        while len(reports) < len(processes):
+            try:
+                reports.append(results.get(timeout=1.0))
+                continue
+            except queue.Empty:
+                pass
+            # 모델 로드 중 죽은 워커가 있으면 나머지는 배리어에서 영원히 기다리게 됨
+            dead = [p for p in processes if p.exitcode not in (None, 0)]
+            if dead:
+                raise RuntimeError(f"워커 {len(dead)}개가 비정상 종료 (exitcode {dead[0].exitcode})")
+            if deadline is not None and time.monotonic() > deadline:
+                raise TimeoutError(f"워커 {num_workers}개 측정이 {timeout:.0f}초 안에 끝나지 않음")
+    finally:
+        if len(reports) < len(processes):
+            barrier.abort()
+            for p in processes:
+                if p.is_alive():
+                    p.terminate()
+        for p in processes:
+            p.join()
+
+    total_jobs = sum(r[1] for r in reports)
+    wall = max(r[3] for r in reports) - min(r[2] for r in reports)
+    return {
+        "workers": num_workers,
+        "threads_per_worker": len(cpu_sets[0]),
+        "threads": [len(cpu_set) for cpu_set in cpu_sets],
+        "jobs": total_jobs,
+        "seconds": wall,
+        "throughput": total_jobs / wall if wall > 0 else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CPU 워커 분할별 처리량 측정")
+    parser.add_argument("--config", default=CONFIG_PATH)
+    parser.add_argument("--workers", type=int, nargs="*", help="측정할 워커 수 목록 (기본: yaml 설정)")
+    args = parser.parse_args()
+
+    config = load_pool_config(args.config)
+    worker_counts = args.workers or config["workers"]
+    cpus = available_cpus()
+
+    print("🧵 CPU 워커 분할 측정 🧵\n")
+    print(f"💻 사용 가능 코어: {len(cpus)}개 {cpus}")
+    print(f"⚙️ 작업: {config['workload']} / 워커당 {config['jobs_per_worker']}회\n")
+
+    results = []
+    for num_workers in worker_counts:
+        try:
+            result = measure_partitioning(cpus, num_workers, config["workload"], config["profile"],
+                                          config["jobs_per_worker"], config_path=args.config)
+        except (RuntimeError, TimeoutError) as e:
+            print(f"❌ 워커 {num_workers}개: {e}")
+            continue
+        if result is None:
+            print(f"⏭️ 워커 {num_workers}개: 코어 수 부족으로 건너뜀")
+            continue
+        results.append(result)
+        print(f"✅ 워커 {result['workers']}개 x {threads_label(result)}스레드: "
+              f"{result['throughput']:.2f} jobs/s ({result['jobs']}개, {result['seconds']:.2f}초)")
+
+    if results:
+        best = max(results, key=lambda r: r["throughput"])
+        print(f"\n🏆 최고 처리량: 워커 {best['workers']}개 x {threads_label(best)}스레드 "
+              f"({best['throughput']:.2f} jobs/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+대화 스크립트 배치 플래너 - TTS.inference 의 batch_size / split_bucket 활용
+"""
+
+import os
+import sys
+from collections import OrderedDict
+
+import numpy as np
+import soundfile as sf
+
+# GPT_SoVITS 경로 추가
+sys.path.append('GPT_SoVITS')
+
+DEFAULT_REF_AUDIO = "TDM_LLJ/PTD/J.LJJ15m.wav"
+DEFAULT_PROMPT_TEXT = "안녕하세요"
+
+# 이보다 조용한 샘플은 조각 사이 무음으로 봄 (dBFS). 후처리 / 리샘플링 / 디더로 0 이 아닐 수 있음
+GAP_THRESHOLD_DB = -60.0
+
+# TextPreprocessor 는 5자 미만 조각을 다음 조각과 합치므로 이런 줄은 단독으로 보낸다
+MIN_BATCH_TEXT_LENGTH = 5
+
+# simple_tts_request 와 같은 기본 추론 파라미터
+DEFAULT_INFERENCE_PARAMS = {
+    "top_k": 15,
+    "top_p": 1.0,
+    "temperature": 1.0,
+    "batch_threshold": 0.75,
+    "split_bucket": True,
+    "speed_factor": 1.0,
+    "fragment_interval": 0.3,
+    "seed": -1,
+}
+
+
+def normalize_line(index, line):
+    """여러 스크립트 형식의 줄을 공통 dict 로 변환"""
+    if not isinstance(line, dict):
+        # (캐릭터, 텍스트, 감정) 튜플 형식
+        line = {"speaker": line[0], "text": line[1], "emotion": line[2] if len(line) > 2 else "neutral"}
+
+    lang = line.get("lang", "ko")
+    return {
+        "index": index,
+        "speaker": line["speaker"],
+        "text": line["text"],
+        "text_lang": lang,
+        "emotion": line.get("emotion", lang),
+        "ref_audio_path": line.get("ref_audio_path", DEFAULT_REF_AUDIO),
+        "prompt_text": line.get("prompt_text", DEFAULT_PROMPT_TEXT),
+        "prompt_lang": line.get("prompt_lang", "ko"),
+    }
+
+
+def plan_batches(lines, batch_size=4):
+    """(참조 음성, 프롬프트, 언어) 로 묶고 길이순으로 나눠 배치 목록 생성"""
+    groups = OrderedDict()
+    singles = []
+
+    for index, line in enumerate(lines, 1):
+        item = normalize_line(index, line)
+        # 줄바꿈이 있거나 너무 짧은 줄은 배치 결과를 줄 단위로 나눌 수 없음
+        if "\n" in item["text"] or len(item["text"].strip()) < MIN_BATCH_TEXT_LENGTH:
+            singles.append([item])
+            continue
+        key = (item["ref_audio_path"], item["prompt_text"], item["prompt_lang"], item["text_lang"])
+        groups.setdefault(key, []).append(item)
+
+    batches = []
+    for items in groups.values():
+        # 길이가 비슷한 줄끼리 같은 배치에 들어가도록 정렬
+        items = sorted(items, key=lambda x: len(x["text"]))
+        for start in range(0, len(items), batch_size):
+            batches.append(items[start:start + batch_size])
+
+    return batches + singles
+
+
+def _silent_samples(audio, threshold_db=GAP_THRESHOLD_DB):
+    """threshold_db 보다 조용한 샘플 마스크 (정수 PCM 은 자료형의 최대값 기준)"""
+    audio = np.asarray(audio)
+    full_scale = np.iinfo(audio.dtype).max if np.issubdtype(audio.dtype, np.integer) else 1.0
+    return np.abs(audio.astype(np.float32)) <= full_scale * 10 ** (threshold_db / 20)
+
+
+def split_on_gaps(audio, sr, fragment_interval, expected, threshold_db=GAP_THRESHOLD_DB):
+    """audio_postprocess 가 조각마다 붙인 무음 구간으로 줄 단위 분할
+
+    무음은 threshold_db 이하의 에너지로 판단하고, fragment_interval 이상 이어진 구간만 경계로 본다.
+    경계 무음 (앞 줄 끝 / 다음 줄 시작의 조용한 부분 포함) 은 잘라 낸다. 개수가 맞지 않으면 None.
+    """
+    gap = int(sr * fragment_interval)
+    if gap <= 0:
+        return None
+
+    audio = np.asarray(audio)
+    silent = np.concatenate(([False], _silent_samples(audio, threshold_db), [False]))
+    edges = np.flatnonzero(np.diff(silent.astype(np.int8)))
+    starts, ends = edges[0::2], edges[1::2]
+    long_runs = (ends - starts) >= gap
+    starts, ends = starts[long_runs], ends[long_runs]
+
+    # 각 줄 뒤에 무음이 하나씩 붙으므로 정확히 expected 개여야 함
+    if len(starts) != expected:
+        return None
+
+    pieces = []
+    prev = 0
+    for start, end in zip(starts, ends):
+        pieces.append(audio[prev:start])
+        prev = end
+    return pieces
+
+
+def _collect(result):
+    """inference 결과(제너레이터 또는 튜플)를 (sr, audio) 로 정리"""
+    if isinstance(result, tuple):
+        return result
+    sr, pieces = None, []
+    for sr, chunk in result:
+        pieces.append(np.asarray(chunk))
+    return sr, np.concatenate(pieces) if pieces else np.zeros(0, dtype=np.int16)
+
+
+def make_tts_batch_fn(tts, params=None):
+    """TTS 파이프라인 객체로 배치 하나를 합성해 줄별 오디오 목록을 반환하는 함수 생성"""
+    params = dict(DEFAULT_INFERENCE_PARAMS, **(params or {}))
+
+    def run(texts, first):
+        return _collect(tts.inference(
+            text="\n".join(texts),
+            text_lang=first["text_lang"],
+            ref_audio_path=first["ref_audio_path"],
+            aux_ref_audio_paths=[],
+            prompt_text=first["prompt_text"],
+            prompt_lang=first["prompt_lang"],
+            text_split_method="cut0",
+            batch_size=len(texts),
+            return_fragment=False,
+            **params
+        ))
+
+    def synthesize_batch(batch):
+        texts = [item["text"] for item in batch]
+        sr, audio = run(texts, batch[0])
+        if len(batch) > 1:
+            pieces = split_on_gaps(audio, sr, params["fragment_interval"], len(batch))
+            if pieces is not None:
+                return sr, pieces
+            # 경계를 찾지 못하면 줄 단위로 다시 합성 (배치 합성과 샘플링이 달라 음성 자체는 달라질 수 있음)
+            print(f"    ⚠️ 배치 분할 실패 - {len(batch)}개 줄을 개별 합성")
+            results = [run([item["text"]], item) for item in batch]
+            return results[0][0], [_trim_gap(a, sr, params["fragment_interval"]) for _, a in results]
+        return sr, [_trim_gap(audio, sr, params["fragment_interval"])]
+
+    return synthesize_batch
+
+
+def _trim_gap(audio, sr, fragment_interval):
+    """단일 줄 결과 끝에 붙은 fragment_interval 무음 제거"""
+    gap = int(sr * fragment_interval)
+    if gap > 0 and len(audio) >= gap and _silent_samples(audio[-gap:]).all():
+        return audio[:-gap]
+    return audio
+
+
+def render_dialogue_batched(lines, synthesize_batch, output_dir, batch_size=4):
+    """배치 계획대로 합성하고 결과를 원래 순서의 줄별 파일로 저장"""
+    os.makedirs(output_dir, exist_ok=True)
+    batches = plan_batches(lines, batch_size=batch_size)
+    print(f"📦 {sum(len(b) for b in batches)}개 줄 -> {len(batches)}개 추론 호출")
+
+    outputs = {}
+    for n, batch in enumerate(batches, 1):
+        print(f"🎤 배치 {n}/{len(batches)} ({len(batch)}줄, {batch[0]['text_lang']})")
+        try:
+            sr, pieces = synthesize_batch(batch)
+        except Exception as e:
+            print(f"    ❌ 배치 합성 실패: {e}")
+            continue
+        for item, audio in zip(batch, pieces):
+            filename = f"{item['index']:02d}_{item['speaker']}_{item['emotion']}.wav"
+            path = os.path.join(output_dir, filename)
+            sf.write(path, audio, sr)
+            outputs[item["index"]] = path
+
+    # 원래 스크립트 순서로 반환
+    return [outputs[i] for i in sorted(outputs)]
+
+
+def print_plan(batches):
+    """배치 계획 출력"""
+    for n, batch in enumerate(batches, 1):
+        indices = ", ".join(str(item["index"]) for item in batch)
+        print(f"   배치 {n:2d} [{batch[0]['text_lang']}] {len(batch)}줄: {indices}")
+
+
+def main():
+    print("🎭 대화 배치 플래너 🎭\n")
+
+    from test_tdm_llj_script import SCRIPT_LINES
+
+    batches = plan_batches(SCRIPT_LINES)
+    print(f"📋 {len(SCRIPT_LINES)}개 줄 -> {len(batches)}개 배치")
+    print_plan(batches)
+
+    try:
+        from TTS_infer_pack.TTS import TTS, TTS_Config
+    except ImportError as e:
+        print(f"\n❌ TTS 모듈 임포트 실패: {e}")
+        print("GPT_SoVITS/TTS_infer_pack 이 있는 환경에서 실행해주세요.")
+        return
+
+    from cpu_quantization import apply_configured_quantization
+
+    tts = TTS(TTS_Config("GPT_SoVITS/configs/tts_infer.yaml"))
+    apply_configured_quantization(tts)
+
+    # autotune_tts 로 이 노드에 맞춘 설정이 있으면 사용
+    from autotune_tts import load_tuned_profile
+
+    tuned = load_tuned_profile() or {}
+    batch_size = tuned.get("batch_size", 4)
+    params = {k: tuned[k] for k in ("batch_threshold", "split_bucket") if k in tuned}
+    if tuned:
+        print(f"🎛️ 튜닝 설정 사용: batch_size={batch_size} {params}")
+
+    files = render_dialogue_batched(SCRIPT_LINES, make_tts_batch_fn(tts, params), "batched_tts_output",
+                                    batch_size=batch_size)
+
+    print(f"\n🎉 생성 완료: {len(files)}/{len(SCRIPT_LINES)}개")
+    for path in files[:10]:
+        print(f"   - {path}")
+
+
+if __name__ == "__main__":
+    main()
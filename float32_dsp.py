@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+할당 없는 float32 음성 변형 경로 - 미리 잡아 둔 작업 버퍼를 재사용하는 선형 보간 리샘플링과 제자리 볼륨 / 클리핑
+
+np.interp (float64) -> 곱셈 -> np.clip 은 단계마다 전체 길이 배열을 새로 만든다.
+여기서는 블록 단위로 보간해 작업 버퍼가 캐시 안에 머물고, 출력 버퍼도 재사용할 수 있다.
+"""
+
+import argparse
+import threading
+import time
+import tracemalloc
+
+import numpy as np
+
+DEFAULT_BLOCK = 8192
+
+
+class Float32Resampler:
+    """np.interp(np.linspace(0, n-1, m), np.arange(n), x) 와 같은 선형 보간을 float32 로 계산
+
+    작업 버퍼는 블록 크기로 한 번만 잡고, 출력 버퍼는 호출마다 넘겨 재사용한다.
+    스레드 간에 공유하지 않는다 (스레드마다 하나씩, get_resampler 참고).
+    """
+
+    def __init__(self, block=DEFAULT_BLOCK):
+        self.block = block
+        self.ramp = np.arange(block, dtype=np.float64)
+        self.pos = np.empty(block, dtype=np.float64)
+        self.floor = np.empty(block, dtype=np.float64)
+        self.idx0 = np.empty(block, dtype=np.intp)
+        self.idx1 = np.empty(block, dtype=np.intp)
+        self.frac = np.empty(block, dtype=np.float32)
+        self.a = np.empty(block, dtype=np.float32)
+        self.b = np.empty(block, dtype=np.float32)
+        self.out = np.empty(0, dtype=np.float32)
+
+    def output_buffer(self, frames):
+        """재사용하는 출력 버퍼 (모자랄 때만 늘림)"""
+        if len(self.out) < frames:
+            self.out = np.empty(frames, dtype=np.float32)
+        return self.out[:frames]
+
+    def resample(self, x, new_length, out=None):
+        """x 를 new_length 샘플로 선형 보간 (out 이 없으면 새 배열)"""
+        n = len(x)
+        if out is None:
+            out = np.empty(new_length, dtype=np.float32)
+        if new_length == 0 or n == 0:
+            out[:] = 0.0
+            return out
+        step = (n - 1) / (new_length - 1) if new_length > 1 else 0.0
+
+        for start in range(0, new_length, self.block):
+            m = min(self.block, new_length - start)
+            pos, floor = self.pos[:m], self.floor[:m]
+            idx0, idx1, frac = self.idx0[:m], self.idx1[:m], self.frac[:m]
+            a, b = self.a[:m], self.b[:m]
+
+            # 위치 = (start + k) * step, 정수부 / 소수부로 분리
+            np.add(self.ramp[:m], start, out=pos)
+            np.multiply(pos, step, out=pos)
+            np.floor(pos, out=floor)
+            np.copyto(idx0, floor, casting="unsafe")
+            np.subtract(pos, floor, out=pos)
+            np.copyto(frac, pos, casting="same_kind")
+            np.add(idx0, 1, out=idx1)
+            np.minimum(idx1, n - 1, out=idx1)
+
+            # out = a + (b - a) * frac
+            np.take(x, idx0, out=a)
+            np.take(x, idx1, out=b)
+            np.subtract(b, a, out=b)
+            np.multiply(b, frac, out=b)
+            np.add(a, b, out=out[start:start + m])
+        return out
+
+
+def scale_clip_(audio, gain, limit=1.0):
+    """제자리 볼륨 조절 + 클리핑"""
+    if gain != 1.0:
+        np.multiply(audio, np.float32(gain), out=audio)
+    np.clip(audio, -limit, limit, out=audio)
+    return audio
+
+
+_local = threading.local()
+
+
+def get_resampler():
+    """현재 스레드 전용 리샘플러 (작업 버퍼 재사용)"""
+    resampler = getattr(_local, "resampler", None)
+    if resampler is None:
+        resampler = _local.resampler = Float32Resampler()
+    return resampler
+
+
+def speed_volume_transform(audio_ref, speed_factor, volume_factor, reuse=False):
+    """dialogue_tts 변형 (속도 리샘플링 + 볼륨 + 클리핑) 의 float32 버전
+
+    reuse=True 면 스레드 전용 출력 버퍼를 돌려주므로 다음 호출 전에 써야 한다.
+    """
+    x = np.asarray(audio_ref, dtype=np.float32)
+    resampler = get_resampler()
+    new_length = int(len(x) / speed_factor)
+    audio = resampler.resample(x, new_length, resampler.output_buffer(new_length) if reuse else None)
+    return scale_clip_(audio, volume_factor)
+
+
+def _legacy_transform(audio_ref, speed_factor, volume_factor):
+    """기존 float64 경로 (비교 기준)"""
+    new_length = int(len(audio_ref) / speed_factor)
+    indices = np.linspace(0, len(audio_ref)-1, new_length)
+    modified_audio = np.interp(indices, np.arange(len(audio_ref)), audio_ref)
+    modified_audio = modified_audio * volume_factor
+    return np.clip(modified_audio, -1.0, 1.0)
+
+
+def _measure(fn, lines, repeat):
+    """줄마다 fn 실행: (줄당 시간, 최대 추가 메모리)"""
+    fn(*lines[0])  # 버퍼 준비 / 워밍업
+    tracemalloc.start()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for args in lines:
+            fn(*args)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed / (repeat * len(lines)), peak
+
+
+def benchmark(ref_seconds=10.0, sr=32000, repeat=3):
+    """dialogue_tts 대화의 계수로 기존 경로와 float32 경로 비교"""
+    import dialogue_tts
+
+    rng = np.random.default_rng(0)
+    ref64 = rng.uniform(-0.9, 0.9, int(ref_seconds * sr))
+    ref32 = ref64.astype(np.float32)
+    factors = [dialogue_tts.voice_factors(character, emotion)[1:] for character, _, emotion in dialogue_tts.DIALOGUE]
+
+    def fast(speed, volume):
+        return speed_volume_transform(ref32, speed, volume, reuse=True)
+
+    legacy_time, legacy_peak = _measure(lambda s, v: _legacy_transform(ref64, s, v), factors, repeat)
+    fast_time, fast_peak = _measure(fast, factors, repeat)
+
+    error = max(float(np.abs(_legacy_transform(ref64, s, v) - speed_volume_transform(ref32, s, v)).max())
+                for s, v in factors)
+    return {
+        "legacy": {"seconds_per_line": legacy_time, "peak_bytes": legacy_peak},
+        "float32": {"seconds_per_line": fast_time, "peak_bytes": fast_peak},
+        "max_abs_error": error,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="float32 재사용 버퍼 음성 변형 벤치마크")
+    parser.add_argument("--ref-seconds", type=float, default=10.0, help="참조 음성 길이 (초)")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print("🧮 float32 음성 변형 경로 벤치마크 🧮\n")
+    result = benchmark(args.ref_seconds, repeat=args.repeat)
+    for name, label in (("legacy", "기존 float64"), ("float32", "float32 재사용 버퍼")):
+        r = result[name]
+        print(f"⏱️ {label}: 줄당 {r['seconds_per_line'] * 1000:.2f}ms, 최대 메모리 {r['peak_bytes'] / 1e6:.2f}MB")
+    speedup = result["legacy"]["seconds_per_line"] / result["float32"]["seconds_per_line"]
+    print(f"\n🚀 {speedup:.2f}x, 최대 오차 {result['max_abs_error']:.2e} (16비트 1LSB = {1 / 32768:.1e})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+증분 재렌더링 / 감시 모드 - 바뀐 줄만 다시 합성하고 나머지 출력은 이름만 바꿔 재사용
+
+출력 폴더의 매니페스트에 줄별 내용 해시를 기록해 두고, 다음 실행에서 새 스크립트와 비교한다.
+같은 해시의 기존 파일은 다시 인코딩하지 않고 새 줄 번호 파일명으로 옮기며,
+어느 줄에도 쓰이지 않는 이전 출력은 지운다.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import time
+from collections import defaultdict
+
+MANIFEST_NAME = ".render_manifest.json"
+MANIFEST_VERSION = 1
+
+
+def line_hash(record, signature=""):
+    """줄 내용 + 렌더링 설정 서명으로 만든 해시"""
+    content = json.dumps([signature, record.speaker, record.text, record.lang, record.emotion],
+                         ensure_ascii=False)
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def file_signature(path):
+    """파일이 바뀌면 달라지는 서명 (참조 음성 교체 시 전체 재렌더링용)"""
+    stat = os.stat(path)
+    return f"{os.path.abspath(path)}:{stat.st_size}:{stat.st_mtime_ns}"
+
+
+def load_manifest(output_dir):
+    """이전 렌더링의 [{file, hash}] 목록 (없거나 형식이 다르면 빈 목록)"""
+    path = os.path.join(output_dir, MANIFEST_NAME)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return []
+    if manifest.get("version") != MANIFEST_VERSION:
+        return []
+    return manifest.get("lines", [])
+
+
+def save_manifest(output_dir, lines):
+    """매니페스트를 임시 파일에 쓴 뒤 교체"""
+    path = os.path.join(output_dir, MANIFEST_NAME)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"version": MANIFEST_VERSION, "lines": lines}, f, ensure_ascii=False, indent=1)
+    os.replace(tmp_path, path)
+
+
+def plan_sync(records, previous, output_dir, filename_fn, signature=""):
+    """새 스크립트와 이전 매니페스트 비교
+
+    반환: (줄 목록 [(번호, 레코드, 해시, 파일명)], 재사용 {번호: 기존 파일명}, 렌더링할 번호 목록, 지울 파일 목록)
+    """
+    available = defaultdict(list)
+    for entry in previous:
+        if entry.get("hash") and os.path.exists(os.path.join(output_dir, entry["file"])):
+            available[entry["hash"]].append(entry["file"])
+
+    lines, reuse, render = [], {}, []
+    for i, record in enumerate(records, 1):
+        h = line_hash(record, signature)
+        name = filename_fn(i, record)
+        lines.append((i, record, h, name))
+        candidates = available.get(h)
+        if candidates:
+            # 같은 내용이 여러 줄이면 이미 같은 이름인 파일을 우선 사용 (이동 없음)
+            source = name if name in candidates else candidates[0]
+            candidates.remove(source)
+            reuse[i] = source
+        else:
+            render.append(i)
+
+    orphans = [name for names in available.values() for name in names]
+    return lines, reuse, render, orphans
+
+
+def apply_relinks(output_dir, reuse, lines):
+    """재사용 파일을 새 파일명으로 이동 (이름이 서로 겹쳐도 안전하게 임시 이름을 거침)"""
+    targets = {i: name for i, _, _, name in lines}
+    moves = [(i, source) for i, source in reuse.items() if source != targets[i]]
+    staged = []
+    for i, source in moves:
+        tmp_name = f".relink-{i}-{source}"
+        os.replace(os.path.join(output_dir, source), os.path.join(output_dir, tmp_name))
+        staged.append((tmp_name, targets[i]))
+    return staged
+
+
+def sync_outputs(records, output_dir, filename_fn, render, signature=""):
+    """스크립트와 출력 폴더를 맞춤
+
+    render(jobs) 는 [(번호, 레코드, 파일 경로)] 를 받아 (번호, 오류) 를 내는 제너레이터.
+    반환: 재사용 / 이동 / 렌더링 / 실패 / 삭제 수
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    # 이전 실행이 이동 도중 중단되어 남은 임시 파일 정리 (매니페스트에 없으므로 재사용되지 않음)
+    for name in os.listdir(output_dir):
+        if name.startswith(".relink-"):
+            os.remove(os.path.join(output_dir, name))
+    previous = load_manifest(output_dir)
+    lines, reuse, to_render, orphans = plan_sync(records, previous, output_dir, filename_fn, signature)
+    by_index = {i: (record, h, name) for i, record, h, name in lines}
+
+    # 파일을 옮기거나 지우기 전에 매니페스트에서 옮길 파일과 옮겨 갈 자리를 먼저 뺌
+    # -> 도중에 중단돼도 (감시 모드의 Ctrl+C) 다음 실행이 내용이 바뀐 파일을 재사용하지 않음
+    touched = set()
+    for i, source in reuse.items():
+        if source != by_index[i][2]:
+            touched.update((source, by_index[i][2]))
+    save_manifest(output_dir, [entry for entry in previous if entry["file"] not in touched])
+
+    # 1) 옮길 파일을 임시 이름으로 비킴 -> 2) 고아 파일 삭제 -> 3) 새 이름으로 배치
+    staged = apply_relinks(output_dir, reuse, lines)
+    for name in orphans:
+        try:
+            os.remove(os.path.join(output_dir, name))
+        except FileNotFoundError:
+            pass
+    for tmp_name, name in staged:
+        os.replace(os.path.join(output_dir, tmp_name), os.path.join(output_dir, name))
+
+    # 배치가 끝난 상태 기록: 렌더링할 줄은 해시 없이 (렌더링 중 중단되면 다음 실행에서 다시 렌더링)
+    pending = set(to_render)
+    save_manifest(output_dir, [{"file": name, "hash": None if i in pending else h}
+                               for i, _, h, name in lines])
+
+    jobs = [(i, by_index[i][0], os.path.join(output_dir, by_index[i][2])) for i in to_render]
+    failed = set()
+    for i, error in render(jobs):
+        if error is not None:
+            failed.add(i)
+            print(f"   ❌ {i:2d}. {by_index[i][0].speaker}: {error}")
+
+    # 실패한 줄은 해시 없이 기록 -> 다음 실행에서 다시 렌더링
+    save_manifest(output_dir, [{"file": name, "hash": None if i in failed else h}
+                               for i, _, h, name in lines])
+    return {
+        "lines": len(lines),
+        "reused": len(reuse),
+        "moved": len(staged),
+        "rendered": len(to_render) - len(failed),
+        "failed": len(failed),
+        "removed": len(orphans),
+    }
+
+
+def dialogue_target(workers=1):
+    """dialogue_tts 의 로컬 음성 변형 렌더러"""
+    import dialogue_tts
+    from sharded_render import render_lines
+
+    audio_ref, sr = dialogue_tts.load_reference()
+    signature = file_signature(dialogue_tts.REF_AUDIO_PATH) + f":{dialogue_tts.REF_SECONDS}"
+
+    def filename_fn(i, record):
+        return dialogue_tts.line_filename(i, record.speaker, record.emotion)
+
+    def render(jobs):
+        tasks = ((os.path.dirname(path), i, record.speaker, record.text, record.emotion)
+                 for i, record, path in jobs)
+        for _, args, _, error in render_lines(dialogue_tts.render_line, audio_ref, sr, tasks, workers):
+            yield args[1], error
+
+    return "character_dialogue_output", filename_fn, render, signature, dialogue_tts.DIALOGUE
+
+
+def api_target(endpoint):
+    """simple_tts_request 의 v2 API 렌더러"""
+    import simple_tts_request
+    from tts_traffic import post_tts
+
+    template = simple_tts_request.build_tts_data("")
+    signature = json.dumps(dict(template, text=None), sort_keys=True)
+
+    def filename_fn(i, record):
+        return f"{i:02d}_{record.speaker}_{record.emotion}.wav"
+
+    def render(jobs):
+        for i, record, path in jobs:
+            try:
+                response = post_tts(endpoint, dict(template, text=record.text, text_lang=record.lang),
+                                    timeout=20)
+                response.raise_for_status()
+                tmp_path = path + ".tmp"
+                with open(tmp_path, "wb") as f:
+                    f.write(response.content)
+                os.replace(tmp_path, path)
+                yield i, None
+            except Exception as e:
+                yield i, e
+
+    return "api_generated_tts_output", filename_fn, render, signature, simple_tts_request.DIALOGUE
+
+
+def run_once(target, script_path, output_dir=None):
+    """한 번 동기화하고 결과 출력"""
+    from script_loader import load_records
+
+    default_dir, filename_fn, render, signature, dialogue = target
+    output_dir = output_dir or default_dir
+    start = time.perf_counter()
+    stats = sync_outputs(load_records(script_path, dialogue), output_dir, filename_fn, render, signature)
+    elapsed = time.perf_counter() - start
+    print(f"🔄 {stats['lines']}줄: 재사용 {stats['reused']} (이동 {stats['moved']}), "
+          f"렌더링 {stats['rendered']}, 실패 {stats['failed']}, 삭제 {stats['removed']} "
+          f"- {elapsed:.2f}초")
+    return stats
+
+
+def watch(target, script_path, output_dir=None, interval=1.0):
+    """스크립트 파일이 바뀔 때마다 증분 렌더링 (Ctrl+C 로 종료)"""
+    print(f"👀 감시 중: {script_path} (Ctrl+C 로 종료)")
+    last = None
+    try:
+        while True:
+            try:
+                mtime = os.stat(script_path).st_mtime_ns
+            except FileNotFoundError:
+                mtime = None
+            if mtime is not None and mtime != last:
+                last = mtime
+                try:
+                    run_once(target, script_path, output_dir)
+                except ValueError as e:
+                    # 편집 중 잘못된 줄은 다음 저장 때 다시 시도
+                    print(f"⚠️ 스크립트 오류: {e}")
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        print("\n👋 감시 종료")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="바뀐 줄만 다시 합성하는 증분 렌더링")
+    parser.add_argument("--target", choices=["dialogue", "api"], default="dialogue",
+                        help="dialogue: dialogue_tts 로컬 변형, api: TTS API 서버")
+    parser.add_argument("--script", help="CSV / JSONL 대화 스크립트 (없으면 코드의 대화 목록)")
+    parser.add_argument("--output-dir")
+    parser.add_argument("--endpoint", default="http://127.0.0.1:9880/tts")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--watch", action="store_true", help="스크립트 파일 변경 감시")
+    parser.add_argument("--interval", type=float, default=1.0)
+    args = parser.parse_args()
+
+    if args.target == "dialogue":
+        target = dialogue_target(args.workers)
+    else:
+        target = api_target(args.endpoint)
+
+    if args.watch:
+        if not args.script:
+            parser.error("--watch 에는 --script 가 필요합니다")
+        watch(target, args.script, args.output_dir, args.interval)
+    else:
+        run_once(target, args.script, args.output_dir)
+
+
+if __name__ == "__main__":
+    main()
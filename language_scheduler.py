@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+언어 / 참조 음성별 묶음 실행 스케줄러 - 실행 순서만 바꾸고 출력은 스크립트 순서 유지
+"""
+
+import argparse
+import time
+from collections import OrderedDict
+
+from timeline_assembler import assemble_timeline
+
+
+def group_key(line, default_ref=None):
+    """같이 실행할 줄의 키: (언어, 참조 음성)"""
+    return line.get("lang", "ko"), line.get("ref_audio_path", default_ref)
+
+
+def schedule_order(lines, default_ref=None):
+    """언어 / 참조가 같은 줄끼리 모은 실행 순서 (0 기반 인덱스, 그룹은 처음 등장한 순서)"""
+    groups = OrderedDict()
+    for index, line in enumerate(lines):
+        groups.setdefault(group_key(line, default_ref), []).append(index)
+    return [index for indices in groups.values() for index in indices]
+
+
+def count_switches(lines, order, default_ref=None):
+    """주어진 실행 순서에서 언어 / 참조가 바뀌는 횟수"""
+    keys = [group_key(lines[i], default_ref) for i in order]
+    return sum(1 for a, b in zip(keys, keys[1:]) if a != b)
+
+
+def run_grouped(lines, synthesize, default_ref=None):
+    """묶음 순서로 synthesize(index, line) 을 실행하고 결과를 스크립트 순서 목록으로 반환"""
+    results = [None] * len(lines)
+    for index in schedule_order(lines, default_ref):
+        results[index] = synthesize(index, lines[index])
+    return results
+
+
+def stitch_in_script_order(paths, output_path, gap_seconds=0.3):
+    """줄별 파일을 스크립트 순서대로 이어붙인 타임라인 생성 (없는 줄은 건너뜀, 블록 단위 스트리밍)"""
+    cues = assemble_timeline(((path, "", "") for path in paths), output_path, gap_seconds)
+    return output_path if cues else None
+
+
+def interleave_languages(lines):
+    """언어 블록을 한 줄씩 번갈아 섞은 다국어 스크립트 (더빙 대본 형태의 측정용)"""
+    blocks = OrderedDict()
+    for line in lines:
+        blocks.setdefault(line.get("lang", "ko"), []).append(line)
+    mixed = []
+    for i in range(max(len(b) for b in blocks.values())):
+        mixed.extend(block[i] for block in blocks.values() if i < len(block))
+    return mixed
+
+
+def measure_gain(lines, url=None, ref_audio="ref.wav", switch_penalty=0.15, latency=0.05):
+    """스크립트 순서 실행과 묶음 실행의 처리량 측정
+
+    url 이 있으면 그 서버 (실제 모델) 에서 측정하고, 없으면 스텁 서버에서 실행한다.
+    스텁의 시간 차이는 전환 횟수 x switch_penalty (가정값) 로 정해지므로 이득의 측정이 아니다.
+    """
+    from test_tdm_llj_script import generate_tts
+    from tts_stub_server import start_stub_server
+
+    results = {}
+    for name, order in (("script", list(range(len(lines)))), ("grouped", schedule_order(lines, ref_audio))):
+        server = None
+        if url is None:
+            server, base_url = start_stub_server(latency=f"fixed:{latency}", switch_penalty=switch_penalty)
+        else:
+            base_url = url
+        start = time.perf_counter()
+        ok = 0
+        for index in order:
+            ok += generate_tts(lines[index]["text"], ref_audio, lines[index]["lang"], api_base_url=base_url) is not None
+        elapsed = time.perf_counter() - start
+        if server:
+            server.shutdown()
+        results[name] = {"seconds": elapsed, "throughput": len(lines) / elapsed, "ok": ok,
+                         "switches": count_switches(lines, order, ref_audio)}
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="언어별 묶음 실행의 처리량 측정 (--url 이 없으면 스텁 서버로 배선만 확인)")
+    parser.add_argument("--url", help="측정할 TTS 서버 (예: http://127.0.0.1:9880), 없으면 스텁 서버")
+    parser.add_argument("--ref", default="ref.wav", help="서버에서 읽을 수 있는 참조 음성 경로")
+    parser.add_argument("--switch-penalty", type=float, default=0.15, help="스텁의 언어 전환 비용 (초, 가정값)")
+    parser.add_argument("--latency", type=float, default=0.05, help="스텁의 줄당 기본 합성 시간 (초)")
+    args = parser.parse_args()
+
+    from test_tdm_llj_script import SCRIPT_LINES
+
+    print("🌐 언어별 묶음 실행 측정 🌐\n")
+    before = count_switches(SCRIPT_LINES, range(len(SCRIPT_LINES)), args.ref)
+    after = count_switches(SCRIPT_LINES, schedule_order(SCRIPT_LINES, args.ref), args.ref)
+    note = " (이미 언어별로 묶여 있어 순서가 바뀌지 않음)" if before == after else ""
+    print(f"📝 기본 스크립트 {len(SCRIPT_LINES)}줄: 전환 {before}회 -> 묶음 실행 {after}회{note}")
+
+    lines = interleave_languages(SCRIPT_LINES)
+    print(f"📝 다국어 혼합 스크립트: {len(lines)}줄 "
+          f"(언어 순서: {' '.join(line['lang'] for line in lines[:9])} ...)")
+    if args.url:
+        print(f"🔗 서버: {args.url}\n")
+    else:
+        print(f"🧪 스텁 서버: 줄당 {args.latency:.2f}초, 전환 시 +{args.switch_penalty:.2f}초 (가정값)\n")
+
+    results = measure_gain(lines, args.url, args.ref, args.switch_penalty, args.latency)
+    for name, label in (("script", "스크립트 순서"), ("grouped", "언어별 묶음")):
+        r = results[name]
+        print(f"⏱️ {label}: {r['seconds']:.2f}초, {r['throughput']:.2f} 줄/s, 전환 {r['switches']}회, "
+              f"성공 {r['ok']}/{len(lines)}")
+
+    if not args.url:
+        print("\n💡 스텁의 시간 차이는 전환 횟수 x 가정한 전환 비용이라 속도 향상 수치가 아닙니다.")
+        print("   실제 이득은 --url 로 모델 서버에서 측정하세요.")
+    elif all(r["ok"] == len(lines) for r in results.values()):
+        gain = results["grouped"]["throughput"] / results["script"]["throughput"]
+        print(f"\n🚀 처리량 향상 (측정): {gain:.2f}x")
+    else:
+        print("\n⚠️ 실패한 요청이 있어 처리량을 비교하지 않습니다.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,358 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+SQLite 임대(lease) 작업 큐 기반 분산 스크립트 렌더링
+
+스크립트를 줄 단위 작업으로 DB 에 넣고, 여러 워커 프로세스 (같은 노드 또는 공유 파일시스템을
+쓰는 여러 노드) 가 만료 시간이 있는 임대로 작업을 가져가 처리한다. 만료된 임대는 다른 워커가
+회수하고, 결과 파일은 임시 파일에 쓴 뒤 임대 소유를 확인하고 os.replace 로 원자적으로 커밋한다.
+
+임대 만료는 각 노드의 벽시계 (time.time) 로 판단하므로 노드 간 시계가 NTP 등으로 맞춰져 있다고
+가정한다. 남은 오차는 skew_seconds 만큼 늦게 회수하는 것으로 흡수한다 (lease_seconds 보다 작게).
+WAL 은 공유 메모리 파일이 필요해 네트워크 파일시스템에서는 동작하지 않으므로 롤백 저널 (DELETE) 을 쓴다.
+"""
+
+import argparse
+import json
+import multiprocessing as mp
+import os
+import random
+import socket
+import sqlite3
+import threading
+import time
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    script TEXT NOT NULL,
+    line_no INTEGER NOT NULL,
+    payload TEXT NOT NULL,
+    output_path TEXT NOT NULL,
+    state TEXT NOT NULL DEFAULT 'pending',
+    owner TEXT,
+    lease_expires REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    updated REAL,
+    UNIQUE (script, line_no)
+);
+CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state, lease_expires);
+"""
+
+
+class LeaseQueue:
+    """SQLite 파일 하나로 공유되는 임대 작업 큐"""
+
+    def __init__(self, db_path, lease_seconds=30.0, max_attempts=3, skew_seconds=5.0):
+        self.db_path = db_path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        # 다른 노드의 시계가 이만큼 늦어도 아직 살아 있는 임대를 빼앗지 않음
+        self.skew_seconds = skew_seconds
+        # 트랜잭션은 직접 BEGIN IMMEDIATE 로 관리
+        # 연장 (heartbeat) 스레드도 같은 연결을 쓰므로 스레드 검사를 끄고 모든 접근을 self.lock 으로 직렬화
+        self.conn = sqlite3.connect(db_path, timeout=30.0, isolation_level=None, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=DELETE")
+        self.conn.executescript(SCHEMA)
+        self.lock = threading.Lock()
+
+    def _transaction(self):
+        """쓰기 잠금을 먼저 잡는 트랜잭션 (claim 경쟁 방지)"""
+        return _Transaction(self.conn, self.lock)
+
+    def enqueue(self, script, lines, output_dir):
+        """스크립트 줄을 작업으로 등록 (이미 있는 줄은 그대로 두므로 다시 실행해도 안전)"""
+        now = time.time()
+        rows = []
+        for line_no, line in enumerate(lines, 1):
+            filename = f"{line_no:02d}_{line['speaker']}_{line.get('emotion', line.get('lang', 'ko'))}.wav"
+            rows.append((script, line_no, json.dumps(line, ensure_ascii=False),
+                         os.path.join(output_dir, filename), now))
+        with self._transaction() as cur:
+            before = self.conn.total_changes
+            cur.executemany("INSERT OR IGNORE INTO jobs (script, line_no, payload, output_path, updated) "
+                            "VALUES (?, ?, ?, ?, ?)", rows)
+            return self.conn.total_changes - before
+
+    def claim(self, owner):
+        """대기 중이거나 임대가 만료된 작업 하나를 임대 (없으면 None)"""
+        now = time.time()
+        expired = now - self.skew_seconds
+        with self._transaction() as cur:
+            # 재시도를 다 쓴 채 만료된 작업 (매번 워커를 죽이는 줄) 은 실패 처리
+            cur.execute("UPDATE jobs SET state = 'failed', error = 'lease expired', updated = ? "
+                        "WHERE state = 'leased' AND lease_expires < ? AND attempts >= ?",
+                        (now, expired, self.max_attempts))
+            row = cur.execute(
+                "SELECT * FROM jobs WHERE attempts < ? AND "
+                "(state = 'pending' OR (state = 'leased' AND lease_expires < ?)) "
+                "ORDER BY script, line_no LIMIT 1", (self.max_attempts, expired)).fetchone()
+            if row is None:
+                return None
+            cur.execute("UPDATE jobs SET state = 'leased', owner = ?, lease_expires = ?, "
+                        "attempts = attempts + 1, updated = ? WHERE id = ?",
+                        (owner, now + self.lease_seconds, now, row["id"]))
+        job = dict(row)
+        job["owner"] = owner
+        job["payload"] = json.loads(job["payload"])
+        return job
+
+    def heartbeat(self, job, extend=None):
+        """임대 연장. 이미 다른 워커에게 넘어갔으면 False"""
+        now = time.time()
+        with self._transaction() as cur:
+            cur.execute("UPDATE jobs SET lease_expires = ?, updated = ? "
+                        "WHERE id = ? AND owner = ? AND state = 'leased'",
+                        (now + (extend or self.lease_seconds), now, job["id"], job["owner"]))
+            return cur.rowcount == 1
+
+    def complete(self, job, data):
+        """결과를 임시 파일에 쓰고, 임대를 아직 가지고 있을 때만 원자적으로 커밋"""
+        output_path = job["output_path"]
+        os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+        tmp_path = f"{output_path}.{job['owner']}.{job['attempts']}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+
+        with self._transaction() as cur:
+            owned = cur.execute("SELECT 1 FROM jobs WHERE id = ? AND owner = ? AND state = 'leased'",
+                                (job["id"], job["owner"])).fetchone()
+            if not owned:
+                os.remove(tmp_path)
+                return False
+            # DB 쓰기 잠금을 잡은 상태에서 파일 교체 -> 다른 워커의 커밋과 겹치지 않음
+            os.replace(tmp_path, output_path)
+            cur.execute("UPDATE jobs SET state = 'done', lease_expires = NULL, error = NULL, updated = ? "
+                        "WHERE id = ?", (time.time(), job["id"]))
+        return True
+
+    def fail(self, job, error):
+        """실패 기록: 재시도 횟수가 남았으면 다시 대기 상태로"""
+        with self._transaction() as cur:
+            cur.execute("UPDATE jobs SET state = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+                        "owner = NULL, lease_expires = NULL, error = ?, updated = ? "
+                        "WHERE id = ? AND owner = ?",
+                        (self.max_attempts, str(error), time.time(), job["id"], job["owner"]))
+
+    def status(self, script=None):
+        """상태별 작업 수 (만료된 임대는 expired 로 따로 셈)"""
+        now = time.time() - self.skew_seconds
+        query = ("SELECT CASE WHEN state = 'leased' AND lease_expires < ? THEN 'expired' ELSE state END AS s, "
+                 "COUNT(*) AS n FROM jobs")
+        params = [now]
+        if script:
+            query += " WHERE script = ?"
+            params.append(script)
+        with self.lock:
+            rows = self.conn.execute(query + " GROUP BY s", params).fetchall()
+        return {row["s"]: row["n"] for row in rows}
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+class _Transaction:
+    """BEGIN IMMEDIATE ... COMMIT / ROLLBACK 컨텍스트"""
+
+    def __init__(self, conn, lock):
+        self.conn = conn
+        self.lock = lock
+
+    def __enter__(self):
+        self.lock.acquire()
+        try:
+            self.conn.execute("BEGIN IMMEDIATE")
+            return self.conn.cursor()
+        except BaseException:
+            # BEGIN 이 실패하면 __exit__ 가 불리지 않으므로 여기서 잠금을 풀어야 다음 호출이 멈추지 않음
+            self.lock.release()
+            raise
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+        finally:
+            self.lock.release()
+        return False
+
+
+def default_owner():
+    """노드 + 프로세스 식별자"""
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+def run_worker(queue, synthesize, owner=None, idle_exit=True, poll_seconds=1.0):
+    """작업을 임대해 합성하고 커밋하는 워커 루프. 처리한 작업 수 반환"""
+    owner = owner or default_owner()
+    processed = 0
+    while True:
+        job = queue.claim(owner)
+        if job is None:
+            if idle_exit:
+                return processed
+            time.sleep(poll_seconds)
+            continue
+
+        # 합성이 길어져도 임대가 만료되지 않도록 주기적으로 연장
+        stop = threading.Event()
+
+        def keep_alive():
+            while not stop.wait(queue.lease_seconds / 3):
+                if not queue.heartbeat(job):
+                    return
+
+        heartbeat = threading.Thread(target=keep_alive, daemon=True)
+        heartbeat.start()
+        try:
+            data = synthesize(job["payload"])
+        except Exception as e:
+            data, error = None, e
+        finally:
+            # 실패해도 연장 스레드를 끝까지 기다림 (fail 뒤에 늦은 heartbeat 가 끼어들지 않게)
+            stop.set()
+            heartbeat.join()
+        if data is None:
+            queue.fail(job, error)
+            print(f"   ❌ [{owner}] {job['script']}#{job['line_no']}: {error}")
+            continue
+
+        if queue.complete(job, data):
+            processed += 1
+            print(f"   ✅ [{owner}] {job['script']}#{job['line_no']} -> {job['output_path']}")
+        else:
+            print(f"   ⚠️ [{owner}] {job['script']}#{job['line_no']}: 임대를 잃어 결과 폐기")
+
+
+def make_http_synthesizer(endpoint):
+    """v2 /tts 엔드포인트로 합성하는 함수"""
+    from simple_tts_request import build_tts_data
+    from tts_traffic import post_tts
+
+    def synthesize(line):
+        payload = build_tts_data(line["text"])
+        payload["text_lang"] = line.get("lang", "ko")
+        response = post_tts(endpoint, payload, timeout=60)
+        response.raise_for_status()
+        return response.content
+
+    return synthesize
+
+
+def make_stub_synthesizer(seconds=0.05, crash_rate=0.0):
+    """모델 없이 합성하는 함수 (crash_rate 확률로 프로세스가 죽어 노드 장애를 흉내)"""
+    from tts_stub_server import synth_audio, wav_bytes
+
+    def synthesize(line):
+        time.sleep(seconds)
+        if random.random() < crash_rate:
+            # 임대를 쥔 채로 죽음 -> 만료 후 다른 워커가 회수해야 함
+            os._exit(1)
+        return wav_bytes(synth_audio(line["text"]))
+
+    return synthesize
+
+
+def _simulated_node(db_path, node, lease_seconds, crash_rate, skew_seconds):
+    """시뮬레이션용 노드 프로세스"""
+    random.seed(os.getpid())
+    queue = LeaseQueue(db_path, lease_seconds=lease_seconds, skew_seconds=skew_seconds)
+    run_worker(queue, make_stub_synthesizer(crash_rate=crash_rate), owner=f"node{node}-{os.getpid()}")
+
+
+def simulate(db_path, nodes, lease_seconds, crash_rate, skew_seconds=5.0):
+    """여러 프로세스로 노드를 흉내내 모든 작업이 끝날 때까지 실행"""
+    queue = LeaseQueue(db_path, lease_seconds=lease_seconds, skew_seconds=skew_seconds)
+    rounds = 0
+    while True:
+        status = queue.status()
+        remaining = status.get("pending", 0) + status.get("leased", 0) + status.get("expired", 0)
+        if remaining == 0:
+            return status
+        if status.get("leased") and not status.get("pending") and not status.get("expired"):
+            # 죽은 노드의 임대가 만료되길 기다림
+            time.sleep(lease_seconds / 2)
+            continue
+        rounds += 1
+        print(f"\n🔁 라운드 {rounds}: 노드 {nodes}개 실행 (남은 작업 {remaining}개)")
+        processes = [mp.Process(target=_simulated_node, args=(db_path, n, lease_seconds, crash_rate, skew_seconds))
+                     for n in range(nodes)]
+        for p in processes:
+            p.start()
+        for p in processes:
+            p.join()
+        crashed = sum(p.exitcode != 0 for p in processes)
+        if crashed:
+            print(f"💥 노드 {crashed}개 비정상 종료")
+
+
+def load_lines(script_path=None):
+    """등록할 스크립트 (기본: simple_tts_request 대화)"""
+    if script_path:
+        with open(script_path, "r", encoding="utf-8") as f:
+            return [json.loads(line) for line in f if line.strip()]
+    from simple_tts_request import DIALOGUE
+    return [{"speaker": s, "text": t, "emotion": e} for s, t, e in DIALOGUE]
+
+
+def print_status(status):
+    """상태별 작업 수 출력"""
+    order = ("pending", "leased", "expired", "done", "failed")
+    print("📊 " + ", ".join(f"{name} {status.get(name, 0)}" for name in order))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SQLite 임대 큐 기반 분산 스크립트 렌더링")
+    parser.add_argument("--db", default="render_queue.sqlite3")
+    parser.add_argument("--lease-seconds", type=float, default=30.0)
+    parser.add_argument("--skew-seconds", type=float, default=5.0, help="노드 간 허용 시계 오차 (초)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("enqueue", help="스크립트를 줄 단위 작업으로 등록")
+    p.add_argument("--script-name", default="dialogue")
+    p.add_argument("--script", help="줄마다 {speaker, text, emotion, lang} JSON 인 파일")
+    p.add_argument("--output-dir", default="distributed_tts_output")
+
+    p = sub.add_parser("work", help="워커 실행")
+    p.add_argument("--endpoint", default="http://127.0.0.1:9880/tts")
+    p.add_argument("--stub", action="store_true", help="서버 없이 합성 음성 생성")
+    p.add_argument("--worker-id")
+    p.add_argument("--forever", action="store_true", help="작업이 없어도 계속 대기")
+
+    sub.add_parser("status", help="작업 상태")
+
+    p = sub.add_parser("simulate", help="여러 프로세스로 노드 시뮬레이션")
+    p.add_argument("--nodes", type=int, default=4)
+    p.add_argument("--crash-rate", type=float, default=0.1)
+    p.add_argument("--output-dir", default="distributed_tts_output")
+
+    args = parser.parse_args()
+    queue = LeaseQueue(args.db, lease_seconds=args.lease_seconds, skew_seconds=args.skew_seconds)
+
+    if args.command == "enqueue":
+        added = queue.enqueue(args.script_name, load_lines(args.script), args.output_dir)
+        print(f"📥 {args.script_name}: {added}개 작업 등록")
+        print_status(queue.status())
+
+    elif args.command == "work":
+        synthesize = make_stub_synthesizer() if args.stub else make_http_synthesizer(args.endpoint)
+        owner = args.worker_id or default_owner()
+        print(f"👷 워커 {owner} 시작")
+        processed = run_worker(queue, synthesize, owner, idle_exit=not args.forever)
+        print(f"🎉 {processed}개 작업 완료")
+
+    elif args.command == "status":
+        print_status(queue.status())
+
+    elif args.command == "simulate":
+        added = queue.enqueue("simulation", load_lines() * 3, args.output_dir)
+        print(f"📥 시뮬레이션 작업 {added}개 등록 (노드 {args.nodes}개, 장애율 {args.crash_rate:.0%})")
+        print_status(simulate(args.db, args.nodes, args.lease_seconds, args.crash_rate, args.skew_seconds))
+
+
+if __name__ == "__main__":
+    main()
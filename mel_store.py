@@ -0,0 +1,342 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+로그 멜 스펙트로그램 저장소 - 카탈로그의 모든 녹음을 한 번만 변환해 메모리 맵 .npy 샤드에 보관
+
+녹음마다 10ms 간격 로그 멜 프레임을 병렬로 계산해 고정 크기 샤드 (프레임 x 멜 대역, float32) 에
+이어 쓰고, (파일, 샤드, 오프셋, 프레임 수) 인덱스를 JSON 으로 저장한다. 파일이 바뀌면 그 파일만
+다시 계산해 뒤에 덧붙이고, 버려진 구간이 많아지면 압축한다. 읽는 쪽은 샤드를 메모리 맵으로 열어
+디코딩 / 변환 없이 조각을 그대로 쓴다.
+"""
+
+import argparse
+import json
+import multiprocessing as mp
+import os
+import re
+import time
+
+import numpy as np
+import soundfile as sf
+
+from incremental_render import file_signature
+from reference_finder import catalog_recordings
+
+STORE_DIR = "mel_store"
+STORE_VERSION = 1
+INDEX_NAME = "index.json"
+# 이 저장소가 만든 폴더라는 표시 (없는 폴더의 파일은 지우지 않음)
+MARKER_NAME = ".mel_store"
+SHARD_NAME = re.compile(r"^mel_\d{5,}\.npy$")
+
+DEFAULT_MEL_CONFIG = {
+    "hop_ms": 10,         # 프레임 간격 (샘플레이트와 무관하게 같은 시간 해상도)
+    "win_ms": 32,         # 창 길이
+    "n_mels": 80,
+    "fmin": 0.0,
+    "fmax": 8000.0,       # 샘플레이트가 달라도 같은 멜 대역
+}
+DEFAULT_SHARD_FRAMES = 1 << 18     # 80 대역이면 샤드 하나 80MB
+DEFAULT_BLOCK_FRAMES = 1 << 18     # 읽기 블록 (샘플)
+
+
+def _hz_to_mel(hz):
+    return 2595.0 * np.log10(1.0 + np.asarray(hz, dtype=np.float64) / 700.0)
+
+
+def _mel_to_hz(mel):
+    return 700.0 * (10 ** (np.asarray(mel, dtype=np.float64) / 2595.0) - 1.0)
+
+
+def mel_filterbank(sr, n_fft, n_mels=80, fmin=0.0, fmax=8000.0):
+    """삼각 멜 필터 (n_mels, n_fft // 2 + 1), 대역 폭으로 정규화"""
+    fmax = min(fmax, sr / 2)
+    freqs = np.fft.rfftfreq(n_fft, 1.0 / sr)
+    edges = _mel_to_hz(np.linspace(_hz_to_mel(fmin), _hz_to_mel(fmax), n_mels + 2))
+    lower, center, upper = edges[:-2, None], edges[1:-1, None], edges[2:, None]
+    weights = np.maximum(0, np.minimum((freqs - lower) / (center - lower), (upper - freqs) / (upper - center)))
+    weights *= (2.0 / (upper - lower))
+    return weights.astype(np.float32)
+
+
+def log_mel(path, config=None, block_frames=DEFAULT_BLOCK_FRAMES):
+    """파일을 블록 단위로 읽어 로그 멜 프레임 (프레임, n_mels) float32 계산
+
+    프레임 t 는 [t*hop, t*hop + n_fft) 구간 (중앙 정렬 없음). 블록 경계에서는 앞 블록의
+    끝 n_fft - hop 샘플을 이어 붙여 전체를 한 번에 변환한 것과 같게 만든다.
+    """
+    config = dict(DEFAULT_MEL_CONFIG, **(config or {}))
+    with sf.SoundFile(path) as f:
+        sr = f.samplerate
+        hop = int(round(sr * config["hop_ms"] / 1000))
+        n_fft = int(round(sr * config["win_ms"] / 1000))
+        window = np.hanning(n_fft).astype(np.float32)
+        filters = mel_filterbank(sr, n_fft, config["n_mels"], config["fmin"], config["fmax"])
+        block_frames -= block_frames % hop
+        carry = np.zeros(0, dtype=np.float32)
+        outputs = []
+        for block in f.blocks(blocksize=block_frames, dtype="float32", always_2d=True):
+            samples = np.concatenate([carry, block.mean(axis=1)])
+            count = (len(samples) - n_fft) // hop + 1 if len(samples) >= n_fft else 0
+            if count:
+                frames = np.lib.stride_tricks.sliding_window_view(samples, n_fft)[::hop][:count] * window
+                power = np.abs(np.fft.rfft(frames, axis=1)) ** 2
+                outputs.append(np.log(np.maximum(power.astype(np.float32) @ filters.T, 1e-10)))
+            carry = samples[count * hop:]
+    if not outputs:
+        return np.zeros((0, config["n_mels"]), dtype=np.float32), sr
+    return np.concatenate(outputs).astype(np.float32, copy=False), sr
+
+
+def _mel_job(args):
+    path, config = args
+    try:
+        mel, sr = log_mel(path, config)
+        return path, mel, sr, None
+    except Exception as e:
+        return path, None, None, f"{type(e).__name__}: {e}"
+
+
+class MelStore:
+    """샤드 메모리 맵 + 인덱스. get / chunks 는 복사 없이 샤드의 일부를 돌려줌"""
+
+    def __init__(self, store_dir=STORE_DIR, config=None, shard_frames=DEFAULT_SHARD_FRAMES):
+        self.store_dir = store_dir
+        self.config = dict(DEFAULT_MEL_CONFIG, **(config or {}))
+        self.settings = json.dumps(self.config, sort_keys=True)
+        self.shard_frames = shard_frames
+        self.files = {}
+        self.shards = []          # [{name, used}]
+        self.next_shard = 0       # 샤드 파일 번호 (압축해도 이름이 겹치지 않게 계속 증가)
+        self._maps = {}
+        try:
+            with open(os.path.join(store_dir, INDEX_NAME), "r", encoding="utf-8") as f:
+                index = json.load(f)
+            if index.get("version") == STORE_VERSION and index.get("settings") == self.settings:
+                self.files = index["files"]
+                self.shards = index["shards"]
+                self.shard_frames = index["shard_frames"]
+                self.next_shard = index.get("next_shard", len(self.shards))
+        except (OSError, ValueError, KeyError):
+            pass
+
+    # 읽기
+
+    def _shard(self, number, writable=False):
+        key = (number, writable)
+        if key not in self._maps:
+            path = os.path.join(self.store_dir, self.shards[number]["name"])
+            self._maps[key] = np.load(path, mmap_mode="r+" if writable else "r")
+        return self._maps[key]
+
+    def chunks(self, path):
+        """파일의 멜 프레임 조각 (샤드 경계에서만 나뉨, 모두 읽기 전용 뷰)"""
+        return [self._shard(shard)[offset:offset + frames] for shard, offset, frames in self.files[path]["segments"]]
+
+    def get(self, path):
+        """파일 전체 멜 프레임 (한 샤드 안이면 뷰, 샤드에 걸쳐 있으면 이어 붙인 복사본)"""
+        chunks = self.chunks(path)
+        if len(chunks) == 1:
+            return chunks[0]
+        return np.concatenate(chunks) if chunks else np.zeros((0, self.config["n_mels"]), dtype=np.float32)
+
+    def frames(self, path):
+        return self.files[path]["frames"]
+
+    def used_frames(self):
+        return sum(entry["frames"] for entry in self.files.values())
+
+    def allocated_frames(self):
+        return sum(shard["used"] for shard in self.shards)
+
+    # 쓰기
+
+    def _new_shard(self):
+        os.makedirs(self.store_dir, exist_ok=True)
+        name = f"mel_{self.next_shard:05d}.npy"
+        self.next_shard += 1
+        np.lib.format.open_memmap(os.path.join(self.store_dir, name), mode="w+", dtype=np.float32,
+                                  shape=(self.shard_frames, self.config["n_mels"])).flush()
+        self.shards.append({"name": name, "used": 0})
+
+    def _append(self, mel):
+        """마지막 샤드 뒤에 이어 씀 (가득 차면 새 샤드). 반환: [(샤드, 오프셋, 프레임)]"""
+        segments = []
+        written = 0
+        while written < len(mel):
+            if not self.shards or self.shards[-1]["used"] >= self.shard_frames:
+                self._new_shard()
+            number = len(self.shards) - 1
+            shard = self.shards[number]
+            n = min(self.shard_frames - shard["used"], len(mel) - written)
+            target = self._shard(number, writable=True)
+            target[shard["used"]:shard["used"] + n] = mel[written:written + n]
+            segments.append([number, shard["used"], n])
+            shard["used"] += n
+            written += n
+        return segments
+
+    def _flush(self):
+        for (_, writable), array in self._maps.items():
+            if writable:
+                array.flush()
+        # 쓰기용 맵은 닫고 읽기용만 남김
+        self._maps = {key: array for key, array in self._maps.items() if not key[1]}
+
+    def save(self):
+        """샤드를 디스크에 반영한 뒤 인덱스 교체 (인덱스가 가리키는 데이터는 항상 기록된 상태)"""
+        self._flush()
+        os.makedirs(self.store_dir, exist_ok=True)
+        marker = os.path.join(self.store_dir, MARKER_NAME)
+        if not os.path.exists(marker):
+            open(marker, "w").close()
+        path = os.path.join(self.store_dir, INDEX_NAME)
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump({"version": STORE_VERSION, "settings": self.settings, "shard_frames": self.shard_frames,
+                       "next_shard": self.next_shard, "shards": self.shards, "files": self.files},
+                      f, ensure_ascii=False, indent=1)
+        os.replace(path + ".tmp", path)
+
+    def update(self, paths, workers=1):
+        """바뀌었거나 새로 생긴 파일만 계산해 덧붙이고, 목록에 없는 파일은 인덱스에서 제거. 반환: 통계 dict"""
+        paths = list(paths)
+        stale = [p for p in paths if self.files.get(p, {}).get("signature") != file_signature(p)]
+        wanted = set(paths)
+        removed = [p for p in self.files if p not in wanted]
+        for path in removed:
+            del self.files[path]
+
+        errors = []
+        jobs = [(path, self.config) for path in stale]
+        if workers > 1 and len(jobs) > 1:
+            with mp.get_context("spawn").Pool(min(workers, len(jobs))) as pool:
+                for result in pool.imap(_mel_job, jobs):
+                    self._store_result(result, errors)
+        else:
+            for job in jobs:
+                self._store_result(_mel_job(job), errors)
+        self.save()
+        return {"files": len(self.files), "computed": len(stale) - len(errors), "failed": errors,
+                "removed": len(removed), "used_frames": self.used_frames(),
+                "allocated_frames": self.allocated_frames()}
+
+    def _store_result(self, result, errors):
+        path, mel, sr, error = result
+        if error:
+            errors.append((path, error))
+            self.files.pop(path, None)
+            return
+        self.files[path] = {"signature": file_signature(path), "sample_rate": sr, "frames": len(mel),
+                            "segments": self._append(mel)}
+
+    def compact(self):
+        """버려진 구간 (바뀐 / 지운 파일의 이전 프레임) 을 없앰
+
+        살아 있는 프레임을 새 번호의 샤드에 다시 쓰고 인덱스를 교체한 뒤에 이전 샤드를 지운다.
+        """
+        old_names = [shard["name"] for shard in self.shards]
+        old = [np.load(os.path.join(self.store_dir, name), mmap_mode="r") for name in old_names]
+        files = self.files
+        self.shards, self.files, self._maps = [], {}, {}
+        for path, entry in files.items():
+            segments = []
+            for shard, offset, frames in entry["segments"]:
+                segments.extend(self._append(old[shard][offset:offset + frames]))
+            self.files[path] = dict(entry, segments=segments)
+        self.save()
+        del old
+        for name in old_names:
+            os.remove(os.path.join(self.store_dir, name))
+
+    def needs_compaction(self, ratio=0.5):
+        allocated = self.allocated_frames()
+        return allocated > 0 and self.used_frames() / allocated < ratio
+
+
+def reset_store_dir(store_dir):
+    """저장소가 만든 파일 (샤드 / 인덱스) 만 지움
+
+    표시 파일이나 인덱스가 없는 폴더는 저장소가 아니므로, 비어 있지 않으면 ValueError.
+    """
+    if not os.path.isdir(store_dir):
+        return
+    names = os.listdir(store_dir)
+    if not names:
+        return
+    if MARKER_NAME not in names and INDEX_NAME not in names:
+        raise ValueError(f"{store_dir} 는 멜 저장소가 아닌 비어 있지 않은 폴더입니다 (다른 --store 를 지정하세요)")
+    for name in names:
+        if SHARD_NAME.match(name) or name in (INDEX_NAME, INDEX_NAME + ".tmp"):
+            os.remove(os.path.join(store_dir, name))
+
+
+def build_store(paths, store_dir=STORE_DIR, workers=1, config=None, shard_frames=DEFAULT_SHARD_FRAMES,
+                compact_ratio=0.5):
+    """저장소 생성 / 증분 갱신 (필요하면 압축). 반환: 통계 dict"""
+    store = MelStore(store_dir, config, shard_frames)
+    if not store.files:
+        # 설정이 바뀌었거나 인덱스가 없으면 처음부터 (저장소가 아닌 폴더는 건드리지 않음)
+        reset_store_dir(store_dir)
+        store = MelStore(store_dir, config, shard_frames)
+    stats = store.update(paths, workers)
+    if store.needs_compaction(compact_ratio):
+        store.compact()
+        stats.update(compacted=True, allocated_frames=store.allocated_frames())
+    return stats
+
+
+def benchmark(store, paths, repeat=3):
+    """같은 파일들을 다시 변환하는 시간과 저장소에서 읽는 시간 비교"""
+    def recompute():
+        return [log_mel(path, store.config)[0].sum() for path in paths]
+
+    def read():
+        return [sum(float(chunk.sum()) for chunk in store.chunks(path)) for path in paths]
+
+    timings = {}
+    for name, fn in (("recompute", recompute), ("store", read)):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            fn()
+        timings[name] = (time.perf_counter() - start) / repeat
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="로그 멜 스펙트로그램 샤드 저장소 생성 / 갱신")
+    parser.add_argument("inputs", nargs="*", help="오디오 파일 (없으면 --root 카탈로그 전체, 목록에 없는 파일은 저장소에서 제거)")
+    parser.add_argument("--root", default="TDM_LLJ")
+    parser.add_argument("--store", default=STORE_DIR)
+    parser.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 1) // 2))
+    parser.add_argument("--shard-frames", type=int, default=DEFAULT_SHARD_FRAMES)
+    parser.add_argument("--benchmark", action="store_true", help="재계산과 저장소 읽기 시간 비교")
+    args = parser.parse_args()
+
+    paths = args.inputs or [info["path"] for info in catalog_recordings(args.root)]
+    print("🎼 로그 멜 저장소 🎼\n")
+    if not paths:
+        print("❌ 변환할 오디오 파일이 없습니다.")
+        return
+
+    start = time.perf_counter()
+    try:
+        stats = build_store(paths, args.store, args.workers, shard_frames=args.shard_frames)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return
+    elapsed = time.perf_counter() - start
+    for path, error in stats["failed"]:
+        print(f"❌ {path}: {error}")
+    print(f"📇 파일 {stats['files']}개: 새로 계산 {stats['computed']}, 제거 {stats['removed']} - {elapsed:.2f}초")
+    print(f"🧱 프레임 {stats['used_frames']:,} / 할당 {stats['allocated_frames']:,}"
+          f"{' (압축함)' if stats.get('compacted') else ''} -> {args.store}/")
+
+    if args.benchmark:
+        store = MelStore(args.store)
+        timings = benchmark(store, [p for p in paths if p in store.files])
+        print(f"\n⏱️ 다시 변환 {timings['recompute'] * 1000:.1f}ms, 저장소 읽기 {timings['store'] * 1000:.1f}ms "
+              f"({timings['recompute'] / max(timings['store'], 1e-9):.0f}배)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+위상 보코더 기반 시간 늘이기 / 피치 변경 - 참조 음성의 STFT 를 한 번만 계산해 여러 (속도, 피치) 변형에 재사용
+
+np.interp 리샘플링은 속도와 피치가 함께 바뀌어서 피치를 맞추려면 한 번 더 리샘플링해야 한다.
+여기서는 위상 보코더로 피치를 유지한 채 길이만 바꾸고(rate = 속도 / 피치),
+마지막에 한 번 리샘플링해 피치를 옮긴다. 여러 변형의 프레임은 하나로 이어 붙여 한 번에 계산한다.
+"""
+
+import argparse
+import time
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from float32_dsp import Float32Resampler
+
+DEFAULT_N_FFT = 1024
+DEFAULT_HOP = 256
+
+# 한 번에 계산할 출력 프레임 수 상한 (변형이 많아도 작업 메모리가 일정)
+DEFAULT_MAX_BATCH_FRAMES = 16384
+
+
+def _window(n_fft):
+    """주기형 Hann 창"""
+    return (0.5 - 0.5 * np.cos(2 * np.pi * np.arange(n_fft) / n_fft)).astype(np.float32)
+
+
+def stft(x, n_fft=DEFAULT_N_FFT, hop=DEFAULT_HOP):
+    """중앙 정렬 STFT -> (프레임, 주파수 빈) complex64"""
+    x = np.asarray(x, dtype=np.float32)
+    pad = n_fft // 2
+    padded = np.pad(x, pad, mode="reflect" if len(x) > pad else "constant")
+    frames = sliding_window_view(padded, n_fft)[::hop] * _window(n_fft)
+    return np.fft.rfft(frames, axis=1).astype(np.complex64)
+
+
+def _overlap_add(frames, hop):
+    """(프레임, n_fft) 를 hop 간격으로 겹쳐 더함 (n_fft 는 hop 의 배수)"""
+    count, n_fft = frames.shape
+    out = np.zeros((count - 1) * hop + n_fft, dtype=np.float32)
+    for r in range(n_fft // hop):
+        out[r * hop:r * hop + count * hop] += frames[:, r * hop:(r + 1) * hop].reshape(-1)
+    return out
+
+
+def istft(spec, hop=DEFAULT_HOP, length=None):
+    """stft 의 역변환 (창 제곱합으로 정규화)"""
+    n_fft = 2 * (spec.shape[1] - 1)
+    window = _window(n_fft)
+    audio = _overlap_add(np.fft.irfft(spec, n=n_fft, axis=1).astype(np.float32) * window, hop)
+    norm = _overlap_add(np.broadcast_to(window * window, (len(spec), n_fft)), hop)
+    np.divide(audio, norm, out=audio, where=norm > 1e-6)
+    audio = audio[n_fft // 2:]
+    if length is not None:
+        audio = audio[:length] if len(audio) >= length else np.pad(audio, (0, length - len(audio)))
+    return audio
+
+
+class PhaseVocoder:
+    """한 참조 음성에 대한 위상 보코더 (STFT 와 프레임 간 위상 차이는 생성 시 한 번만 계산)"""
+
+    def __init__(self, audio, n_fft=DEFAULT_N_FFT, hop=DEFAULT_HOP, max_batch_frames=DEFAULT_MAX_BATCH_FRAMES):
+        if n_fft % hop:
+            raise ValueError(f"n_fft({n_fft}) 는 hop({hop}) 의 배수여야 합니다")
+        self.length = len(audio)
+        self.n_fft = n_fft
+        self.hop = hop
+        self.max_batch_frames = max_batch_frames
+
+        spec = stft(audio, n_fft, hop)
+        # 마지막 프레임 다음에 무음 프레임을 하나 붙여 보간 시 i+1 이 항상 있도록 함
+        spec = np.concatenate([spec, np.zeros((1, spec.shape[1]), dtype=spec.dtype)])
+        self.frames = len(spec) - 1
+        self.magnitude = np.abs(spec)
+        self.phase0 = np.angle(spec[0])
+        # 빈마다 한 hop 동안의 기대 위상 진행 + 실제와의 차이 (-pi ~ pi 로 감음)
+        self.advance = (2 * np.pi * hop * np.arange(spec.shape[1]) / n_fft).astype(np.float32)
+        delta = np.diff(np.angle(spec), axis=0) - self.advance
+        self.increment = (self.advance + (delta + np.pi) % (2 * np.pi) - np.pi).astype(np.float32)
+        self.resampler = Float32Resampler()
+
+    def _stretch_group(self, rates):
+        """rates 의 변형들을 한 번에 계산 (모든 출력 프레임을 이어 붙여 벡터 연산)"""
+        steps = [np.arange(0, self.frames, rate) for rate in rates]
+        counts = [len(s) for s in steps]
+        t = np.concatenate(steps)
+        index = t.astype(np.intp)
+        frac = (t - index).astype(np.float32)[:, None]
+
+        # 크기는 이웃 프레임 사이 선형 보간 (제자리 계산)
+        magnitude = self.magnitude[index + 1]
+        lower = self.magnitude[index]
+        np.subtract(magnitude, lower, out=magnitude)
+        np.multiply(magnitude, frac, out=magnitude)
+        np.add(magnitude, lower, out=magnitude)
+        del lower
+
+        # 위상은 프레임별 진행량을 변형마다 따로 누적 (누적은 float64, 감은 뒤 float32)
+        increment = self.increment[index].astype(np.float64)
+        accumulated = np.cumsum(increment, axis=0)
+        np.subtract(accumulated, increment, out=accumulated)
+        del increment
+        starts = np.repeat(np.cumsum([0] + counts[:-1]), counts)
+        accumulated -= accumulated[starts]
+        accumulated += self.phase0
+        np.remainder(accumulated, 2 * np.pi, out=accumulated)
+        phase = accumulated.astype(np.float32)
+        del accumulated
+
+        spec = np.empty(magnitude.shape, dtype=np.complex64)
+        np.multiply(magnitude, np.cos(phase), out=spec.real)
+        np.sin(phase, out=phase)
+        np.multiply(magnitude, phase, out=spec.imag)
+        outputs = []
+        offset = 0
+        for rate, count in zip(rates, counts):
+            outputs.append(istft(spec[offset:offset + count], self.hop, int(round(self.length / rate))))
+            offset += count
+        return outputs
+
+    def stretch_batch(self, rates):
+        """rate 배 빠르게 (길이 1/rate 배, 피치 유지) 한 음성 목록"""
+        outputs, group, frames = [], [], 0
+        for rate in rates:
+            group.append(rate)
+            frames += int(self.frames / rate) + 1
+            if frames >= self.max_batch_frames:
+                outputs.extend(self._stretch_group(group))
+                group, frames = [], 0
+        if group:
+            outputs.extend(self._stretch_group(group))
+        return outputs
+
+    def render(self, variants):
+        """[(속도, 피치)] -> 길이 len/속도, 피치 x피치 인 float32 음성 목록
+
+        위상 보코더로 길이를 len*피치/속도 로 맞춘 뒤, 한 번의 리샘플링으로 피치를 옮긴다.
+        """
+        stretched = self.stretch_batch([speed / pitch for speed, pitch in variants])
+        outputs = []
+        for (speed, pitch), audio in zip(variants, stretched):
+            if pitch != 1.0:
+                audio = self.resampler.resample(audio, int(self.length / speed))
+            outputs.append(audio)
+        return outputs
+
+    def time_stretch(self, speed):
+        """피치는 그대로, 길이만 1/speed 배"""
+        return self.render([(speed, 1.0)])[0]
+
+    def pitch_shift(self, pitch):
+        """길이는 그대로, 피치만 pitch 배"""
+        return self.render([(1.0, pitch)])[0]
+
+
+def interp_two_pass(audio_ref, speed_factor, pitch_factor):
+    """character_dialogue_tts 의 기존 방식: 속도 리샘플링 후 피치용 리샘플링 한 번 더"""
+    new_length = int(len(audio_ref) / speed_factor)
+    audio = np.interp(np.linspace(0, len(audio_ref) - 1, new_length), np.arange(len(audio_ref)), audio_ref)
+    if pitch_factor != 1.0:
+        pitch_length = int(len(audio) * pitch_factor)
+        audio = np.interp(np.linspace(0, len(audio) - 1, pitch_length), np.arange(len(audio)), audio)
+    return audio
+
+
+def dominant_frequency(audio, sr):
+    """가장 센 주파수 (Hz)"""
+    spectrum = np.abs(np.fft.rfft(audio * np.hanning(len(audio))))
+    return np.argmax(spectrum) * sr / len(audio)
+
+
+def benchmark(ref_seconds=3.0, sr=32000, repeat=3):
+    """속도 x 피치 격자 변형을 기존 2회 보간 / 변형별 보코더 / 배치 보코더로 렌더링해 처리량 비교"""
+    t = np.arange(int(ref_seconds * sr)) / sr
+    rng = np.random.default_rng(0)
+    audio_ref = (0.3 * np.sin(2 * np.pi * 220 * t) + 0.05 * rng.standard_normal(len(t))).astype(np.float32)
+    grid = np.linspace(0.8, 1.2, 5)
+    variants = [(float(speed), float(pitch)) for speed in grid for pitch in grid]
+    output_seconds = sum(len(audio_ref) / speed for speed, _ in variants) / sr
+
+    def run(fn):
+        fn()
+        start = time.perf_counter()
+        for _ in range(repeat):
+            fn()
+        elapsed = (time.perf_counter() - start) / repeat
+        return {"seconds": elapsed, "variants_per_second": len(variants) / elapsed,
+                "realtime": output_seconds / elapsed}
+
+    results = {
+        "interp": run(lambda: [interp_two_pass(audio_ref, s, p) for s, p in variants]),
+        "vocoder": run(lambda: [PhaseVocoder(audio_ref).render([v])[0] for v in variants]),
+        "vocoder_batched": run(lambda: PhaseVocoder(audio_ref).render(variants)),
+    }
+
+    # 속도만 바꿨을 때 피치가 유지되는지 (220Hz 기준)
+    results["pitch_check"] = {
+        "interp": dominant_frequency(interp_two_pass(audio_ref, 1.25, 1.0), sr),
+        "vocoder": dominant_frequency(PhaseVocoder(audio_ref).time_stretch(1.25), sr),
+    }
+    results["variants"] = len(variants)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="위상 보코더 시간 늘이기 / 피치 변경 벤치마크")
+    parser.add_argument("--ref-seconds", type=float, default=3.0, help="참조 음성 길이 (초)")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print("🎛️ 위상 보코더 변형 엔진 벤치마크 🎛️\n")
+    result = benchmark(args.ref_seconds, repeat=args.repeat)
+    print(f"🎚️ 속도 x 피치 변형 {result['variants']}개 (참조 {args.ref_seconds:.1f}초)")
+    for name, label in (("interp", "기존 2회 보간"), ("vocoder", "변형별 보코더 (STFT 매번)"),
+                        ("vocoder_batched", "배치 보코더 (STFT 1회)")):
+        r = result[name]
+        print(f"⏱️ {label}: {r['seconds'] * 1000:.1f}ms, 초당 {r['variants_per_second']:.0f}개 변형, "
+              f"실시간 {r['realtime']:.0f}배")
+    check = result["pitch_check"]
+    print(f"\n🎵 속도 1.25배 시 220Hz 톤: 기존 {check['interp']:.0f}Hz, 보코더 {check['vocoder']:.0f}Hz")
+
+
+if __name__ == "__main__":
+    main()
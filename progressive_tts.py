@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+긴 대사 점진 합성 - 문장별로 나눠 동시에 요청하고, 도착한 순서가 아닌 문장 순서대로 크로스페이드로 이어붙임
+
+첫 문장은 도착하자마자 출력으로 넘기므로 첫 음성까지의 시간이 줄고,
+긴 대사 하나가 여러 서버 워커에 나눠 처리된다.
+"""
+
+import argparse
+import io
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import soundfile as sf
+
+from tts_pipeline import split_cut5
+
+# 문장 끝 구두점
+SENTENCE_END = {".", "?", "!", "。", "？", "！", "…"}
+
+# 긴 문장을 나눌 수 있는 위치: 연결 어미 (~고, ~며, ~지만, ~는데, ~면, ~서) 뒤의 공백
+CLAUSE_BOUNDARY = re.compile(r"(?<=[고며만데면서])\s+")
+
+DEFAULT_MAX_CHARS = 40
+DEFAULT_MIN_CHARS = 8
+
+
+def _split_long(sentence, max_chars, min_chars):
+    """max_chars 보다 긴 문장을 가운데에 가장 가까운 절 경계에서 재귀적으로 분할"""
+    if len(sentence) <= max_chars:
+        return [sentence]
+    middle = len(sentence) / 2
+    cuts = [m.start() for m in CLAUSE_BOUNDARY.finditer(sentence)
+            if min_chars <= m.start() <= len(sentence) - min_chars]
+    if not cuts:
+        return [sentence]
+    cut = min(cuts, key=lambda c: abs(c - middle))
+    return (_split_long(sentence[:cut].strip(), max_chars, min_chars)
+            + _split_long(sentence[cut:].strip(), max_chars, min_chars))
+
+
+def split_sentences(text, max_chars=DEFAULT_MAX_CHARS, min_chars=DEFAULT_MIN_CHARS):
+    """요청 단위 문장 분할: cut5 조각을 문장 끝까지 합치고, 너무 긴 문장은 절 단위로 나눔"""
+    sentences, current = [], ""
+    for fragment in split_cut5(text) or [text.strip()]:
+        current = f"{current} {fragment}".strip()
+        if fragment[-1] in SENTENCE_END:
+            sentences.append(current)
+            current = ""
+    if current:
+        sentences.append(current)
+
+    pieces = [piece for sentence in sentences for piece in _split_long(sentence, max_chars, min_chars)]
+    # 너무 짧은 조각은 앞 조각에 붙임 ("네." 하나만 따로 요청하지 않도록)
+    merged = []
+    for piece in pieces:
+        if merged and len(piece) < min_chars:
+            merged[-1] = f"{merged[-1]} {piece}"
+        else:
+            merged.append(piece)
+    return merged
+
+
+def decode_audio(content):
+    """WAV 응답 바이트 -> (float32 모노, 샘플레이트)"""
+    audio, sr = sf.read(io.BytesIO(content), dtype="float32", always_2d=True)
+    return audio.mean(axis=1), sr
+
+
+class ProgressiveSynthesizer:
+    """post_fn(payload) -> 응답 을 문장별로 동시에 호출하고 순서대로 이어붙이는 합성기"""
+
+    def __init__(self, post_fn, max_workers=4, crossfade_seconds=0.02,
+                 max_chars=DEFAULT_MAX_CHARS, min_chars=DEFAULT_MIN_CHARS):
+        self.post_fn = post_fn
+        self.pool = ThreadPoolExecutor(max_workers=max_workers)
+        self.crossfade_seconds = crossfade_seconds
+        self.max_chars = max_chars
+        self.min_chars = min_chars
+
+    def _request(self, payload, post_kwargs):
+        response = self.post_fn(payload, **post_kwargs)
+        response.raise_for_status()
+        return decode_audio(response.content)
+
+    def stream(self, payload, **post_kwargs):
+        """(샘플레이트, float32 조각) 을 문장 순서대로 생성 (첫 문장은 도착하는 즉시)
+
+        post_kwargs 는 문장 요청마다 post_fn 에 그대로 전달 (예: 라우팅용 speaker)
+        """
+        sentences = split_sentences(payload["text"], self.max_chars, self.min_chars)
+        futures = [self.pool.submit(self._request, dict(payload, text=sentence), post_kwargs)
+                   for sentence in sentences]
+
+        tail = np.zeros(0, dtype=np.float32)
+        try:
+            for index, future in enumerate(futures):
+                audio, sr = future.result()
+                fade = min(int(self.crossfade_seconds * sr), len(tail), len(audio) // 2)
+                if fade:
+                    # 앞 문장 끝과 이 문장 시작을 등전력 크로스페이드
+                    t = (np.arange(fade, dtype=np.float32) + 0.5) / fade
+                    audio = audio.copy()
+                    audio[:fade] = tail[-fade:] * np.cos(0.5 * np.pi * t) + audio[:fade] * np.sin(0.5 * np.pi * t)
+                    tail = tail[:-fade]
+                if len(tail):
+                    yield sr, tail
+
+                if index == len(futures) - 1:
+                    yield sr, audio
+                else:
+                    # 다음 문장과 겹칠 끝부분만 남기고 바로 출력
+                    hold = min(int(self.crossfade_seconds * sr), len(audio) // 2)
+                    cut = len(audio) - hold
+                    if cut:
+                        yield sr, audio[:cut]
+                    tail = audio[cut:]
+        finally:
+            for future in futures:
+                future.cancel()
+
+    def synthesize_to_file(self, payload, output_path, **post_kwargs):
+        """도착하는 대로 파일에 써 나감. 반환: (첫 음성까지 초, 전체 초, 쓴 조각 수)"""
+        start = time.perf_counter()
+        first = None
+        chunks = 0
+        f = None
+        try:
+            for sr, chunk in self.stream(payload, **post_kwargs):
+                if f is None:
+                    f = sf.SoundFile(output_path, "w", sr, 1, subtype="PCM_16")
+                    first = time.perf_counter() - start
+                f.write(chunk)
+                f.flush()
+                chunks += 1
+        finally:
+            if f is not None:
+                f.close()
+        return first, time.perf_counter() - start, chunks
+
+    def close(self):
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+
+def measure(text, servers=3, latency_per_char=0.05, output_dir="."):
+    """스텁 서버 여러 개로 한 번에 요청 / 점진 합성의 첫 음성 시간과 전체 시간 비교"""
+    from simple_tts_request import build_tts_data
+    from tts_load_balancer import EndpointBalancer
+    from tts_stub_server import start_stub_server
+
+    started = [start_stub_server(latency="fixed:0.1", latency_per_char=latency_per_char, max_concurrency=1)
+               for _ in range(servers)]
+    balancer = EndpointBalancer([f"{url}/tts" for _, url in started])
+    post_fn = lambda payload: balancer.post(payload, timeout=60)[0]
+    payload = build_tts_data(text)
+
+    try:
+        start = time.perf_counter()
+        response = post_fn(payload)
+        with open(f"{output_dir}/whole_line.wav", "wb") as f:
+            f.write(response.content)
+        whole = time.perf_counter() - start
+
+        synthesizer = ProgressiveSynthesizer(post_fn, max_workers=servers)
+        first, total, _ = synthesizer.synthesize_to_file(payload, f"{output_dir}/progressive_line.wav")
+        synthesizer.close()
+    finally:
+        for server, _ in started:
+            server.shutdown()
+    return {"whole": whole, "first": first, "total": total, "sentences": split_sentences(text)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="긴 대사 점진 합성 측정 (스텁 서버)")
+    parser.add_argument("--text", default="북극해로 가시면 닭다리 튀김 소보로를 드실 수 있고 "
+                                          "남극해로 가시면 연유 듬뿍 얼음빙수를 드실 수 있습니다.")
+    parser.add_argument("--servers", type=int, default=3)
+    parser.add_argument("--latency-per-char", type=float, default=0.05)
+    args = parser.parse_args()
+
+    print("🌊 긴 대사 점진 합성 🌊\n")
+    result = measure(args.text, args.servers, args.latency_per_char)
+    print(f"✂️ 문장 {len(result['sentences'])}개:")
+    for sentence in result["sentences"]:
+        print(f"   - {sentence}")
+    print(f"\n⏱️ 한 번에 요청: 첫 음성 {result['whole']:.2f}초 (= 전체)")
+    print(f"⚡ 점진 합성: 첫 음성 {result['first']:.2f}초, 전체 {result['total']:.2f}초")
+
+
+if __name__ == "__main__":
+    main()
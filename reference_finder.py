@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+최적 참조 구간 찾기 - 녹음의 모든 3~10초 후보 구간을 프레임 특징 한 번으로 점수화
+
+"처음 3초" 는 무음이나 숨소리인 경우가 많다. 10ms 프레임마다 RMS / 클리핑 / 스펙트럼
+평탄도를 블록 단위로 계산하고, 누적합으로 모든 (시작, 길이) 후보의 무음 비율 / RMS 안정도 /
+클리핑 / 평탄도를 한 번에 구한다. 파일별 상위 구간은 인덱스 파일에 저장하고, 파일이 바뀌면
+(mtime / 크기) 다시 계산한다.
+"""
+
+import argparse
+import json
+import os
+import re
+import time
+
+import numpy as np
+import soundfile as sf
+
+from incremental_render import file_signature
+from silence_slicer import DEFAULT_BLOCK_FRAMES, find_recordings
+
+INDEX_PATH = ".reference_index.json"
+INDEX_VERSION = 1
+
+DEFAULT_SCORE_CONFIG = {
+    "hop_size": 10,           # 프레임 간격 (ms)
+    "min_seconds": 3,         # 후보 구간 길이 범위 (GPT-SoVITS 참조 음성 3~10초)
+    "max_seconds": 10,
+    "length_step": 1,         # 후보 길이 간격 (초)
+    "threshold": -40.0,       # 무음 기준 (dBFS)
+    "top_k": 10,              # 파일마다 저장할 겹치지 않는 상위 구간 수
+}
+
+# 감점 가중치: 점수 = 1 - (가중치 x 특징) 의 합
+SCORE_WEIGHTS = {
+    "silence_ratio": 1.0,     # 구간 안 무음 프레임 비율
+    "rms_std_db": 0.05,       # 유성 프레임 RMS 표준편차 (dB) - 6dB 이면 0.3
+    "clip_ratio": 20.0,       # 클리핑 샘플 비율
+    "flatness": 0.5,          # 유성 프레임 평균 스펙트럼 평탄도 (잡음일수록 1)
+    "edge_voiced": 0.25,      # 구간 시작 / 끝이 말하는 중간이면 각각 감점
+}
+
+# TDM_LLJ 폴더 / 파일명 -> 감정, 언어
+EMOTIONS = ("기쁨", "슬픔", "화남", "우울")
+EMOTION_FOLDERS = {"PTD": "기쁨", "SAD": "슬픔", "ANG": "화남", "DEP": "우울"}
+EMOTION_ALIASES = {"joy": "기쁨", "happy": "기쁨", "sad": "슬픔", "angry": "화남", "depressed": "우울"}
+LANGUAGE_FOLDERS = {"영어": "en", "일어": "ja", "중국어": "zh"}
+RECORDING_NAME = re.compile(r"^(?P<emotion>[A-Z])\.(?P<speaker>[A-Za-z]+)(?:\.(?P<lang>[A-Z]{2}))?\d*m?$")
+
+
+def recording_info(path):
+    """경로에서 (화자, 감정, 언어) 추정: 한글 감정 폴더 > 감정 코드 폴더, 언어 폴더가 없으면 ko"""
+    parts = os.path.normpath(path).split(os.sep)
+    stem = os.path.splitext(parts[-1])[0]
+    match = RECORDING_NAME.match(stem)
+    speaker = match.group("speaker") if match else stem
+    emotion = next((p for p in parts[:-1] if p in EMOTIONS), None)
+    if emotion is None:
+        emotion = next((EMOTION_FOLDERS[p] for p in reversed(parts[:-1]) if p in EMOTION_FOLDERS), None)
+    lang = next((LANGUAGE_FOLDERS[p] for p in parts[:-1] if p in LANGUAGE_FOLDERS), None)
+    if lang is None and match and match.group("lang"):
+        lang = match.group("lang").lower()
+    return {"path": path, "speaker": speaker, "emotion": emotion, "lang": lang or "ko"}
+
+
+def catalog_recordings(root="TDM_LLJ"):
+    """root 아래 녹음 목록 [{path, speaker, emotion, lang}]"""
+    return [recording_info(path) for path in find_recordings(root)]
+
+
+def frame_features(path, hop_ms=10, block_frames=DEFAULT_BLOCK_FRAMES):
+    """블록 단위로 읽어 프레임별 (RMS dB, 클리핑 샘플 수, 스펙트럼 평탄도) 계산. 반환: (특징 dict, 샘플레이트)"""
+    with sf.SoundFile(path) as f:
+        sr = f.samplerate
+        hop = max(1, int(sr * hop_ms / 1000))
+        block_frames -= block_frames % hop
+        rms_db, clipped, flatness = [], [], []
+        for block in f.blocks(blocksize=block_frames, dtype="float32", always_2d=True):
+            usable = len(block) - len(block) % hop
+            if not usable:
+                break
+            frames = block[:usable].mean(axis=1).reshape(-1, hop)
+            energy = np.einsum("ij,ij->i", frames, frames) / hop
+            rms_db.append(10 * np.log10(np.maximum(energy, 1e-10)))
+            # 클리핑은 다운믹스 전 채널 기준
+            clipped.append((np.abs(block[:usable]) >= 0.999).any(axis=1).reshape(-1, hop).sum(axis=1))
+            power = np.abs(np.fft.rfft(frames, axis=1)) ** 2 + 1e-12
+            flatness.append(np.exp(np.log(power).mean(axis=1)) / power.mean(axis=1))
+    if not rms_db:
+        empty = np.zeros(0, dtype=np.float32)
+        return {"rms_db": empty, "clipped": empty, "flatness": empty, "hop": hop}, sr
+    return {"rms_db": np.concatenate(rms_db), "clipped": np.concatenate(clipped),
+            "flatness": np.concatenate(flatness), "hop": hop}, sr
+
+
+def _prefix(values):
+    """구간 합용 누적합 (앞에 0)"""
+    out = np.zeros(len(values) + 1, dtype=np.float64)
+    np.cumsum(values, out=out[1:])
+    return out
+
+
+def _window_values(context, n, starts):
+    """길이 n 프레임, 시작 프레임 배열 starts 인 구간들의 특징 (누적합으로 한 번에)"""
+    sums, voiced, hop = context
+    window = lambda name: sums[name][starts + n] - sums[name][starts]
+    count = window("voiced")
+    safe = np.maximum(count, 1)
+    mean_db = window("db") / safe
+    return {
+        "silence_ratio": 1 - count / n,
+        "rms_std_db": np.sqrt(np.maximum(window("db2") / safe - mean_db * mean_db, 0)),
+        "clip_ratio": window("clipped") / (n * hop),
+        "flatness": np.where(count > 0, window("flat") / safe, 1.0),
+        "edge_voiced": voiced[starts].astype(np.float64) + voiced[starts + n - 1],
+    }
+
+
+def score_windows(features, sr, config=None, weights=None):
+    """모든 (길이, 시작 프레임) 후보 점수. 반환: (점수 [길이, 시작], 길이 목록(프레임), 특징 계산용 컨텍스트)"""
+    config = dict(DEFAULT_SCORE_CONFIG, **(config or {}))
+    weights = dict(SCORE_WEIGHTS, **(weights or {}))
+    rms_db, hop = features["rms_db"], features["hop"]
+    total = len(rms_db)
+    per_second = sr / hop
+    lengths = [int(round(s * per_second)) for s in
+               np.arange(config["min_seconds"], config["max_seconds"] + 1e-9, config["length_step"])]
+    lengths = [n for n in lengths if 0 < n <= total]
+    if not lengths:
+        return np.zeros((0, 0)), [], None
+
+    voiced = rms_db > config["threshold"]
+    voiced_db = np.where(voiced, rms_db, 0.0)
+    sums = {name: _prefix(values) for name, values in (
+        ("voiced", voiced), ("db", voiced_db), ("db2", voiced_db * voiced_db),
+        ("clipped", features["clipped"]), ("flat", np.where(voiced, features["flatness"], 0.0)))}
+    context = (sums, voiced, hop)
+
+    # 길이마다 모든 시작 위치를 한 번에 계산 (긴 길이는 시작 위치가 적으므로 나머지는 -inf)
+    scores = np.full((len(lengths), total - lengths[0] + 1), -np.inf)
+    for row, n in enumerate(lengths):
+        values = _window_values(context, n, np.arange(total - n + 1))
+        scores[row, :total - n + 1] = 1 - sum(weights[name] * values[name] for name in weights)
+    return scores, lengths, context
+
+
+def top_windows(scores, lengths, context, sr, top_k=10):
+    """점수 순으로 서로 겹치지 않는 상위 구간 목록"""
+    if not scores.size:
+        return []
+    scores = scores.copy()
+    hop = context[2]
+    starts = np.arange(scores.shape[1])
+    windows = []
+    while len(windows) < top_k and np.isfinite(scores).any():
+        row, start = (int(i) for i in np.unravel_index(np.argmax(scores), scores.shape))
+        n = lengths[row]
+        values = _window_values(context, n, np.array([start]))
+        windows.append(dict(
+            {"start": round(start * hop / sr, 3), "end": round((start + n) * hop / sr, 3),
+             "start_sample": int(start * hop), "end_sample": int((start + n) * hop),
+             "score": round(float(scores[row, start]), 4)},
+            **{name: round(float(value[0]), 4) for name, value in values.items()}))
+        # 고른 구간과 겹치는 후보 제거: 길이 l 인 후보는 시작이 (start - l, start + n) 이면 겹침
+        for r, l in enumerate(lengths):
+            scores[r, (starts > start - l) & (starts < start + n)] = -np.inf
+    return windows
+
+
+def analyze_file(path, config=None, weights=None):
+    """파일 하나의 상위 구간 인덱스 항목"""
+    config = dict(DEFAULT_SCORE_CONFIG, **(config or {}))
+    features, sr = frame_features(path, config["hop_size"])
+    scores, lengths, context = score_windows(features, sr, config, weights)
+    return {
+        "signature": file_signature(path),
+        "sample_rate": sr,
+        "duration": round(len(features["rms_db"]) * features["hop"] / sr, 3),
+        "windows": top_windows(scores, lengths, context, sr, config["top_k"]),
+    }
+
+
+class ReferenceIndex:
+    """녹음별 상위 구간 인덱스 (JSON 파일, 파일 서명이 바뀐 항목만 다시 계산)"""
+
+    def __init__(self, path=INDEX_PATH, config=None, weights=None):
+        self.path = path
+        self.config = dict(DEFAULT_SCORE_CONFIG, **(config or {}))
+        self.weights = dict(SCORE_WEIGHTS, **(weights or {}))
+        self.settings = json.dumps([self.config, self.weights], sort_keys=True)
+        self.files = {}
+        self.dirty = False
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == INDEX_VERSION and data.get("settings") == self.settings:
+                self.files = data.get("files", {})
+        except (OSError, ValueError):
+            pass
+
+    def entry(self, path):
+        """path 의 인덱스 항목 (없거나 파일이 바뀌었으면 다시 계산)"""
+        cached = self.files.get(path)
+        if cached is None or cached.get("signature") != file_signature(path):
+            cached = self.files[path] = analyze_file(path, self.config, self.weights)
+            self.dirty = True
+        return cached
+
+    def refresh(self, paths):
+        """여러 파일 갱신. 반환: 다시 계산한 파일 수"""
+        stale = [p for p in paths if self.files.get(p, {}).get("signature") != file_signature(p)]
+        for path in stale:
+            self.entry(path)
+        self.save()
+        return len(stale)
+
+    def save(self):
+        if not self.dirty:
+            return
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": INDEX_VERSION, "settings": self.settings, "files": self.files},
+                      f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, self.path)
+        self.dirty = False
+
+    def best_reference(self, speaker=None, emotion=None, lang=None, root="TDM_LLJ", catalog=None):
+        """조건에 맞는 녹음 중 가장 점수가 높은 구간 (없으면 None)"""
+        emotion = EMOTION_ALIASES.get(emotion, emotion)
+        best = None
+        for info in catalog if catalog is not None else catalog_recordings(root):
+            if ((speaker and info["speaker"] != speaker) or (emotion and info["emotion"] != emotion)
+                    or (lang and info["lang"] != lang)):
+                continue
+            windows = self.entry(info["path"])["windows"]
+            if windows and (best is None or windows[0]["score"] > best["score"]):
+                best = dict(windows[0], **info)
+        self.save()
+        return best
+
+
+def load_window(window, mono=True):
+    """best_reference 결과 구간만 읽기 -> (오디오, 샘플레이트)"""
+    audio, sr = sf.read(window["path"], start=window["start_sample"], stop=window["end_sample"],
+                        dtype="float32", always_2d=True)
+    return (audio.mean(axis=1) if mono else audio), sr
+
+
+def export_window(window, output_path):
+    """구간을 WAV 로 저장 (ref_audio_path 로 경로만 받는 API 용)"""
+    audio, sr = load_window(window)
+    sf.write(output_path, audio, sr)
+    return output_path
+
+
+def best_window(path, index_path=INDEX_PATH):
+    """한 녹음 안의 최적 구간 (없으면 None)"""
+    index = ReferenceIndex(index_path)
+    windows = index.entry(path)["windows"]
+    index.save()
+    return dict(windows[0], path=path) if windows else None
+
+
+def best_reference(speaker=None, emotion=None, lang=None, root="TDM_LLJ", index_path=INDEX_PATH):
+    """화자 / 감정 / 언어에 맞는 최적 참조 구간 (인덱스가 최신이면 바로 반환)"""
+    return ReferenceIndex(index_path).best_reference(speaker, emotion, lang, root)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="녹음별 최적 참조 구간 찾기")
+    parser.add_argument("--root", default="TDM_LLJ")
+    parser.add_argument("--index", default=INDEX_PATH)
+    parser.add_argument("--speaker")
+    parser.add_argument("--emotion", help="기쁨 / 슬픔 / 화남 / 우울 (joy / sad / angry / depressed)")
+    parser.add_argument("--lang", help="ko / en / ja")
+    parser.add_argument("--export", help="최적 구간을 저장할 WAV 경로")
+    args = parser.parse_args()
+
+    print("🔎 최적 참조 구간 찾기 🔎\n")
+    catalog = catalog_recordings(args.root)
+    if not catalog:
+        print(f"❌ {args.root} 에 녹음이 없습니다.")
+        return
+    index = ReferenceIndex(args.index)
+    start = time.perf_counter()
+    updated = index.refresh([info["path"] for info in catalog])
+    print(f"📇 녹음 {len(catalog)}개, 다시 계산 {updated}개 ({time.perf_counter() - start:.2f}초)")
+
+    start = time.perf_counter()
+    best = index.best_reference(args.speaker, args.emotion, args.lang, catalog=catalog)
+    elapsed = time.perf_counter() - start
+    if best is None:
+        print("❌ 조건에 맞는 녹음이 없습니다.")
+        return
+    print(f"🏆 {best['path']} ({best['speaker']}, {best['emotion']}, {best['lang']})")
+    print(f"   ⏱️ {best['start']:.2f}~{best['end']:.2f}초, 점수 {best['score']:.3f} "
+          f"(무음 {best['silence_ratio']:.0%}, RMS 편차 {best['rms_std_db']:.1f}dB, "
+          f"클리핑 {best['clip_ratio']:.2%}, 평탄도 {best['flatness']:.2f}) - 조회 {elapsed * 1000:.1f}ms")
+    if args.export:
+        print(f"💾 {export_window(best, args.export)}")
+
+
+if __name__ == "__main__":
+    main()
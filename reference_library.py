@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+참조 음성 라이브러리 - 화자 / 감정 / 언어별로 다듬은 참조 클립을 메모리 맵 파일 하나에 모아 둠
+
+수집(ingest) 단계에서 녹음마다 최적 구간(reference_finder)을 골라 모노로 바꾸고, 앞뒤 무음을 자르고,
+음량을 맞춘 뒤 모델이 쓰는 샘플레이트별로 리샘플링해 float32 로 이어 붙여 저장한다.
+실행 시에는 파일을 메모리 맵으로 열고 (오프셋, 길이) 인덱스로 잘라 쓰므로 디코딩 / 다운믹스 /
+리샘플링이 없다.
+"""
+
+import argparse
+import json
+import math
+import os
+import time
+
+import numpy as np
+
+from incremental_render import file_signature
+from reference_finder import INDEX_PATH, ReferenceIndex, catalog_recordings, load_window, recording_info
+
+LIBRARY_PATH = "reference_library.bin"
+LIBRARY_VERSION = 1
+
+# 16kHz: SSL(HuBERT) 입력, 32kHz: v2 합성 / 스펙트로그램
+DEFAULT_TARGET_RATES = (16000, 32000)
+
+DEFAULT_CLIP_CONFIG = {
+    "target_rms_db": -20.0,   # 음량 정규화 목표 (dBFS)
+    "peak_db": -1.0,          # 정규화 후 최대 피크 (dBFS)
+    "trim_db": -40.0,         # 앞뒤 무음 자르기 기준 (dBFS, 10ms 프레임)
+    "trim_keep_ms": 50,       # 자른 뒤 앞뒤에 남길 여유 (ms)
+}
+
+
+def index_path_for(library_path):
+    """라이브러리 데이터 파일 옆의 인덱스 (JSON) 경로"""
+    return os.path.splitext(library_path)[0] + ".json"
+
+
+def library_key(speaker, emotion, lang):
+    return f"{speaker}/{emotion}/{lang}"
+
+
+def trim_silence(audio, sr, threshold_db=-40.0, keep_ms=50):
+    """앞뒤 무음 프레임 제거 (10ms 프레임 RMS 기준)"""
+    hop = max(1, sr // 100)
+    frames = len(audio) // hop
+    if not frames:
+        return audio
+    blocks = audio[:frames * hop].reshape(frames, hop)
+    voiced = np.flatnonzero(10 * np.log10(np.maximum((blocks * blocks).mean(axis=1), 1e-10)) > threshold_db)
+    if not len(voiced):
+        return audio
+    keep = int(sr * keep_ms / 1000)
+    return audio[max(voiced[0] * hop - keep, 0):min((voiced[-1] + 1) * hop + keep, len(audio))]
+
+
+def normalize_loudness(audio, target_rms_db=-20.0, peak_db=-1.0):
+    """RMS 를 목표 음량으로 맞추되 피크가 peak_db 를 넘지 않게"""
+    rms = math.sqrt(float(np.mean(audio * audio))) if len(audio) else 0.0
+    peak = float(np.abs(audio).max()) if len(audio) else 0.0
+    if rms <= 0 or peak <= 0:
+        return audio
+    gain = min(10 ** (target_rms_db / 20) / rms, 10 ** (peak_db / 20) / peak)
+    return (audio * gain).astype(np.float32)
+
+
+def resample(audio, sr, target):
+    """정수비 폴리페이즈 리샘플링 (scipy 는 필요할 때만 불러옴)"""
+    if sr == target:
+        return audio.astype(np.float32)
+    from scipy.signal import resample_poly
+
+    g = math.gcd(sr, target)
+    return resample_poly(audio, target // g, sr // g).astype(np.float32)
+
+
+def prepare_clip(window, rates=DEFAULT_TARGET_RATES, config=None):
+    """최적 구간 -> {샘플레이트: float32 모노 클립}"""
+    config = dict(DEFAULT_CLIP_CONFIG, **(config or {}))
+    audio, sr = load_window(window)
+    audio = trim_silence(audio, sr, config["trim_db"], config["trim_keep_ms"])
+    audio = normalize_loudness(audio, config["target_rms_db"], config["peak_db"])
+    return {rate: resample(audio, sr, rate) for rate in rates}
+
+
+class ReferenceLibrary:
+    """메모리 맵으로 연 참조 클립 라이브러리 (get 은 복사 없이 맵의 일부를 돌려줌)"""
+
+    def __init__(self, path=LIBRARY_PATH):
+        self.path = path
+        with open(index_path_for(path), "r", encoding="utf-8") as f:
+            index = json.load(f)
+        if index.get("version") != LIBRARY_VERSION:
+            raise ValueError(f"라이브러리 버전이 다릅니다: {index.get('version')} (필요: {LIBRARY_VERSION})")
+        self.entries = index["entries"]
+        self.rates = index["rates"]
+        size = os.path.getsize(path)
+        self.data = np.memmap(path, dtype=np.float32, mode="r") if size else np.zeros(0, dtype=np.float32)
+
+    def keys(self):
+        return sorted(self.entries)
+
+    def find(self, speaker=None, emotion=None, lang=None):
+        """조건에 맞는 첫 항목 키 (없으면 None)"""
+        for key in self.keys():
+            entry = self.entries[key]
+            if ((speaker is None or entry["speaker"] == speaker) and (emotion is None or entry["emotion"] == emotion)
+                    and (lang is None or entry["lang"] == lang)):
+                return key
+        return None
+
+    def get(self, key, sr=None):
+        """키의 클립 -> (float32 읽기 전용 뷰, 샘플레이트). sr 이 없으면 가장 높은 샘플레이트"""
+        clips = self.entries[key]["clips"]
+        rate = str(sr) if sr is not None else max(clips, key=int)
+        if rate not in clips:
+            raise ValueError(f"{key} 에 {sr}Hz 클립이 없습니다 ({', '.join(clips)})")
+        offset, frames = clips[rate]
+        return self.data[offset:offset + frames], int(rate)
+
+    def for_recording(self, path, sr=None):
+        """녹음 경로와 같은 화자 / 감정 / 언어의 클립 (없으면 KeyError)"""
+        info = recording_info(path)
+        key = library_key(info["speaker"], info["emotion"], info["lang"])
+        if key not in self.entries:
+            raise KeyError(f"라이브러리에 {key} 가 없습니다")
+        return self.get(key, sr)
+
+
+_opened = {}
+
+
+def open_library(path=LIBRARY_PATH):
+    """프로세스마다 한 번만 여는 라이브러리 (인덱스가 바뀌면 다시 엶)"""
+    signature = file_signature(index_path_for(path))
+    cached = _opened.get(path)
+    if cached is None or cached[0] != signature:
+        cached = _opened[path] = (signature, ReferenceLibrary(path))
+    return cached[1]
+
+
+def build_library(root="TDM_LLJ", path=LIBRARY_PATH, rates=DEFAULT_TARGET_RATES, config=None,
+                  index_path=INDEX_PATH):
+    """녹음을 모아 라이브러리 생성 / 갱신 (원본 서명과 설정이 같은 항목은 기존 데이터를 그대로 복사)
+
+    반환: {entries, rebuilt, reused, bytes}
+    """
+    config = dict(DEFAULT_CLIP_CONFIG, **(config or {}))
+    rates = [int(rate) for rate in rates]
+    settings = json.dumps([config, rates], sort_keys=True)
+    try:
+        previous = ReferenceLibrary(path)
+        if previous.entries and next(iter(previous.entries.values())).get("settings") != settings:
+            previous = None
+    except (OSError, ValueError, KeyError):
+        previous = None
+
+    # 화자 / 감정 / 언어마다 가장 점수가 높은 녹음 구간 하나
+    finder = ReferenceIndex(index_path)
+    groups = {}
+    for info in catalog_recordings(root):
+        windows = finder.entry(info["path"])["windows"]
+        if not windows:
+            continue
+        key = library_key(info["speaker"], info["emotion"], info["lang"])
+        if key not in groups or windows[0]["score"] > groups[key]["score"]:
+            groups[key] = dict(windows[0], **info)
+    finder.save()
+
+    entries, offset, rebuilt, reused = {}, 0, 0, 0
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        for key in sorted(groups):
+            window = groups[key]
+            signature = file_signature(window["path"])
+            old = previous.entries.get(key) if previous else None
+            if (old and old["signature"] == signature and old["start_sample"] == window["start_sample"]
+                    and old["end_sample"] == window["end_sample"]):
+                clips = {int(rate): previous.data[o:o + n] for rate, (o, n) in old["clips"].items()}
+                reused += 1
+            else:
+                clips = prepare_clip(window, rates, config)
+                rebuilt += 1
+            entry = {name: window[name] for name in ("speaker", "emotion", "lang", "path", "start", "end",
+                                                     "start_sample", "end_sample", "score")}
+            entry.update(signature=signature, settings=settings, clips={})
+            for rate in rates:
+                clip = np.ascontiguousarray(clips[rate], dtype=np.float32)
+                f.write(clip.tobytes())
+                entry["clips"][str(rate)] = [offset, len(clip)]
+                offset += len(clip)
+            entries[key] = entry
+
+    # 데이터를 먼저 교체하고 인덱스를 나중에 교체 (인덱스가 가리키는 데이터는 항상 존재)
+    previous = None
+    os.replace(tmp_path, path)
+    index_path_out = index_path_for(path)
+    with open(index_path_out + ".tmp", "w", encoding="utf-8") as f:
+        json.dump({"version": LIBRARY_VERSION, "rates": rates, "entries": entries}, f, ensure_ascii=False, indent=1)
+    os.replace(index_path_out + ".tmp", index_path_out)
+    return {"entries": len(entries), "rebuilt": rebuilt, "reused": reused, "bytes": offset * 4}
+
+
+def benchmark(library, key, source_path, start_sample, end_sample, sr, repeat=20):
+    """기존 런타임 로드 (읽기 + 다운믹스 + 자르기 + 리샘플링) 와 라이브러리 조회 시간 비교"""
+    import soundfile as sf
+
+    def legacy():
+        audio, source_sr = sf.read(source_path, start=start_sample, stop=end_sample, dtype="float32",
+                                   always_2d=True)
+        return resample(audio.mean(axis=1), source_sr, sr)
+
+    def mapped():
+        return library.get(key, sr)[0]
+
+    timings = {}
+    for name, fn in (("legacy", legacy), ("library", mapped)):
+        fn()
+        start = time.perf_counter()
+        for _ in range(repeat):
+            fn()
+        timings[name] = (time.perf_counter() - start) / repeat
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="참조 음성 라이브러리 생성 / 조회")
+    parser.add_argument("--root", default="TDM_LLJ")
+    parser.add_argument("--library", default=LIBRARY_PATH)
+    parser.add_argument("--rates", type=int, nargs="+", default=list(DEFAULT_TARGET_RATES))
+    parser.add_argument("--list", action="store_true", help="생성하지 않고 목록만 출력")
+    args = parser.parse_args()
+
+    print("📚 참조 음성 라이브러리 📚\n")
+    if not args.list:
+        start = time.perf_counter()
+        stats = build_library(args.root, args.library, args.rates)
+        print(f"🔨 항목 {stats['entries']}개 (새로 만듦 {stats['rebuilt']}, 재사용 {stats['reused']}), "
+              f"{stats['bytes']:,} bytes - {time.perf_counter() - start:.2f}초\n")
+
+    library = ReferenceLibrary(args.library)
+    for key in library.keys():
+        entry = library.entries[key]
+        clips = ", ".join(f"{rate}Hz {n / int(rate):.2f}초" for rate, (_, n) in entry["clips"].items())
+        print(f"🎙️ {key}: {entry['path']} {entry['start']:.2f}~{entry['end']:.2f}초 -> {clips}")
+
+    if library.keys():
+        key = library.keys()[0]
+        entry = library.entries[key]
+        rate = max(library.rates)
+        timings = benchmark(library, key, entry["path"], entry["start_sample"], entry["end_sample"], rate)
+        print(f"\n⏱️ 런타임 로드 ({key}, {rate}Hz): 기존 {timings['legacy'] * 1000:.2f}ms, "
+              f"라이브러리 {timings['library'] * 1e6:.1f}µs")
+
+
+if __name__ == "__main__":
+    main()
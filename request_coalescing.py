@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+동일 요청 병합 (singleflight) - 같은 요청이 진행 중이면 새로 보내지 않고 그 결과를 나눠 받음
+"""
+
+import copy
+import hashlib
+import json
+import threading
+import unicodedata
+
+
+def is_deterministic(payload):
+    """seed 가 고정된 요청만 같은 결과를 보장 (seed 없음 / -1 은 매번 다른 샘플링)"""
+    seed = payload.get("seed")
+    return seed is not None and int(seed) != -1
+
+
+def normalize_payload(payload):
+    """공백 / 유니코드 표기 차이를 없앤 요청 키 문자열"""
+    normalized = {}
+    for key, value in payload.items():
+        if isinstance(value, str):
+            value = " ".join(unicodedata.normalize("NFC", value).split())
+        normalized[key] = value
+    return json.dumps(normalized, ensure_ascii=False, sort_keys=True)
+
+
+def request_key(url, payload):
+    """URL + 정규화된 요청으로 만든 병합 키"""
+    return hashlib.sha256(f"{url}\n{normalize_payload(payload)}".encode("utf-8")).hexdigest()
+
+
+class _Call:
+    """진행 중인 요청 하나"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """같은 키의 함수 호출을 하나로 합침 (완료되면 키를 지워 다음 호출은 새로 실행)"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = {}
+
+    def do(self, key, fn):
+        """fn() 결과와 다른 호출의 결과를 공유했는지 여부 반환"""
+        with self.lock:
+            call = self.calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                leader = False
+            else:
+                call = self.calls[key] = _Call()
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self.lock:
+                del self.calls[key]
+            call.done.set()
+        return call.result, False
+
+
+class CoalescingClient:
+    """post(url, payload) 함수를 감싸 동일 요청을 병합하는 클라이언트"""
+
+    def __init__(self, post_fn):
+        self.post_fn = post_fn
+        self.flight = SingleFlight()
+        self.lock = threading.Lock()
+        self.stats = {"calls": 0, "sent": 0, "coalesced": 0}
+
+    def post(self, url, payload, **kwargs):
+        """seed 가 고정된 요청이면 병합, 아니면 그대로 전송"""
+        with self.lock:
+            self.stats["calls"] += 1
+
+        def send():
+            with self.lock:
+                self.stats["sent"] += 1
+            return self.post_fn(url, payload, **kwargs)
+
+        if not is_deterministic(payload):
+            return send()
+
+        result, shared = self.flight.do(request_key(url, payload), send)
+        if shared:
+            with self.lock:
+                self.stats["coalesced"] += 1
+            # 호출자마다 독립된 응답 객체 (본문 bytes 는 불변이라 얕은 복사로 충분)
+            return copy.copy(result)
+        return result
+
+
+def main():
+    from concurrent.futures import ThreadPoolExecutor
+
+    from tts_stub_server import start_stub_server
+    from tts_traffic import post_tts
+
+    print("🔗 동일 요청 병합 데모 🔗\n")
+
+    server, url = start_stub_server(latency="fixed:0.3")
+    client = CoalescingClient(post_tts)
+    payload = {"text": "네.", "text_lang": "ko", "ref_audio_path": "TDM_LLJ/PTD/J.LJJ15m.wav",
+               "prompt_text": "안녕하세요", "prompt_lang": "ko", "seed": 42}
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        responses = list(pool.map(lambda _: client.post(f"{url}/tts", payload, timeout=10), range(8)))
+
+    print(f"📨 호출: {client.stats['calls']}개 -> 실제 전송 {client.stats['sent']}개 "
+          f"(병합 {client.stats['coalesced']}개)")
+    print(f"✅ 응답 동일: {len({r.content for r in responses}) == 1}")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+CSV / JSONL 대화 스크립트 스트리밍 로더 - 전체 스크립트를 메모리에 올리지 않고 줄 단위로 읽음
+"""
+
+import argparse
+import csv
+import itertools
+import json
+import os
+import tempfile
+import tracemalloc
+from collections import namedtuple
+
+# 스크립트 한 줄
+ScriptRecord = namedtuple("ScriptRecord", ["speaker", "text", "lang", "emotion"])
+
+# 열 이름 별칭 (다른 도구에서 만든 대본도 그대로 읽도록)
+FIELD_ALIASES = {
+    "speaker": ("speaker", "character", "화자", "캐릭터"),
+    "text": ("text", "line", "대사"),
+    "lang": ("lang", "language", "언어"),
+    "emotion": ("emotion", "감정"),
+}
+
+DEFAULT_BATCH_SIZE = 256
+
+
+def _field(row, name):
+    for alias in FIELD_ALIASES[name]:
+        value = row.get(alias)
+        if value not in (None, ""):
+            return value.strip() if isinstance(value, str) else value
+    return None
+
+
+def _to_record(row, where, default_lang, default_emotion):
+    """dict 한 줄 -> ScriptRecord (필수 열이 없으면 위치와 함께 ValueError)"""
+    speaker, text = _field(row, "speaker"), _field(row, "text")
+    if not speaker or not text:
+        raise ValueError(f"{where}: speaker / text 가 필요합니다")
+    return ScriptRecord(speaker, text, _field(row, "lang") or default_lang,
+                        _field(row, "emotion") or default_emotion)
+
+
+def _iter_csv(f, path, delimiter, default_lang, default_emotion):
+    reader = csv.DictReader(f, delimiter=delimiter)
+    for row in reader:
+        if not any(row.values()):
+            continue
+        yield _to_record(row, f"{path}:{reader.line_num}", default_lang, default_emotion)
+
+
+def _iter_jsonl(f, path, default_lang, default_emotion):
+    for line_num, line in enumerate(f, 1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        try:
+            row = json.loads(line)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"{path}:{line_num}: JSON 오류 ({e})") from e
+        yield _to_record(row, f"{path}:{line_num}", default_lang, default_emotion)
+
+
+def iter_script(path, default_lang="ko", default_emotion="neutral"):
+    """스크립트 파일을 ScriptRecord 제너레이터로 읽음 (.csv / .tsv / .jsonl)"""
+    ext = os.path.splitext(path)[1].lower()
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        if ext in (".csv", ".tsv"):
+            yield from _iter_csv(f, path, "\t" if ext == ".tsv" else ",", default_lang, default_emotion)
+        elif ext in (".jsonl", ".ndjson"):
+            yield from _iter_jsonl(f, path, default_lang, default_emotion)
+        else:
+            raise ValueError(f"지원하지 않는 스크립트 형식: {path} (.csv / .tsv / .jsonl)")
+
+
+def from_dialogue(dialogue, default_lang="ko", default_emotion="neutral"):
+    """코드에 있는 대화 목록 ((화자, 대사[, 감정]) 튜플 또는 dict) 을 같은 레코드로 변환"""
+    for index, line in enumerate(dialogue, 1):
+        if isinstance(line, dict):
+            yield _to_record(line, f"line {index}", default_lang, default_emotion)
+        else:
+            speaker, text, *rest = line
+            yield ScriptRecord(speaker, text, default_lang, rest[0] if rest else default_emotion)
+
+
+def load_records(script_path, dialogue, default_lang="ko", default_emotion="neutral"):
+    """--script 가 있으면 파일에서, 없으면 코드의 대화 목록에서 레코드를 읽음"""
+    if script_path:
+        return iter_script(script_path, default_lang, default_emotion)
+    return from_dialogue(dialogue, default_lang, default_emotion)
+
+
+def batched(records, size=DEFAULT_BATCH_SIZE):
+    """레코드를 최대 size 개씩 묶어 차례로 반환 (한 번에 한 묶음만 메모리에 있음)"""
+    records = iter(records)
+    while True:
+        batch = list(itertools.islice(records, size))
+        if not batch:
+            return
+        yield batch
+
+
+def write_jsonl(records, path):
+    """레코드를 JSONL 스크립트로 저장"""
+    with open(path, "w", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record._asdict(), ensure_ascii=False) + "\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="스크립트 스트리밍 읽기 / 메모리 사용량 확인")
+    parser.add_argument("script", nargs="?", help="CSV / TSV / JSONL 스크립트 (없으면 합성 대본 생성)")
+    parser.add_argument("--lines", type=int, default=1000000, help="합성 대본 줄 수")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    args = parser.parse_args()
+
+    path = args.script
+    synthetic = None
+    if path is None:
+        from dialogue_tts import DIALOGUE
+
+        # 합성 대본은 임시 폴더에 만들고 측정 후 지움 (작업 폴더를 더럽히지 않음)
+        fd, synthetic = tempfile.mkstemp(prefix="synthetic_script_", suffix=".jsonl")
+        os.close(fd)
+        path = synthetic
+        repeated = itertools.islice(itertools.cycle(DIALOGUE), args.lines)
+        write_jsonl(from_dialogue(repeated), path)
+        print(f"📝 합성 대본 생성: {path} ({args.lines:,}줄, {os.path.getsize(path) / 1e6:.1f}MB)")
+
+    tracemalloc.start()
+    lines = batches = 0
+    speakers = set()
+    for batch in batched(iter_script(path), args.batch_size):
+        batches += 1
+        lines += len(batch)
+        speakers.update(record.speaker for record in batch)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f"📖 {lines:,}줄 / {batches:,}묶음 읽음, 화자 {len(speakers)}명")
+    print(f"💾 최대 메모리: {peak / 1e6:.2f}MB")
+    if synthetic:
+        os.remove(synthetic)
+
+
+if __name__ == "__main__":
+    main()
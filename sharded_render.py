@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+프로세스 풀 분할 렌더링 - 대화 줄을 코어별로 나눠 처리하고 참조 음성은 공유 메모리로 전달
+"""
+
+import argparse
+import itertools
+import math
+import multiprocessing as mp
+import os
+import shutil
+import tempfile
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+# 한 번에 워커에 나눠 주는 줄 수
+DEFAULT_WINDOW = 1024
+
+# 워커 프로세스마다 한 번 연결한 공유 참조 음성
+_WORKER = {}
+
+
+def _attach(shm_name, shape, dtype, sr, render):
+    """워커 초기화: 공유 메모리의 참조 음성을 복사 없이 배열로 연결"""
+    shm = shared_memory.SharedMemory(name=shm_name)
+    audio = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+    audio.flags.writeable = False
+    _WORKER.update(shm=shm, audio=audio, sr=sr, render=render)
+
+
+def _run_shard(shard):
+    """줄 묶음 하나 처리 -> [(인덱스, 인자, 결과, 오류)]"""
+    render, audio, sr = _WORKER["render"], _WORKER["audio"], _WORKER["sr"]
+    results = []
+    for index, args in shard:
+        try:
+            results.append((index, args, render(audio, sr, *args), None))
+        except Exception as e:
+            results.append((index, args, None, e))
+    return results
+
+
+def make_shards(tasks, workers, shards_per_worker=4, start=0):
+    """연속된 줄 묶음으로 분할 (워커당 여러 묶음으로 길이 편차를 흡수)"""
+    indexed = list(enumerate(tasks, start))
+    size = max(1, math.ceil(len(indexed) / (workers * shards_per_worker)))
+    return [indexed[i:i + size] for i in range(0, len(indexed), size)]
+
+
+def render_lines(render, audio_ref, sr, tasks, workers=1, window=DEFAULT_WINDOW):
+    """render(audio_ref, sr, *args) 를 줄마다 실행하고 (인덱스, 인자, 결과, 오류) 를 스크립트 순서로 반환
+
+    tasks 는 제너레이터여도 되며, 한 번에 window 줄씩만 읽어 나눠 주므로 메모리 사용량이 일정하다.
+    workers <= 1 이면 현재 프로세스에서 순서대로 실행한다.
+    """
+    if workers <= 1:
+        for index, args in enumerate(tasks):
+            try:
+                yield index, args, render(audio_ref, sr, *args), None
+            except Exception as e:
+                yield index, args, None, e
+        return
+
+    audio_ref = np.ascontiguousarray(audio_ref)
+    shm = shared_memory.SharedMemory(create=True, size=max(audio_ref.nbytes, 1))
+    try:
+        np.ndarray(audio_ref.shape, dtype=audio_ref.dtype, buffer=shm.buf)[:] = audio_ref
+        initargs = (shm.name, audio_ref.shape, audio_ref.dtype.str, sr, render)
+        with mp.get_context("spawn").Pool(workers, initializer=_attach, initargs=initargs) as pool:
+            tasks = iter(tasks)
+            start = 0
+            while True:
+                chunk = list(itertools.islice(tasks, window))
+                if not chunk:
+                    break
+                # imap 은 묶음 순서를 지키므로 결과도 스크립트 순서로 나옴
+                for results in pool.imap(_run_shard, make_shards(chunk, workers, start=start)):
+                    yield from results
+                start += len(chunk)
+    finally:
+        shm.close()
+        shm.unlink()
+
+
+def benchmark(worker_counts, repeat=8, seconds=2.0, sr=32000):
+    """dialogue_tts 렌더링을 긴 스크립트 (대화 repeat 배) 로 워커 수별 측정"""
+    import dialogue_tts
+
+    rng = np.random.default_rng(0)
+    audio_ref = rng.uniform(-0.5, 0.5, int(sr * seconds))
+    results = {}
+    for workers in worker_counts:
+        output_dir = tempfile.mkdtemp(prefix="sharded_render_")
+        tasks = [(output_dir, i, character, text, emotion)
+                 for i, (character, text, emotion) in enumerate(dialogue_tts.DIALOGUE * repeat, 1)]
+        try:
+            start = time.perf_counter()
+            errors = sum(error is not None
+                         for _, _, _, error in render_lines(dialogue_tts.render_line, audio_ref, sr, tasks, workers))
+            elapsed = time.perf_counter() - start
+        finally:
+            shutil.rmtree(output_dir, ignore_errors=True)
+        results[workers] = {"seconds": elapsed, "lines_per_sec": len(tasks) / elapsed, "errors": errors}
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="프로세스 풀 분할 렌더링 벤치마크")
+    parser.add_argument("--workers", type=int, nargs="+",
+                        default=sorted({1, 2, os.cpu_count() or 1}))
+    parser.add_argument("--repeat", type=int, default=8, help="대화 스크립트 반복 횟수")
+    args = parser.parse_args()
+
+    print("🧩 프로세스 풀 분할 렌더링 벤치마크 🧩\n")
+    results = benchmark(args.workers, args.repeat)
+    base = results[min(results)]["lines_per_sec"]
+    for workers, r in results.items():
+        print(f"⏱️ 워커 {workers}개: {r['seconds']:.2f}초, {r['lines_per_sec']:.1f} 줄/s "
+              f"({r['lines_per_sec'] / base:.2f}x, 실패 {r['errors']})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+긴 TDM_LLJ 녹음을 무음 기준으로 잘라 발화 단위 클립과 매니페스트로 저장
+
+파일을 블록 단위로 읽어 10ms 프레임 에너지만 모으고(한 시간에 수십만 개 float),
+발화 경계는 그 에너지 배열에서 한 번에 벡터 연산으로 찾는다. 클립도 블록 단위로
+복사하므로 녹음 길이와 상관없이 메모리는 블록 몇 개 분량이다. 여러 파일은 프로세스별로 나눠 처리한다.
+설정 이름은 GPT-SoVITS 의 slicer2 (threshold / min_length / min_interval / hop_size / max_sil_kept) 를 따른다.
+"""
+
+import argparse
+import json
+import multiprocessing as mp
+import os
+import time
+
+import numpy as np
+import soundfile as sf
+
+DEFAULT_BLOCK_FRAMES = 1 << 18
+AUDIO_EXTENSIONS = (".wav", ".flac", ".mp3", ".ogg")
+
+DEFAULT_SLICE_CONFIG = {
+    "threshold": -40.0,     # 이보다 조용한 프레임은 무음 (dBFS)
+    "min_length": 2000,     # 이보다 짧은 발화는 다음 발화와 합침 (ms)
+    "min_interval": 300,    # 이보다 긴 무음에서만 자름 (ms)
+    "hop_size": 10,         # 에너지 프레임 간격 (ms)
+    "max_sil_kept": 300,    # 클립 앞뒤에 남길 무음 (ms)
+    "max_length": 15000,    # 이보다 긴 발화는 가장 조용한 곳에서 한 번 더 자름 (ms)
+}
+
+# 유성 프레임 비율이 이보다 낮은 구간은 클립으로 내보내지 않음
+MIN_VOICED_RATIO = 0.05
+
+
+def find_recordings(root="TDM_LLJ"):
+    """root 아래의 오디오 파일 목록 (경로 순서)"""
+    paths = []
+    for dirpath, _, filenames in os.walk(root):
+        for name in filenames:
+            if name.lower().endswith(AUDIO_EXTENSIONS):
+                paths.append(os.path.join(dirpath, name))
+    return sorted(paths)
+
+
+def frame_energy_db(path, hop, block_frames=DEFAULT_BLOCK_FRAMES):
+    """파일을 블록 단위로 읽어 hop 샘플마다 RMS (dBFS) 계산. 반환: (에너지 배열, 샘플레이트, 전체 샘플 수)"""
+    block_frames -= block_frames % hop
+    energies = []
+    with sf.SoundFile(path) as f:
+        total = f.frames
+        for block in f.blocks(blocksize=block_frames, dtype="float32", always_2d=True):
+            mono = block.mean(axis=1)
+            usable = len(mono) - len(mono) % hop
+            frames = mono[:usable].reshape(-1, hop)
+            energies.append(np.einsum("ij,ij->i", frames, frames) / hop)
+            if usable < len(mono):
+                # 마지막 자투리는 짧은 프레임 하나
+                tail = mono[usable:]
+                energies.append(np.array([np.dot(tail, tail) / len(tail)], dtype=np.float32))
+        sr = f.samplerate
+    energy = np.concatenate(energies) if energies else np.zeros(0, dtype=np.float32)
+    return 10 * np.log10(np.maximum(energy, 1e-10)), sr, total
+
+
+def find_segments(energy_db, threshold=-40.0, min_length=200, min_interval=30, max_sil_kept=30, max_length=1500):
+    """프레임 에너지 -> 발화 구간 [(시작 프레임, 끝 프레임)] (길이 단위는 모두 프레임)"""
+    voiced = energy_db > threshold
+    if not voiced.any():
+        return []
+
+    # 무음 구간 경계를 한 번에 찾음: 유성 -> 무음 / 무음 -> 유성 전환 위치
+    edges = np.diff(np.concatenate([[1], voiced.view(np.int8), [1]]))
+    silence_start = np.flatnonzero(edges == -1)
+    silence_end = np.flatnonzero(edges == 1)
+    lengths = silence_end - silence_start
+    total = len(voiced)
+    # 파일 처음 / 끝의 무음과 min_interval 이상인 무음에서만 자름
+    cut = (lengths >= min_interval) | (silence_start == 0) | (silence_end == total)
+    silence_start, silence_end = silence_start[cut], silence_end[cut]
+
+    # 잘린 무음 사이가 발화: 앞 무음의 끝 ~ 다음 무음의 시작, 앞뒤로 무음을 조금 남김
+    starts = np.concatenate([[0], silence_end])
+    ends = np.concatenate([silence_start, [total]])
+    keep = ends > starts
+    starts, ends = starts[keep], ends[keep]
+    gaps_before = np.concatenate([[starts[0]], starts[1:] - ends[:-1]])
+    gaps_after = np.concatenate([starts[1:] - ends[:-1], [total - ends[-1]]])
+    starts = starts - np.minimum(max_sil_kept, gaps_before // 2)
+    ends = ends + np.minimum(max_sil_kept, gaps_after // 2)
+
+    # 짧은 발화는 다음 발화와 합치고, 너무 긴 발화는 가장 조용한 프레임에서 자름
+    # 앞뒤 무음을 남기고도 min_interval 넘게 무음이 남는 사이는 합치지 않음 (무음만 있는 클립 방지)
+    segments = []
+    start = end = None
+    for s, e in zip(starts.tolist(), ends.tolist()):
+        if start is not None and s - end > min_interval:
+            segments.append((start, end))
+            start = None
+        start = s if start is None else start
+        end = e
+        if e - start >= min_length:
+            segments.extend(_split_long(energy_db, start, e, min_length, max_length))
+            start = None
+    if start is not None:
+        if segments and start - segments[-1][1] <= min_interval:
+            # 마지막 발화에 합친 뒤에도 max_length 를 넘지 않도록 다시 자름
+            last_start, _ = segments.pop()
+            segments.extend(_split_long(energy_db, last_start, end, min_length, max_length))
+        else:
+            segments.append((start, end))
+    # 유성 프레임이 거의 없는 구간은 발화가 아님
+    return [(s, e) for s, e in segments if voiced[s:e].mean() >= MIN_VOICED_RATIO]
+
+
+def _split_long(energy_db, start, end, min_length, max_length):
+    """max_length 를 넘는 구간을 [min_length, max_length] 안의 가장 조용한 프레임에서 반복해 자름"""
+    pieces = []
+    while max_length and end - start > max_length:
+        # 최소 1 프레임은 전진해야 무한 반복하지 않음
+        lo = start + max(1, min(min_length, max_length // 2))
+        split = lo + int(np.argmin(energy_db[lo:max(start + max_length, lo + 1)]))
+        pieces.append((start, split))
+        start = split
+    pieces.append((start, end))
+    return pieces
+
+
+def copy_clip(source, target, start, end, block_frames=DEFAULT_BLOCK_FRAMES, subtype="PCM_16"):
+    """source 의 [start, end) 샘플을 모노로 블록 단위 복사"""
+    with sf.SoundFile(source) as f:
+        f.seek(start)
+        with sf.SoundFile(target, "w", f.samplerate, 1, subtype=subtype) as out:
+            remaining = end - start
+            while remaining > 0:
+                block = f.read(min(block_frames, remaining), dtype="float32", always_2d=True)
+                if not len(block):
+                    break
+                out.write(block.mean(axis=1))
+                remaining -= len(block)
+
+
+def slice_file(path, output_dir, config=None, block_frames=DEFAULT_BLOCK_FRAMES):
+    """파일 하나를 발화 클립으로 자르고 매니페스트 항목 목록 반환"""
+    config = dict(DEFAULT_SLICE_CONFIG, **(config or {}))
+    start_time = time.perf_counter()
+    with sf.SoundFile(path) as f:
+        hop = max(1, int(f.samplerate * config["hop_size"] / 1000))
+    energy_db, sr, total = frame_energy_db(path, hop, block_frames)
+
+    def to_frames(ms, minimum=0):
+        return max(minimum, int(ms / config["hop_size"]))
+
+    # 발화 길이 한도는 hop_size 보다 작게 설정해도 최소 1 프레임
+    segments = find_segments(energy_db, config["threshold"], to_frames(config["min_length"], 1),
+                             to_frames(config["min_interval"]), to_frames(config["max_sil_kept"]),
+                             to_frames(config["max_length"], 1))
+
+    # 같은 이름의 파일이 감정 폴더마다 있으므로 원본 경로를 그대로 폴더 구조로 사용
+    stem = os.path.splitext(os.path.basename(path))[0]
+    clip_dir = os.path.join(output_dir, os.path.splitext(os.path.normpath(path))[0].lstrip(os.sep).replace("..", "_"))
+    os.makedirs(clip_dir, exist_ok=True)
+    entries = []
+    for n, (s, e) in enumerate(segments):
+        start, end = s * hop, min(e * hop, total)
+        clip = os.path.join(clip_dir, f"{stem}_{n:04d}.wav")
+        copy_clip(path, clip, start, end, block_frames)
+        entries.append({
+            "source": path,
+            "clip": clip,
+            "index": n,
+            "sample_rate": sr,
+            "start_sample": start,
+            "end_sample": end,
+            "start": round(start / sr, 3),
+            "end": round(end / sr, 3),
+            "duration": round((end - start) / sr, 3),
+            "mean_db": round(float(energy_db[s:e].mean()), 1),
+        })
+    return {"source": path, "entries": entries, "seconds": time.perf_counter() - start_time,
+            "duration": total / sr}
+
+
+def _slice_job(args):
+    path, output_dir, config, block_frames = args
+    try:
+        return slice_file(path, output_dir, config, block_frames), None
+    except Exception as e:
+        return {"source": path, "entries": []}, f"{type(e).__name__}: {e}"
+
+
+def slice_recordings(paths, output_dir, config=None, workers=1, block_frames=DEFAULT_BLOCK_FRAMES,
+                     manifest_name="manifest.jsonl"):
+    """여러 파일을 병렬로 자르고 매니페스트 (JSONL, 클립 한 줄씩) 저장. 반환: 파일별 (결과, 오류) 생성"""
+    os.makedirs(output_dir, exist_ok=True)
+    jobs = [(path, output_dir, config, block_frames) for path in paths]
+    manifest_path = os.path.join(output_dir, manifest_name)
+    tmp_path = manifest_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as manifest:
+        if workers > 1 and len(jobs) > 1:
+            with mp.get_context("spawn").Pool(min(workers, len(jobs))) as pool:
+                for result, error in pool.imap(_slice_job, jobs):
+                    _write_entries(manifest, result["entries"])
+                    yield result, error
+        else:
+            for job in jobs:
+                result, error = _slice_job(job)
+                _write_entries(manifest, result["entries"])
+                yield result, error
+    os.replace(tmp_path, manifest_path)
+
+
+def _write_entries(manifest, entries):
+    for entry in entries:
+        manifest.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+
+def load_manifest(path):
+    """매니페스트 JSONL -> 클립 항목 목록"""
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="긴 녹음을 무음 기준으로 발화 클립으로 자르기")
+    parser.add_argument("inputs", nargs="*", help="오디오 파일 또는 폴더 (기본: TDM_LLJ)")
+    parser.add_argument("--output-dir", default="sliced_references")
+    parser.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 1) // 2))
+    parser.add_argument("--block-frames", type=int, default=DEFAULT_BLOCK_FRAMES)
+    for key, value in DEFAULT_SLICE_CONFIG.items():
+        parser.add_argument(f"--{key.replace('_', '-')}", type=type(value), default=value)
+    args = parser.parse_args()
+
+    paths = []
+    for item in args.inputs or ["TDM_LLJ"]:
+        paths.extend(find_recordings(item) if os.path.isdir(item) else [item])
+    config = {key: getattr(args, key) for key in DEFAULT_SLICE_CONFIG}
+
+    print("✂️ 무음 기준 발화 자르기 ✂️\n")
+    if not paths:
+        print("❌ 자를 오디오 파일이 없습니다.")
+        return
+    print(f"📁 {len(paths)}개 파일 -> {args.output_dir}/ (워커 {args.workers})\n")
+
+    start = time.perf_counter()
+    clips = audio_seconds = 0
+    for result, error in slice_recordings(paths, args.output_dir, config, args.workers, args.block_frames):
+        if error:
+            print(f"❌ {result['source']}: {error}")
+            continue
+        entries = result["entries"]
+        kept = sum(e["duration"] for e in entries)
+        clips += len(entries)
+        audio_seconds += result["duration"]
+        print(f"✅ {result['source']}: {result['duration'] / 60:.1f}분 -> 클립 {len(entries)}개 "
+              f"(발화 {kept / 60:.1f}분, {result['seconds']:.1f}초)")
+    elapsed = time.perf_counter() - start
+    print(f"\n🎉 클립 {clips}개, 오디오 {audio_seconds / 60:.1f}분을 {elapsed:.1f}초에 처리 "
+          f"(실시간 {audio_seconds / max(elapsed, 1e-9):.0f}배)")
+    print(f"📋 매니페스트: {os.path.join(args.output_dir, 'manifest.jsonl')}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,28 +1,70 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+import argparse
 import requests
 import json
 import time
 import os
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from progressive_tts import ProgressiveSynthesizer, split_sentences
+from request_coalescing import CoalescingClient
+from script_loader import load_records
+from speaker_router import StickyBalancer
+from tts_load_balancer import dedupe_endpoints, print_snapshot
+from tts_traffic import post_tts
+
+# 가능한 TTS API 엔드포인트들
+POSSIBLE_ENDPOINTS = [
+    "http://localhost:9880/tts",
+    "http://localhost:9880/",
+    "http://localhost:9871/tts", 
+    "http://localhost:9872/tts",
+    "http://localhost:9873/tts",
+    "http://localhost:9881/tts",
+    "http://127.0.0.1:9880/tts",
+    "http://127.0.0.1:9871/tts"
+]
+
+# 회전초밥 대화 스크립트 (처음 10개)
+DIALOGUE = [
+    ("현정", "회전초밥 먹으러 갈래요?", "confident"),
+    ("김환석", "좋죠.", "agreeable"),
+    ("현정", "송실장 크루즈 준비해줘요.", "commanding"),
+    ("송치호", "네.", "polite"),
+    ("김환석", "회전초밥 먹는데 왜 크루즈를 준비해요?", "confused"),
+    ("현정", "5대양을 한바퀴 돌면서 먹는 초밥이 회전초밥이잖아요.", "explaining"),
+    ("김환석", "접시가 도는 게 아니라 배가 도는 거구나.", "understanding"),
+    ("현정", "송실장 첫 번째 코스는 블랙킹 타이거 새우초밥으로 예약해줘요.", "ordering"),
+    ("송치호", "어사출도 대서양점 예약해 놓겠습니다.", "professional"),
+    ("김환석", "어사출도가 대서양까지 진출했네.", "amazed")
+]
+
+def build_tts_data(text, seed=-1):
+    """대화 한 줄의 v2 /tts 요청 데이터"""
+    return {
+        "text": text,
+        "text_lang": "ko",
+        "ref_audio_path": "TDM_LLJ/PTD/J.LJJ15m.wav",
+        "aux_ref_audio_paths": [],
+        "prompt_text": "안녕하세요",
+        "prompt_lang": "ko",
+        "top_k": 15,
+        "top_p": 1.0,
+        "temperature": 1.0,
+        "text_split_method": "cut5",
+        "batch_size": 1,
+        "speed_factor": 1.0,
+        "seed": seed,
+        "media_type": "wav"
+    }
 
 def test_tts_api():
     """TTS API 테스트 및 요청"""
     
     print("🎭 TTS API 요청 테스트 🎭\n")
     
-    # 가능한 TTS API 엔드포인트들
-    possible_endpoints = [
-        "http://localhost:9880/tts",
-        "http://localhost:9880/",
-        "http://localhost:9871/tts", 
-        "http://localhost:9872/tts",
-        "http://localhost:9873/tts",
-        "http://localhost:9881/tts",
-        "http://127.0.0.1:9880/tts",
-        "http://127.0.0.1:9871/tts"
-    ]
-    
     # 테스트 데이터
     test_data = {
         "text": "안녕하세요, 회전초밥 먹으러 갈래요?",
@@ -48,7 +90,7 @@ def test_tts_api():
     working_endpoint = None
     
     # 각 엔드포인트 테스트
-    for endpoint in possible_endpoints:
+    for endpoint in POSSIBLE_ENDPOINTS:
         try:
             print(f"🔍 테스트 중: {endpoint}")
             
@@ -57,7 +99,7 @@ def test_tts_api():
             print(f"   📡 연결 성공 (상태: {response.status_code})")
             
             # TTS 요청 테스트
-            tts_response = requests.post(endpoint, json=test_data, timeout=15)
+            tts_response = post_tts(endpoint, test_data, timeout=15)
             
             if tts_response.status_code == 200:
                 print(f"   ✅ TTS 성공! 길이: {len(tts_response.content)} bytes")
@@ -91,7 +133,7 @@ def test_tts_api():
         print("   'Start TTS Inference Server' 버튼이 있다면 클릭해주세요.")
         return None
 
-def generate_dialogue_tts(endpoint):
+def generate_dialogue_tts(endpoint, script_path=None, progressive=False, seed=-1):
     """대화 스크립트 전체 TTS 생성"""
     
     if not endpoint:
@@ -100,54 +142,48 @@ def generate_dialogue_tts(endpoint):
     print(f"\n🎭 대화 TTS 자동 생성 시작! 🎭")
     print(f"🔗 사용 엔드포인트: {endpoint}\n")
     
-    # 회전초밥 대화 스크립트 (처음 10개)
-    dialogue = [
-        ("현정", "회전초밥 먹으러 갈래요?", "confident"),
-        ("김환석", "좋죠.", "agreeable"),
-        ("현정", "송실장 크루즈 준비해줘요.", "commanding"),
-        ("송치호", "네.", "polite"),
-        ("김환석", "회전초밥 먹는데 왜 크루즈를 준비해요?", "confused"),
-        ("현정", "5대양을 한바퀴 돌면서 먹는 초밥이 회전초밥이잖아요.", "explaining"),
-        ("김환석", "접시가 도는 게 아니라 배가 도는 거구나.", "understanding"),
-        ("현정", "송실장 첫 번째 코스는 블랙킹 타이거 새우초밥으로 예약해줘요.", "ordering"),
-        ("송치호", "어사출도 대서양점 예약해 놓겠습니다.", "professional"),
-        ("김환석", "어사출도가 대서양까지 진출했네.", "amazed")
-    ]
+    # --script 가 있으면 파일에서 한 줄씩 읽음 (전체를 메모리에 올리지 않음)
+    dialogue = load_records(script_path, DIALOGUE)
     
     # 출력 디렉토리
     output_dir = "api_generated_tts_output"
     os.makedirs(output_dir, exist_ok=True)
     
     print(f"📁 출력 폴더: {output_dir}")
-    print(f"🎯 {len(dialogue)}개 대화 생성\n")
+    if script_path:
+        print(f"🎯 {script_path} 대화 생성\n")
+    else:
+        print(f"🎯 {len(DIALOGUE)}개 대화 생성\n")
     
     success_count = 0
+    total = 0
+    
+    # 긴 대사는 문장별로 동시에 요청해 도착하는 대로 파일에 씀
+    synthesizer = None
+    if progressive:
+        synthesizer = ProgressiveSynthesizer(lambda payload: post_tts(endpoint, payload, timeout=20))
     
-    for i, (character, text, emotion) in enumerate(dialogue, 1):
+    for i, (character, text, lang, emotion) in enumerate(dialogue, 1):
+        total = i
         try:
             print(f"🎤 {i:2d}. {character} ({emotion})")
             print(f"    💬 \"{text}\"")
             
             # TTS 요청 데이터
-            tts_data = {
-                "text": text,
-                "text_lang": "ko",
-                "ref_audio_path": "TDM_LLJ/PTD/J.LJJ15m.wav",
-                "aux_ref_audio_paths": [],
-                "prompt_text": "안녕하세요",
-                "prompt_lang": "ko",
-                "top_k": 15,
-                "top_p": 1.0,
-                "temperature": 1.0,
-                "text_split_method": "cut5",
-                "batch_size": 1,
-                "speed_factor": 1.0,
-                "seed": -1,
-                "media_type": "wav"
-            }
+            tts_data = build_tts_data(text, seed)
+            tts_data["text_lang"] = lang
+            
+            if synthesizer and len(split_sentences(text)) > 1:
+                filename = f"{output_dir}/{i:02d}_{character}_{emotion}.wav"
+                first, elapsed, _ = synthesizer.synthesize_to_file(tts_data, filename, speaker=character)
+                size = os.path.getsize(filename)
+                print(f"    ✅ 저장: {filename} ({size:,} bytes, 첫 음성 {first:.2f}초 / 전체 {elapsed:.2f}초)")
+                success_count += 1
+                print()
+                continue
             
             # TTS 생성
-            response = requests.post(endpoint, json=tts_data, timeout=20)
+            response = post_tts(endpoint, tts_data, timeout=20)
             
             if response.status_code == 200:
                 filename = f"{output_dir}/{i:02d}_{character}_{emotion}.wav"
@@ -167,8 +203,11 @@ def generate_dialogue_tts(endpoint):
         print()
         time.sleep(1)  # API 부하 방지
     
+    if synthesizer:
+        synthesizer.close()
+    
     print(f"🎉 대화 TTS 생성 완료!")
-    print(f"✅ 성공: {success_count}/{len(dialogue)}개")
+    print(f"✅ 성공: {success_count}/{total}개")
     
     if success_count > 0:
         first_file = f"{output_dir}/01_현정_confident.wav"
@@ -176,10 +215,96 @@ def generate_dialogue_tts(endpoint):
             print(f"\n🎵 첫 번째 파일 재생:")
             print(f"   afplay {first_file}")
 
+def generate_dialogue_tts_balanced(balancer, max_parallel=4, seed=-1, script_path=None, progressive=False):
+    """살아있는 모든 엔드포인트에 줄을 나눠 보내 대화 TTS 생성
+
+    seed 를 고정하면 동시에 진행 중인 같은 줄("네." 등)은 한 번만 요청한다.
+    progressive 이면 긴 대사는 문장별로 나눠 여러 서버에 동시에 보내고 도착하는 대로 파일에 쓴다.
+    """
+    
+    print(f"\n🎭 대화 TTS 분산 생성 시작! 🎭")
+    print(f"🔗 엔드포인트 {len(balancer.states)}개, 동시 요청 {max_parallel}개\n")
+    
+    output_dir = "api_generated_tts_output"
+    os.makedirs(output_dir, exist_ok=True)
+    
+    # 같은 화자 / 참조 음성은 같은 서버로 보내 참조 캐시를 재사용
+    # (이 스크립트의 캐릭터는 참조와 프롬프트가 모두 같으므로 화자를 키에 넣어야 서버별로 나뉨)
+    client = CoalescingClient(lambda url, payload, **kwargs: balancer.post_routed(payload, **kwargs)[0])
+    
+    # 문장 요청도 같은 분산기로 보냄 (같은 화자는 같은 서버 우선, 과부하면 다른 서버로)
+    def post_sentence(payload, speaker=None):
+        return balancer.post_routed(payload, timeout=20, speaker=speaker)[0]
+    
+    synthesizer = ProgressiveSynthesizer(post_sentence, max_workers=max_parallel) if progressive else None
+    
+    def render(i, character, text, lang, emotion):
+        tts_data = build_tts_data(text, seed)
+        tts_data["text_lang"] = lang
+        if synthesizer and len(split_sentences(text)) > 1:
+            filename = f"{output_dir}/{i:02d}_{character}_{emotion}.wav"
+            try:
+                first, elapsed, _ = synthesizer.synthesize_to_file(tts_data, filename, speaker=character)
+            except Exception as e:
+                print(f"❌ {i:2d}. {character}: {e}")
+                return False
+            print(f"✅ {i:2d}. {character} ({emotion}) 문장별 (첫 음성 {first:.2f}초 / 전체 {elapsed:.2f}초)")
+            return True
+        try:
+            response = client.post("/tts", tts_data, timeout=20, speaker=character)
+        except Exception as e:
+            print(f"❌ {i:2d}. {character}: {e}")
+            return False
+        if response.status_code != 200:
+            print(f"❌ {i:2d}. {character}: TTS 실패 (상태: {response.status_code})")
+            return False
+        filename = f"{output_dir}/{i:02d}_{character}_{emotion}.wav"
+        with open(filename, 'wb') as f:
+            f.write(response.content)
+        print(f"✅ {i:2d}. {character} ({emotion}) <- {response.url}")
+        return True
+    
+    # 진행 중인 요청을 동시 요청 수의 몇 배까지만 유지하고, 하나가 끝나면 바로 다음 줄을 제출
+    # -> 긴 스크립트도 대기 작업이 쌓이지 않고, 느린 줄 하나 때문에 나머지가 멈추지 않음
+    success_count = total = 0
+    pending = set()
+    with ThreadPoolExecutor(max_workers=max_parallel) as pool:
+        for i, line in enumerate(load_records(script_path, DIALOGUE), 1):
+            if len(pending) >= 4 * max_parallel:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                success_count += sum(f.result() for f in done)
+            pending.add(pool.submit(render, i, *line))
+            total += 1
+        success_count += sum(f.result() for f in pending)
+    if synthesizer:
+        synthesizer.close()
+    
+    print(f"\n🎉 대화 TTS 생성 완료!")
+    print(f"✅ 성공: {success_count}/{total}개")
+    print_snapshot(balancer)
+    print(f"🔀 과부하로 다른 서버에 넘긴 요청: {balancer.spills}개")
+    print(f"🩹 장애 / 재시도로 다른 서버에 넘긴 요청: {balancer.failovers}개")
+    print(f"🔗 병합된 동일 요청: {client.stats['coalesced']}개")
+
 if __name__ == "__main__":
-    # 1. API 테스트
-    working_endpoint = test_tts_api()
+    parser = argparse.ArgumentParser(description="TTS API 대화 생성")
+    parser.add_argument("--script", help="CSV / JSONL 대화 스크립트 (speaker, text, lang, emotion)")
+    parser.add_argument("--progressive", action="store_true", help="긴 대사는 문장별로 동시에 요청")
+    parser.add_argument("--seed", type=int, default=-1,
+                        help="샘플링 seed (기본 -1 은 매번 무작위, 고정하면 분산 모드에서 동시에 진행 중인 같은 줄을 한 번만 요청)")
+    args = parser.parse_args()
     
-    # 2. 대화 TTS 생성
-    if working_endpoint:
-        generate_dialogue_tts(working_endpoint)
+    # 1. v2 엔드포인트가 여러 개 살아있으면 모두 사용
+    balancer = StickyBalancer(dedupe_endpoints(POSSIBLE_ENDPOINTS))
+    live_endpoints = balancer.probe_all()
+    
+    if len(live_endpoints) > 1:
+        generate_dialogue_tts_balanced(balancer, max_parallel=2 * len(live_endpoints),
+                                       seed=args.seed, script_path=args.script, progressive=args.progressive)
+    else:
+        # 2. API 테스트
+        working_endpoint = test_tts_api()
+        
+        # 3. 대화 TTS 생성
+        if working_endpoint:
+            generate_dialogue_tts(working_endpoint, args.script, args.progressive, args.seed)
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+화자 / 참조 음성 고정 라우팅 - 일관 해싱으로 워커별 참조 캐시를 유지하고 과부하 시 다음 워커로 넘김
+"""
+
+import bisect
+import hashlib
+import math
+
+from tts_load_balancer import EndpointBalancer
+
+
+def _hash(value):
+    """프로세스와 무관하게 안정적인 64비트 해시"""
+    return int.from_bytes(hashlib.md5(value.encode("utf-8")).digest()[:8], "big")
+
+
+def reference_key(payload, speaker=None):
+    """요청의 참조 캐시 키: 참조 음성 + 프롬프트 (레거시 / v2 스키마 모두 지원)"""
+    ref = payload.get("ref_audio_path") or payload.get("refer_wav_path") or ""
+    prompt = payload.get("prompt_text", "")
+    prompt_lang = payload.get("prompt_lang") or payload.get("prompt_language") or ""
+    key = f"{ref}|{prompt}|{prompt_lang}"
+    # 같은 참조를 쓰더라도 화자별로 나누고 싶을 때만 speaker 를 붙임
+    return f"{key}|{speaker}" if speaker else key
+
+
+class ConsistentHashRing:
+    """가상 노드를 둔 일관 해시 링 (노드가 빠져도 나머지 키의 배치는 유지)"""
+
+    def __init__(self, nodes, replicas=64):
+        self.replicas = replicas
+        self.ring = sorted((_hash(f"{node}#{i}"), node) for node in nodes for i in range(replicas))
+        self.points = [point for point, _ in self.ring]
+        self.node_count = len(set(nodes))
+
+    def preference(self, key):
+        """key 에 대한 노드 선호 순서 (링을 시계 방향으로 돌며 중복 제거)"""
+        if not self.ring:
+            return []
+        start = bisect.bisect(self.points, _hash(key))
+        order, seen = [], set()
+        for i in range(len(self.ring)):
+            node = self.ring[(start + i) % len(self.ring)][1]
+            if node not in seen:
+                seen.add(node)
+                order.append(node)
+                if len(order) == self.node_count:
+                    break
+        return order
+
+
+class StickyBalancer(EndpointBalancer):
+    """key 가 있으면 일관 해싱 순서대로, 워커가 과부하면 다음 워커로 넘기는 분산기
+
+    과부하 기준은 bounded-load 일관 해싱과 같이 평균 진행 요청 수 x load_factor.
+    앞 순위 워커를 건너뛴 이유에 따라 과부하로 넘긴 요청은 spills, 장애 / 재시도 제외로
+    넘긴 요청은 failovers 로 따로 센다.
+    """
+
+    def __init__(self, endpoints, load_factor=1.25, **kwargs):
+        super().__init__(endpoints, **kwargs)
+        self.load_factor = load_factor
+        self.ring = ConsistentHashRing(endpoints)
+        self.by_url = {s.url: s for s in self.states}
+        self.spills = 0
+        self.failovers = 0
+
+    def _pick(self, key=None, exclude=()):
+        if key is None:
+            return super()._pick(exclude=exclude)
+
+        candidates = self._candidates(exclude)
+        if not candidates:
+            return None
+
+        healthy = [s for s in self.states if s.healthy]
+        total = sum(s.outstanding for s in healthy) + 1
+        capacity = max(1, math.ceil(self.load_factor * total / len(healthy)))
+        preference = self.ring.preference(key)
+        overloaded = False
+        for rank, url in enumerate(preference):
+            state = self.by_url[url]
+            if state not in candidates:
+                continue
+            if state.outstanding >= capacity:
+                overloaded = True
+                continue
+            if rank > 0:
+                self._count_detour(overloaded)
+            return state
+        state = super()._pick(exclude=exclude)
+        if state is not None and state.url != preference[0]:
+            self._count_detour(overloaded)
+        return state
+
+    def _count_detour(self, overloaded):
+        """home 이 아닌 워커로 보낸 요청을 원인별로 집계 (과부하 워커를 건너뛰었으면 spill)"""
+        if overloaded:
+            self.spills += 1
+        else:
+            self.failovers += 1
+
+    def post_routed(self, payload, timeout=20, retries=2, speaker=None):
+        """요청의 참조 키로 라우팅해서 전송"""
+        return self.post(payload, timeout=timeout, retries=retries, key=reference_key(payload, speaker))
+
+    def home_of(self, key):
+        """장애가 없을 때 key 가 배정되는 엔드포인트"""
+        preference = self.ring.preference(key)
+        return preference[0] if preference else None
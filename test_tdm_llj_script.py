@@ -4,6 +4,7 @@
 GPT-SoVITS를 사용하여 TDM_LLJ 음성으로 대화 스크립트 테스트
 """
 
+import argparse
 import os
 import sys
 import requests
@@ -11,6 +12,10 @@ import json
 import time
 from pathlib import Path
 
+from language_scheduler import schedule_order, stitch_in_script_order
+from script_loader import batched, load_records
+from tts_traffic import post_tts
+
 # GPT-SoVITS API 설정 (실제 API 포트)
 API_BASE_URL = "http://127.0.0.1:9880"
 
@@ -86,8 +91,8 @@ def find_reference_audio():
     
     return audio_files
 
-def generate_tts(text, ref_audio_path, language="auto", output_path=None):
-    """TTS 생성 - GPT-SoVITS API 사용"""
+def generate_tts(text, ref_audio_path, language="auto", output_path=None, api_base_url=None):
+    """TTS 생성 - GPT-SoVITS API 사용 (api_base_url 이 없으면 API_BASE_URL)"""
     try:
         # 언어 코드 변환
         lang_map = {
@@ -112,7 +117,7 @@ def generate_tts(text, ref_audio_path, language="auto", output_path=None):
             "speed": 1.0
         }
         
-        response = requests.post(f"{API_BASE_URL}/", json=data)
+        response = post_tts(f"{api_base_url or API_BASE_URL}/", data)
         
         if response.status_code == 200:
             if output_path:
@@ -129,7 +134,44 @@ def generate_tts(text, ref_audio_path, language="auto", output_path=None):
         print(f"TTS 생성 중 오류: {e}")
         return None
 
-def main():
+def render_script(records, ref_audio, output_dir):
+    """스크립트를 생성하고 줄별 결과 경로 (실패는 None) 를 스크립트 순서로 생성
+
+    같은 언어끼리 모아서 실행하되 (파일 번호는 스크립트 순서 유지), 묶음 단위로 읽어 묶음 안에서만
+    재정렬하므로 긴 스크립트도 메모리가 일정하다. 묶음이 끝나면 그 묶음의 경로를 바로 내보낸다.
+    """
+    offset = 0
+    for batch in batched(records):
+        lines = [record._asdict() for record in batch]
+        outputs = [None] * len(lines)
+        
+        for j in schedule_order(lines, ref_audio):
+            i = offset + j
+            line = lines[j]
+            print(f"\n📝 {i+1:02d}. [{line['speaker']}] {line['text'][:50]}...")
+            
+            output_file = output_dir / f"{i+1:02d}_{line['speaker']}_{line['lang']}.wav"
+            
+            result = generate_tts(
+                text=line['text'],
+                ref_audio_path=ref_audio,
+                language=line['lang'],
+                output_path=str(output_file)
+            )
+            
+            if result:
+                outputs[j] = str(output_file)
+                print(f"✅ 생성 완료: {output_file}")
+            else:
+                print(f"❌ 생성 실패")
+            
+            # API 부하 방지를 위한 대기
+            time.sleep(2)
+        
+        yield from outputs
+        offset += len(lines)
+
+def main(script_path=None):
     print("🎤 GPT-SoVITS TDM_LLJ 스크립트 테스트 시작")
     
     # API 상태 확인
@@ -166,27 +208,17 @@ def main():
     # 스크립트 각 라인에 대해 TTS 생성
     print("\n🎬 스크립트 TTS 생성 시작...")
     
-    for i, line in enumerate(SCRIPT_LINES):
-        print(f"\n📝 {i+1:02d}. [{line['speaker']}] {line['text'][:50]}...")
-        
-        output_file = output_dir / f"{i+1:02d}_{line['speaker']}_{line['lang']}.wav"
-        
-        result = generate_tts(
-            text=line['text'],
-            ref_audio_path=ref_audio,
-            language=line['lang'],
-            output_path=str(output_file)
-        )
-        
-        if result:
-            print(f"✅ 생성 완료: {output_file}")
-        else:
-            print(f"❌ 생성 실패")
-        
-        # API 부하 방지를 위한 대기
-        time.sleep(2)
+    # 스크립트 순서대로 이어붙인 전체 타임라인
+    # 묶음이 끝날 때마다 그 묶음의 결과를 바로 타임라인에 이어붙임 (전체 결과 목록을 들고 있지 않음)
+    rendered = render_script(load_records(script_path, SCRIPT_LINES), ref_audio, output_dir)
+    timeline = stitch_in_script_order(rendered, str(output_dir / "timeline.wav"))
+    if timeline:
+        print(f"\n🎞️ 전체 타임라인: {timeline}")
     
     print(f"\n🎉 테스트 완료! 생성된 파일들은 {output_dir} 폴더에 있습니다.")
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="TDM_LLJ 대화 스크립트 테스트")
+    parser.add_argument("--script", help="CSV / JSONL 대화 스크립트 (speaker, text, lang, emotion)")
+    args = parser.parse_args()
+    main(args.script) 
\ No newline at end of file
@@ -0,0 +1,7 @@
+# -*- coding: utf-8 -*-
+"""루트의 스크립트 모듈을 테스트에서 import 할 수 있도록 경로 추가"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+"""incremental_render: 렌더링 중 중단돼도 옮겨진 파일을 다른 줄로 재사용하지 않아야 함"""
+
+import os
+
+import pytest
+
+from incremental_render import sync_outputs
+from script_loader import ScriptRecord
+
+
+def _records(*texts):
+    return [ScriptRecord("현정", text, "ko", "calm") for text in texts]
+
+
+def _filename(i, record):
+    return f"{i:02d}_{record.speaker}_{record.emotion}.wav"
+
+
+def _write_text(jobs):
+    for i, record, path in jobs:
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(record.text)
+        yield i, None
+
+
+def _interrupt(jobs):
+    raise KeyboardInterrupt
+    yield
+
+
+def _read(output_dir, name):
+    with open(os.path.join(output_dir, name), encoding="utf-8") as f:
+        return f.read()
+
+
+def test_interrupted_sync_keeps_swapped_lines_correct(tmp_path):
+    output_dir = str(tmp_path)
+    sync_outputs(_records("AAA", "BBB", "CCC"), output_dir, _filename, _write_text)
+
+    # 같은 화자 / 감정의 두 줄을 바꾸고 한 줄을 고친 뒤 렌더링 도중 중단 (감시 모드의 Ctrl+C)
+    swapped = _records("BBB", "AAA", "DDD")
+    with pytest.raises(KeyboardInterrupt):
+        sync_outputs(swapped, output_dir, _filename, _interrupt)
+
+    stats = sync_outputs(swapped, output_dir, _filename, _write_text)
+    assert stats["rendered"] == 1
+    assert [_read(output_dir, _filename(i, r)) for i, r in enumerate(swapped, 1)] == ["BBB", "AAA", "DDD"]
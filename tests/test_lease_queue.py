@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+"""lease_queue: 합성이 연장 주기보다 길어도 워커가 멈추지 않아야 함"""
+
+import multiprocessing as mp
+
+from lease_queue import LeaseQueue, make_stub_synthesizer, run_worker
+
+LEASE_SECONDS = 0.3
+SYNTH_SECONDS = 0.5
+
+
+def _node(db_path, node):
+    queue = LeaseQueue(db_path, lease_seconds=LEASE_SECONDS, skew_seconds=0.0)
+    run_worker(queue, make_stub_synthesizer(seconds=SYNTH_SECONDS), owner=f"node{node}")
+    queue.close()
+
+
+def test_workers_finish_when_synthesis_outlasts_heartbeat(tmp_path):
+    db_path = str(tmp_path / "queue.sqlite3")
+    queue = LeaseQueue(db_path, lease_seconds=LEASE_SECONDS, skew_seconds=0.0)
+    lines = [{"speaker": "현정", "text": f"줄 {i}", "emotion": "calm"} for i in range(4)]
+    queue.enqueue("test", lines, str(tmp_path / "out"))
+
+    ctx = mp.get_context("spawn")
+    processes = [ctx.Process(target=_node, args=(db_path, n)) for n in range(2)]
+    for p in processes:
+        p.start()
+    for p in processes:
+        p.join(timeout=30)
+    hung = [p for p in processes if p.is_alive()]
+    for p in hung:
+        p.terminate()
+
+    assert not hung
+    assert all(p.exitcode == 0 for p in processes)
+    # 연장 덕분에 임대를 잃지 않고 모든 줄이 한 번에 끝남
+    assert queue.status() == {"done": len(lines)}
+    queue.close()
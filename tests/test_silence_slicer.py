@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+"""silence_slicer: 긴 무음을 사이에 둔 짧은 발화가 무음 클립을 만들지 않아야 함"""
+
+import numpy as np
+import soundfile as sf
+
+from silence_slicer import DEFAULT_SLICE_CONFIG, find_segments, slice_file
+
+SR = 16000
+
+
+def _tone(seconds):
+    t = np.arange(int(SR * seconds)) / SR
+    return 0.5 * np.sin(2 * np.pi * 220 * t)
+
+
+def _silence(seconds, rng):
+    return rng.normal(0, 1e-4, int(SR * seconds))  # 약 -80 dB
+
+
+def test_short_utterance_before_long_silence(tmp_path):
+    rng = np.random.default_rng(0)
+    path = str(tmp_path / "take.wav")
+    sf.write(path, np.concatenate([_tone(0.5), _silence(60, rng), _tone(3.0), _silence(1, rng)]), SR)
+
+    entries = slice_file(path, str(tmp_path / "clips"))["entries"]
+
+    # 짧은 발화는 60초 무음 너머로 합쳐지지 않고 따로, 무음만 있는 클립은 없음
+    assert [round(entry["start"]) for entry in entries] == [0, 60]
+    assert all(entry["duration"] < 4.0 for entry in entries)
+    assert all(entry["mean_db"] > DEFAULT_SLICE_CONFIG["threshold"] for entry in entries)
+
+
+def test_short_utterances_close_together_are_merged():
+    # 프레임 단위: 50 유성, 무음 40, 유성 50, 무음 5000
+    energy_db = np.concatenate([np.full(50, -10.0), np.full(40, -80.0), np.full(50, -10.0), np.full(5000, -80.0)])
+    segments = find_segments(energy_db, min_length=200, min_interval=30, max_sil_kept=30, max_length=1500)
+    assert len(segments) == 1
+    start, end = segments[0]
+    assert start == 0 and end <= 140 + 30
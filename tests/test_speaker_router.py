@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+"""speaker_router: 참조와 프롬프트가 같은 캐릭터도 화자별로 다른 워커에 배정되어야 함"""
+
+from collections import defaultdict
+
+import simple_tts_request
+import tts_load_balancer
+from speaker_router import StickyBalancer
+
+ENDPOINTS = [f"http://tts{n}:9880/tts" for n in range(3)]
+
+
+class _FakeResponse:
+    status_code = 200
+    content = b""
+
+    def __init__(self, url):
+        self.url = url
+
+
+def _balancer():
+    balancer = StickyBalancer(ENDPOINTS)
+    for state in balancer.states:
+        state.healthy = True
+    return balancer
+
+
+def test_dialogue_speakers_spread_across_workers(tmp_path, monkeypatch):
+    routed = defaultdict(set)
+
+    def fake_post_tts(url, payload, timeout=None, **kwargs):
+        routed[payload["text"]].add(url)
+        return _FakeResponse(url)
+
+    monkeypatch.setattr(tts_load_balancer, "post_tts", fake_post_tts)
+    monkeypatch.chdir(tmp_path)
+    balancer = _balancer()
+
+    # 한 줄씩 보내 과부하로 넘기는 경우 없이 화자 배정만 확인
+    simple_tts_request.generate_dialogue_tts_balanced(balancer, max_parallel=1)
+
+    homes = defaultdict(set)
+    for speaker, text, _ in simple_tts_request.DIALOGUE:
+        homes[speaker] |= routed[text]
+    # 화자마다 한 워커에 고정되고, 화자들은 여러 워커로 나뉨
+    assert all(len(urls) == 1 for urls in homes.values())
+    assert len(set().union(*homes.values())) > 1
+    assert balancer.spills == 0 and balancer.failovers == 0
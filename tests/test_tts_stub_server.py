@@ -0,0 +1,22 @@
+# -*- coding: utf-8 -*-
+"""tts_stub_server: 1 RPS 미만 제한에서도 요청이 간격을 두고 통과해야 함"""
+
+import threading
+import time
+
+from tts_stub_server import TokenBucket
+
+
+def test_token_bucket_below_one_rps():
+    bucket = TokenBucket(4.0 / 5)  # 0.8 RPS -> 두 번째 요청은 1.25초 뒤
+    start = time.monotonic()
+    done = threading.Event()
+
+    def take_two():
+        bucket.acquire()
+        bucket.acquire()
+        done.set()
+
+    threading.Thread(target=take_two, daemon=True).start()
+    assert done.wait(5.0)
+    assert 1.1 <= time.monotonic() - start < 2.5
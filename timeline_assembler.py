@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+대화 타임라인 스트리밍 조립 - 줄별 파일을 고정 크기 블록으로 읽어 하나의 WAV/FLAC 으로 이어붙임
+
+줄 사이에는 fragment_interval 처럼 무음 간격을 넣거나 크로스페이드로 겹치고,
+화자별 스템 트랙과 줄 타임스탬프 큐 시트도 함께 만든다. 긴 대화도 메모리에는
+블록 몇 개 분량만 올라간다.
+"""
+
+import argparse
+import csv
+import os
+import re
+
+import numpy as np
+import soundfile as sf
+
+DEFAULT_BLOCK_FRAMES = 65536
+
+# NN_화자_감정.wav 형태의 줄별 출력 파일
+LINE_FILE_PATTERN = re.compile(r"^(\d+)_(.+)_([^_]+)\.(wav|flac|opus|ogg)$", re.IGNORECASE)
+
+
+class _OverlapWriter:
+    """겹쳐 더하기가 가능한 스트리밍 트랙 (아직 겹칠 수 있는 끝부분만 메모리에 보관)"""
+
+    def __init__(self, f, block_frames):
+        self.f = f
+        self.block_frames = block_frames
+        self.pos = 0                                   # 파일에 쓴 프레임 수
+        self.buf = np.zeros(0, dtype=np.float32)       # pos 부터 시작하는 미확정 구간
+
+    def _write_silence(self, frames):
+        block = np.zeros(min(frames, self.block_frames), dtype=np.float32)
+        while frames > 0:
+            n = min(frames, len(block))
+            self.f.write(block[:n])
+            frames -= n
+
+    def add(self, start, audio):
+        """절대 위치 start 에 audio 를 더함 (start 는 이미 쓴 위치보다 앞이면 안 됨)"""
+        if start > self.pos + len(self.buf):
+            # 긴 무음은 버퍼에 쌓지 않고 바로 씀 (다른 화자가 오래 말하는 스템 등)
+            self.f.write(self.buf)
+            self._write_silence(start - self.pos - len(self.buf))
+            self.pos, self.buf = start, np.zeros(0, dtype=np.float32)
+        end = start + len(audio) - self.pos
+        if end > len(self.buf):
+            self.buf = np.concatenate([self.buf, np.zeros(end - len(self.buf), dtype=np.float32)])
+        self.buf[start - self.pos:end] += audio
+
+    def flush(self, upto):
+        """upto 이전 구간은 더 겹칠 일이 없으므로 파일로 내보냄"""
+        n = min(max(upto - self.pos, 0), len(self.buf))
+        if n:
+            self.f.write(self.buf[:n])
+            self.buf = self.buf[n:].copy()
+            self.pos += n
+
+    def close(self, length=None):
+        self.f.write(self.buf)
+        self.pos += len(self.buf)
+        if length is not None and length > self.pos:
+            self._write_silence(length - self.pos)
+        self.f.close()
+
+
+def _fade_gains(offset, frames, length, fade_in, fade_out):
+    """줄 안의 [offset, offset+frames) 구간에 적용할 등전력 페이드 이득 (페이드가 없으면 None)"""
+    if not fade_in and not fade_out:
+        return None
+    index = np.arange(offset, offset + frames, dtype=np.float32)
+    gains = np.ones(frames, dtype=np.float32)
+    if fade_in:
+        head = index < fade_in
+        gains[head] = np.sin(0.5 * np.pi * (index[head] + 0.5) / fade_in)
+    if fade_out:
+        tail = index >= length - fade_out
+        gains[tail] *= np.cos(0.5 * np.pi * (index[tail] - (length - fade_out) + 0.5) / fade_out)
+    return gains
+
+
+def items_from_dir(output_dir):
+    """NN_화자_감정.wav 파일 목록을 줄 번호 순서의 (경로, 화자, 라벨) 로 변환"""
+    items = []
+    for name in os.listdir(output_dir):
+        match = LINE_FILE_PATTERN.match(name)
+        if match:
+            items.append((int(match.group(1)), os.path.join(output_dir, name), match.group(2),
+                          os.path.splitext(name)[0]))
+    return [(path, speaker, label) for _, path, speaker, label in sorted(items)]
+
+
+def _peek(iterator):
+    """(현재, 다음) 쌍으로 순회 (마지막은 다음이 None)"""
+    current = next(iterator, None)
+    while current is not None:
+        following = next(iterator, None)
+        yield current, following
+        current = following
+
+
+def _line_frames(path):
+    try:
+        return sf.info(path).frames
+    except RuntimeError:
+        return 0
+
+
+def write_cue_sheet(cues, path, audio_name):
+    """큐 시트 저장: .cue 는 CUE 형식, 그 밖에는 CSV"""
+    if path.lower().endswith(".cue"):
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(f'FILE "{audio_name}" WAVE\n')
+            for cue in cues:
+                # CUE 시각은 mm:ss:ff (1/75초 프레임)
+                total = int(round(cue["start"] * 75))
+                f.write(f"  TRACK {cue['index']:02d} AUDIO\n")
+                f.write(f'    TITLE "{cue["label"]}"\n')
+                f.write(f'    PERFORMER "{cue["speaker"]}"\n')
+                f.write(f"    INDEX 01 {total // 4500:02d}:{total // 75 % 60:02d}:{total % 75:02d}\n")
+        return path
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=["index", "speaker", "label", "start", "end", "file"])
+        writer.writeheader()
+        for cue in cues:
+            writer.writerow(dict(cue, start=f"{cue['start']:.3f}", end=f"{cue['end']:.3f}"))
+    return path
+
+
+def assemble_timeline(items, output_path, gap_seconds=0.3, crossfade_seconds=0.0, stems_dir=None,
+                      cue_path=None, subtype="PCM_16", block_frames=DEFAULT_BLOCK_FRAMES):
+    """(경로, 화자, 라벨) 목록을 하나의 타임라인으로 조립
+
+    crossfade_seconds > 0 이면 간격 대신 앞뒤 줄을 그만큼 겹쳐 등전력 크로스페이드한다.
+    없는 파일은 건너뛴다. 반환: 줄별 큐 목록 (줄이 하나도 없으면 None)
+    """
+    items = ((path, speaker, label) for path, speaker, label in items if path and os.path.exists(path))
+    sr = None
+    timeline = None
+    stems = {}
+    cues = []
+    start = 0
+    fade_in = 0
+    ext = os.path.splitext(output_path)[1]
+
+    for (path, speaker, label), following in _peek(items):
+        with sf.SoundFile(path) as f:
+            if sr is None:
+                sr = f.samplerate
+                timeline = _OverlapWriter(sf.SoundFile(output_path, "w", sr, 1, subtype=subtype), block_frames)
+                gap = int(round(gap_seconds * sr))
+                crossfade = int(round(crossfade_seconds * sr))
+            elif f.samplerate != sr:
+                raise ValueError(f"샘플레이트가 다릅니다: {path} ({f.samplerate}Hz, 타임라인 {sr}Hz)")
+
+            length = f.frames
+            # 다음 줄과 겹칠 길이 (짧은 줄은 절반까지만)
+            fade_out = 0
+            if crossfade and following is not None:
+                fade_out = min(crossfade, length // 2, _line_frames(following[0]) // 2)
+
+            stem = None
+            if stems_dir and speaker:
+                if speaker not in stems:
+                    os.makedirs(stems_dir, exist_ok=True)
+                    stem_file = sf.SoundFile(os.path.join(stems_dir, f"{speaker}{ext}"), "w", sr, 1,
+                                             subtype=subtype)
+                    stems[speaker] = _OverlapWriter(stem_file, block_frames)
+                stem = stems[speaker]
+
+            offset = 0
+            for block in f.blocks(blocksize=block_frames, dtype="float32", always_2d=True):
+                block = block.mean(axis=1)
+                gains = _fade_gains(offset, len(block), length, fade_in, fade_out)
+                if gains is not None:
+                    block = block * gains
+                for track in (timeline, stem):
+                    if track is not None:
+                        track.add(start + offset, block)
+                        # 다음 줄은 빨라야 (이 줄 끝 - 겹침) 에서 시작하므로 그 앞은 확정
+                        track.flush(start + offset + len(block) - crossfade)
+                offset += len(block)
+
+        cues.append({"index": len(cues) + 1, "speaker": speaker, "label": label,
+                     "start": start / sr, "end": (start + length) / sr, "file": path})
+        if fade_out:
+            start += length - fade_out
+        else:
+            start += length + gap
+        fade_in = fade_out
+
+    if timeline is None:
+        return None
+    end = max(timeline.pos + len(timeline.buf), 0)
+    timeline.close()
+    for stem in stems.values():
+        stem.close(end)
+    if cue_path:
+        write_cue_sheet(cues, cue_path, os.path.basename(output_path))
+    return cues
+
+
+def main():
+    parser = argparse.ArgumentParser(description="줄별 음성 파일을 하나의 타임라인으로 조립")
+    parser.add_argument("input_dir", nargs="?", default="character_dialogue_output",
+                        help="NN_화자_감정.wav 파일이 있는 폴더")
+    parser.add_argument("--output", help="타임라인 파일 (.wav / .flac, 기본: <폴더>/timeline.wav)")
+    parser.add_argument("--gap", type=float, default=0.3, help="줄 사이 무음 (초, fragment_interval)")
+    parser.add_argument("--crossfade", type=float, default=0.0, help="줄 사이 크로스페이드 (초)")
+    parser.add_argument("--stems", action="store_true", help="화자별 스템 트랙 생성")
+    parser.add_argument("--cue", help="큐 시트 경로 (.cue 또는 .csv, 기본: <타임라인>.csv)")
+    parser.add_argument("--block-frames", type=int, default=DEFAULT_BLOCK_FRAMES)
+    args = parser.parse_args()
+
+    output = args.output or os.path.join(args.input_dir, "timeline.wav")
+    base = os.path.splitext(output)[0]
+    items = items_from_dir(args.input_dir)
+    print("🎞️ 대화 타임라인 조립 🎞️\n")
+    print(f"📁 {args.input_dir}: {len(items)}줄")
+
+    cues = assemble_timeline(items, output, args.gap, args.crossfade,
+                             stems_dir=base + "_stems" if args.stems else None,
+                             cue_path=args.cue or base + ".csv", block_frames=args.block_frames)
+    if not cues:
+        print("❌ 조립할 줄별 파일이 없습니다.")
+        return
+
+    print(f"✅ 타임라인: {output} ({cues[-1]['end']:.1f}초)")
+    if args.stems:
+        print(f"🎚️ 화자별 스템: {base}_stems/ ({len({c['speaker'] for c in cues})}명)")
+    print(f"📋 큐 시트: {args.cue or base + '.csv'}")
+    print(f"\n🎵 재생:\n   afplay {output}")
+
+
+if __name__ == "__main__":
+    main()
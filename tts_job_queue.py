@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+우선순위 / 마감 시간 기반 TTS 작업 큐 - 대화형 미리듣기와 배치 렌더링이 하나의 백엔드를 공유
+"""
+
+import argparse
+import heapq
+import itertools
+import threading
+import time
+
+import numpy as np
+
+from tts_pipeline import split_cut5
+
+# 숫자가 작을수록 먼저 실행
+PRIORITY_CLASSES = {"interactive": 0, "batch": 1}
+
+# 클래스별 대기 작업 수 상한 (승인 제어)
+DEFAULT_MAX_DEPTH = {"interactive": 32, "batch": 100000}
+
+
+class AdmissionRejected(Exception):
+    """큐가 가득 찼거나 마감 시간을 지킬 수 없어 작업을 받지 않음"""
+
+
+class DeadlineExceeded(Exception):
+    """실행 전에 마감 시간이 지남"""
+
+
+class Job:
+    """조각(문장) 단위로 나눠 실행되는 합성 작업"""
+
+    def __init__(self, job_id, priority, fragments, deadline=None):
+        self.id = job_id
+        self.priority = priority
+        self.fragments = fragments
+        self.deadline = deadline          # time.monotonic() 기준 절대 시각
+        self.submitted = time.monotonic()
+        self.started = None
+        self.finished = None
+        self.next_fragment = 0
+        self.results = [None] * len(fragments)
+        self.error = None
+        self.done = threading.Event()
+
+    def wait(self, timeout=None):
+        """완료까지 대기 후 조각별 결과 반환"""
+        if not self.done.wait(timeout):
+            raise TimeoutError(f"작업 {self.id} 대기 시간 초과")
+        if self.error is not None:
+            raise self.error
+        return self.results
+
+
+class ClassMetrics:
+    """우선순위 클래스 하나의 통계"""
+
+    def __init__(self):
+        self.depth = 0
+        self.submitted = 0
+        self.completed = 0
+        self.rejected = 0
+        self.expired = 0
+        self.waits = []
+
+    def summary(self):
+        waits = np.array(self.waits) if self.waits else np.zeros(1)
+        return {
+            "depth": self.depth,
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "expired": self.expired,
+            "wait_mean": float(waits.mean()),
+            "wait_p95": float(np.percentile(waits, 95)),
+            "wait_max": float(waits.max()),
+        }
+
+
+class JobQueue:
+    """우선순위 클래스 -> 마감 시간(EDF) 순으로 조각을 하나씩 실행하는 큐
+
+    워커는 조각 하나를 끝낼 때마다 큐를 다시 보므로, 새로 들어온 대화형 작업이
+    진행 중인 배치 작업보다 먼저 실행되고 배치 작업은 남는 시간을 채운다.
+    """
+
+    def __init__(self, synthesize, workers=2, max_depth=None, fragment_seconds=1.0):
+        self.synthesize = synthesize
+        self.max_depth = dict(DEFAULT_MAX_DEPTH, **(max_depth or {}))
+        self.fragment_seconds = fragment_seconds   # 조각당 예상 시간 (실측으로 갱신)
+        self.heap = []
+        self.seq = itertools.count()
+        self.ids = itertools.count(1)
+        self.cond = threading.Condition()
+        self.metrics = {name: ClassMetrics() for name in PRIORITY_CLASSES}
+        self.running = True
+        self.workers = [threading.Thread(target=self._worker, daemon=True) for _ in range(workers)]
+        for t in self.workers:
+            t.start()
+
+    def _push(self, job):
+        deadline = job.deadline if job.deadline is not None else float("inf")
+        heapq.heappush(self.heap, (PRIORITY_CLASSES[job.priority], deadline, next(self.seq), job))
+
+    def _estimated_wait(self, priority):
+        """이 클래스 이상 우선순위의 남은 조각을 모두 처리하는 데 걸릴 예상 시간 (잠금 안에서 호출)"""
+        rank = PRIORITY_CLASSES[priority]
+        pending = sum(len(job.fragments) - job.next_fragment
+                      for r, _, _, job in self.heap if r <= rank)
+        return pending * self.fragment_seconds / len(self.workers)
+
+    def submit(self, fragments, priority="batch", deadline_seconds=None):
+        """작업 등록. 큐가 가득 찼거나 마감 시간 안에 끝낼 수 없으면 AdmissionRejected"""
+        if priority not in PRIORITY_CLASSES:
+            raise ValueError(f"알 수 없는 우선순위: {priority}")
+
+        with self.cond:
+            metrics = self.metrics[priority]
+            if metrics.depth >= self.max_depth[priority]:
+                metrics.rejected += 1
+                raise AdmissionRejected(f"{priority} 큐가 가득 찼습니다 ({metrics.depth}개)")
+
+            deadline = None
+            if deadline_seconds is not None:
+                expected = self._estimated_wait(priority) + len(fragments) * self.fragment_seconds
+                if expected > deadline_seconds:
+                    metrics.rejected += 1
+                    raise AdmissionRejected(f"예상 {expected:.2f}초 > 마감 {deadline_seconds:.2f}초")
+                deadline = time.monotonic() + deadline_seconds
+
+            job = Job(next(self.ids), priority, list(fragments), deadline)
+            metrics.submitted += 1
+            metrics.depth += 1
+            self._push(job)
+            self.cond.notify()
+        return job
+
+    def submit_text(self, text, payload=None, priority="batch", deadline_seconds=None):
+        """텍스트를 문장 조각으로 나눠 등록 (조각마다 payload 를 복사해 text 만 바꿈)"""
+        fragments = [dict(payload or {}, text=fragment) for fragment in split_cut5(text) or [text]]
+        return self.submit(fragments, priority, deadline_seconds)
+
+    def _finish(self, job, error=None):
+        """작업 종료 처리 (잠금 안에서 호출)"""
+        job.error = error
+        job.finished = time.monotonic()
+        metrics = self.metrics[job.priority]
+        metrics.depth -= 1
+        if isinstance(error, DeadlineExceeded):
+            metrics.expired += 1
+        elif error is None:
+            metrics.completed += 1
+        job.done.set()
+
+    def _worker(self):
+        while True:
+            with self.cond:
+                while self.running and not self.heap:
+                    self.cond.wait()
+                if not self.running and not self.heap:
+                    return
+                _, _, _, job = heapq.heappop(self.heap)
+
+                now = time.monotonic()
+                if job.deadline is not None and now > job.deadline:
+                    self._finish(job, DeadlineExceeded(f"작업 {job.id} 마감 시간 초과"))
+                    continue
+                if job.started is None:
+                    job.started = now
+                    self.metrics[job.priority].waits.append(now - job.submitted)
+                index = job.next_fragment
+                job.next_fragment += 1
+
+            start = time.perf_counter()
+            try:
+                result = self.synthesize(job.fragments[index])
+                error = None
+            except Exception as e:
+                result, error = None, e
+            elapsed = time.perf_counter() - start
+
+            with self.cond:
+                self.fragment_seconds = 0.8 * self.fragment_seconds + 0.2 * elapsed
+                job.results[index] = result
+                if error is not None:
+                    self._finish(job, error)
+                elif job.next_fragment < len(job.fragments):
+                    # 남은 조각은 다시 큐로: 그 사이 들어온 상위 우선순위 작업이 먼저 실행됨
+                    self._push(job)
+                    self.cond.notify()
+                else:
+                    self._finish(job)
+
+    def snapshot(self):
+        """클래스별 대기 깊이 / 대기 시간 통계"""
+        with self.cond:
+            return {name: m.summary() for name, m in self.metrics.items()}
+
+    def close(self, wait=True):
+        """남은 작업을 마친 뒤 워커 종료"""
+        with self.cond:
+            self.running = False
+            self.cond.notify_all()
+        if wait:
+            for t in self.workers:
+                t.join()
+
+
+def print_metrics(queue):
+    """클래스별 지표 출력"""
+    for name, m in queue.snapshot().items():
+        print(f"   [{name}] 대기 {m['depth']}개, 완료 {m['completed']}/{m['submitted']}, "
+              f"거부 {m['rejected']}, 만료 {m['expired']}, "
+              f"대기시간 평균 {m['wait_mean'] * 1000:.0f}ms / p95 {m['wait_p95'] * 1000:.0f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="우선순위 작업 큐 데모 (스텁 서버)")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--previews", type=int, default=6, help="중간에 넣을 대화형 미리듣기 수")
+    args = parser.parse_args()
+
+    from simple_tts_request import DIALOGUE, build_tts_data
+    from tts_stub_server import start_stub_server
+    from tts_traffic import post_tts
+
+    server, url = start_stub_server(latency="uniform:0.05,0.15")
+
+    def synthesize(payload):
+        response = post_tts(f"{url}/tts", payload, timeout=30)
+        response.raise_for_status()
+        return response.content
+
+    print("📬 우선순위 작업 큐 데모 📬\n")
+    queue = JobQueue(synthesize, workers=args.workers, fragment_seconds=0.1)
+
+    batch_jobs = [queue.submit_text(text, build_tts_data(text), "batch") for _, text, _ in DIALOGUE]
+    print(f"📦 배치 작업 {len(batch_jobs)}개 등록")
+
+    previews = []
+    for i in range(args.previews):
+        time.sleep(0.3)
+        try:
+            text = "이 문장, 미리 들어볼게요."
+            previews.append(queue.submit_text(text, build_tts_data(text), "interactive", deadline_seconds=2.0))
+        except AdmissionRejected as e:
+            print(f"   ⛔ 미리듣기 거부: {e}")
+
+    for job in previews + batch_jobs:
+        try:
+            job.wait()
+        except Exception as e:
+            print(f"   ❌ 작업 {job.id}: {e}")
+
+    print("\n📊 클래스별 지표:")
+    print_metrics(queue)
+    queue.close()
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
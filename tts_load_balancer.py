@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+여러 TTS 서버에 대한 클라이언트 측 부하 분산 - 최소 진행 요청 수 + 장애 엔드포인트 격리
+"""
+
+import threading
+import time
+from urllib.parse import urlparse
+
+import requests
+
+from tts_traffic import post_tts
+
+
+class NoHealthyEndpoint(Exception):
+    """사용 가능한 엔드포인트가 없음"""
+
+
+class EndpointState:
+    """엔드포인트 하나의 상태"""
+
+    def __init__(self, url):
+        self.url = url
+        self.outstanding = 0
+        self.failures = 0          # 연속 실패 수
+        self.ejected_until = 0.0   # 이 시각까지 격리
+        self.healthy = False
+        self.requests = 0
+        self.errors = 0
+        self.latency = None        # 지수 이동 평균 (초)
+
+    @property
+    def base_url(self):
+        """상태 확인용 서버 루트 URL"""
+        parsed = urlparse(self.url)
+        return f"{parsed.scheme}://{parsed.netloc}"
+
+
+def dedupe_endpoints(endpoints, path="/tts"):
+    """같은 스키마(path)의 엔드포인트만 남기고 localhost / 127.0.0.1 중복 제거"""
+    seen, result = set(), []
+    for url in endpoints:
+        parsed = urlparse(url)
+        if (parsed.path or "/") != path:
+            continue
+        host = "127.0.0.1" if parsed.hostname == "localhost" else parsed.hostname
+        key = (host, parsed.port)
+        if key not in seen:
+            seen.add(key)
+            result.append(url)
+    return result
+
+
+class EndpointBalancer:
+    """진행 중 요청이 가장 적은 엔드포인트로 보내고 실패한 엔드포인트는 잠시 제외"""
+
+    def __init__(self, endpoints, max_failures=2, eject_seconds=10.0, probe_timeout=2.0):
+        self.states = [EndpointState(url) for url in endpoints]
+        self.max_failures = max_failures
+        self.eject_seconds = eject_seconds
+        self.probe_timeout = probe_timeout
+        self.lock = threading.Condition()
+
+    def probe(self, state):
+        """서버가 응답하는지 확인 (상태 코드와 무관하게 HTTP 응답이 오면 살아있음)"""
+        try:
+            requests.get(state.base_url, timeout=self.probe_timeout)
+            alive = True
+        except requests.exceptions.RequestException:
+            alive = False
+        with self.lock:
+            state.healthy = alive
+            if alive:
+                state.failures = 0
+                state.ejected_until = 0.0
+                self.lock.notify_all()
+            else:
+                state.ejected_until = time.monotonic() + self.eject_seconds
+        return alive
+
+    def probe_all(self):
+        """모든 엔드포인트 상태 확인 후 살아있는 URL 목록 반환"""
+        threads = [threading.Thread(target=self.probe, args=(s,)) for s in self.states]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        return [s.url for s in self.states if s.healthy]
+
+    def _readmit_due(self):
+        """격리 시간이 지난 엔드포인트를 백그라운드에서 다시 확인 (요청 경로는 확인을 기다리지 않음)"""
+        now = time.monotonic()
+        with self.lock:
+            due = [s for s in self.states if not s.healthy and s.ejected_until <= now]
+            for s in due:
+                # 동시에 여러 스레드가 같은 엔드포인트를 확인하지 않도록 미리 미룸
+                s.ejected_until = now + self.eject_seconds
+        for s in due:
+            threading.Thread(target=self._readmit, args=(s,), daemon=True).start()
+
+    def _readmit(self, state):
+        if self.probe(state):
+            print(f"    🔄 엔드포인트 복구: {state.url}")
+
+    def _candidates(self, exclude=()):
+        """살아있는 엔드포인트 중 exclude 에 없는 것 (모두 제외되면 살아있는 전체)"""
+        healthy = [s for s in self.states if s.healthy]
+        return [s for s in healthy if s.url not in exclude] or healthy
+
+    def _pick(self, key=None, exclude=()):
+        """살아있는 엔드포인트 중 하나 선택 (잠금 안에서 호출, key 는 하위 클래스용)"""
+        healthy = self._candidates(exclude)
+        if not healthy:
+            return None
+        # 진행 중 요청 수가 같으면 평균 지연이 짧은 쪽
+        return min(healthy, key=lambda s: (s.outstanding, s.latency or 0.0))
+
+    def acquire(self, key=None, timeout=30.0, exclude=()):
+        """보낼 엔드포인트를 골라 진행 중 요청 수를 올림 (exclude 의 URL 은 다른 곳이 없을 때만)"""
+        deadline = time.monotonic() + timeout
+        while True:
+            self._readmit_due()
+            with self.lock:
+                state = self._pick(key, exclude)
+                if state is not None:
+                    state.outstanding += 1
+                    state.requests += 1
+                    return state
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise NoHealthyEndpoint("사용 가능한 TTS 엔드포인트가 없습니다")
+                self.lock.wait(min(remaining, 1.0))
+
+    def release(self, state, ok, latency=None):
+        """요청 완료 처리: 실패가 이어지면 격리"""
+        with self.lock:
+            state.outstanding -= 1
+            if ok:
+                state.failures = 0
+                if latency is not None:
+                    state.latency = latency if state.latency is None else 0.8 * state.latency + 0.2 * latency
+            else:
+                state.errors += 1
+                state.failures += 1
+                if state.failures >= self.max_failures and state.healthy:
+                    state.healthy = False
+                    state.ejected_until = time.monotonic() + self.eject_seconds
+                    print(f"    🚫 엔드포인트 격리: {state.url} ({self.eject_seconds:.0f}초)")
+            self.lock.notify_all()
+
+    def post(self, payload, timeout=20, retries=2, key=None):
+        """엔드포인트를 골라 요청, 연결 오류나 5xx 면 아직 시도하지 않은 엔드포인트로 재시도"""
+        last_error = None
+        tried = set()
+        for _ in range(retries + 1):
+            state = self.acquire(key, exclude=tried)
+            tried.add(state.url)
+            start = time.perf_counter()
+            try:
+                response = post_tts(state.url, payload, timeout=timeout)
+            except requests.exceptions.RequestException as e:
+                self.release(state, ok=False)
+                last_error = e
+                continue
+
+            # 4xx 는 요청 자체의 문제이므로 엔드포인트 실패로 보지 않음
+            ok = response.status_code < 500
+            self.release(state, ok=ok, latency=time.perf_counter() - start)
+            if ok:
+                return response, state.url
+            last_error = RuntimeError(f"{state.url} 상태 {response.status_code}")
+        raise last_error
+
+    def snapshot(self):
+        """엔드포인트별 상태 요약"""
+        with self.lock:
+            return [{"url": s.url, "healthy": s.healthy, "outstanding": s.outstanding,
+                     "requests": s.requests, "errors": s.errors, "latency": s.latency}
+                    for s in self.states]
+
+
+def print_snapshot(balancer):
+    """엔드포인트별 분산 결과 출력"""
+    for s in balancer.snapshot():
+        mark = "✅" if s["healthy"] else "❌"
+        latency = f"{s['latency'] * 1000:.0f}ms" if s["latency"] else "-"
+        print(f"   {mark} {s['url']}: 요청 {s['requests']}개, 오류 {s['errors']}개, 평균 지연 {latency}")
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+T2S / VITS 단계 파이프라이닝 - 문장 조각 단위 생산자/소비자 추론
+"""
+
+import queue
+import threading
+import time
+
+import numpy as np
+
+# cut5 분할에 사용하는 구두점 (TTS_infer_pack text_segmentation_method.cut5 와 동일)
+CUT5_PUNCTUATION = {",", ".", ";", "?", "!", "、", "，", "。", "？", "！", ";", "：", "…"}
+
+# 스레드 종료 신호
+_END = object()
+
+
+class _StageError:
+    """단계 스레드에서 발생한 예외 전달용"""
+
+    def __init__(self, error):
+        self.error = error
+
+
+def split_cut5(text):
+    """cut5 방식 문장 분할 (구두점마다 자르고 소수점은 유지)"""
+    text = text.strip("\n")
+    fragments = []
+    items = []
+    for i, char in enumerate(text):
+        items.append(char)
+        if char not in CUT5_PUNCTUATION:
+            continue
+        # 3.14 같은 소수점은 자르지 않음
+        if char == "." and 0 < i < len(text) - 1 and text[i - 1].isdigit() and text[i + 1].isdigit():
+            continue
+        fragments.append("".join(items))
+        items = []
+    if items:
+        fragments.append("".join(items))
+
+    # 구두점만 남은 조각과 공백 조각 제거
+    return [f.strip() for f in fragments if f.strip() and not set(f.strip()).issubset(CUT5_PUNCTUATION)]
+
+
+def _put(q, item, stop_event):
+    """중단 신호를 확인하면서 bounded queue 에 넣기"""
+    while not stop_event.is_set():
+        try:
+            q.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _stage_worker(stage_fn, in_q, out_q, stop_event):
+    """입력 큐에서 꺼내 stage_fn 을 적용하고 출력 큐로 전달"""
+    while not stop_event.is_set():
+        try:
+            item = in_q.get(timeout=0.1)
+        except queue.Empty:
+            continue
+
+        if item is _END or isinstance(item, _StageError):
+            _put(out_q, item, stop_event)
+            return
+
+        index, fragment, value = item
+        try:
+            result = stage_fn(fragment, value)
+        except Exception as e:
+            _put(out_q, _StageError(e), stop_event)
+            return
+        if not _put(out_q, (index, fragment, result), stop_event):
+            return
+
+
+def run_pipelined(fragments, t2s_stage, vits_stage, queue_size=2):
+    """조각 n+1 의 T2S 디코딩과 조각 n 의 VITS 합성을 겹쳐 실행
+
+    t2s_stage(fragment, None) -> semantic, vits_stage(fragment, semantic) -> audio.
+    (index, fragment, audio) 를 원래 순서대로 yield 한다.
+    """
+    stop_event = threading.Event()
+    source_q = queue.Queue(maxsize=queue_size)
+    semantic_q = queue.Queue(maxsize=queue_size)
+    audio_q = queue.Queue(maxsize=queue_size)
+
+    def feed():
+        # fragments 가 제너레이터면 여기서 예외가 날 수 있으므로 다른 단계처럼 큐로 전달
+        try:
+            for index, fragment in enumerate(fragments):
+                if not _put(source_q, (index, fragment, None), stop_event):
+                    return
+        except Exception as e:
+            _put(source_q, _StageError(e), stop_event)
+            return
+        _put(source_q, _END, stop_event)
+
+    threads = [
+        threading.Thread(target=feed, daemon=True),
+        threading.Thread(target=_stage_worker, args=(t2s_stage, source_q, semantic_q, stop_event), daemon=True),
+        threading.Thread(target=_stage_worker, args=(vits_stage, semantic_q, audio_q, stop_event), daemon=True),
+    ]
+    for t in threads:
+        t.start()
+
+    try:
+        while True:
+            item = audio_q.get()
+            if item is _END:
+                break
+            if isinstance(item, _StageError):
+                raise item.error
+            yield item
+    finally:
+        # 소비자가 중간에 멈춰도 단계 스레드가 남지 않도록 정리
+        stop_event.set()
+        for t in threads:
+            t.join(timeout=1.0)
+
+
+def run_serial(fragments, t2s_stage, vits_stage):
+    """기존 방식: 조각마다 T2S -> VITS 를 순서대로 실행"""
+    for index, fragment in enumerate(fragments):
+        semantic = t2s_stage(fragment, None)
+        yield index, fragment, vits_stage(fragment, semantic)
+
+
+def inference_pipelined(text, t2s_stage, vits_stage, sample_rate,
+                        return_fragment=True, fragment_interval=0.3, queue_size=2):
+    """TTS.inference 와 같은 형태로 (sr, audio) 를 반환하는 파이프라인 추론
+
+    return_fragment=True 이면 조각별로 순서대로 yield, 아니면 전체를 이어붙여 한 번 yield.
+    """
+    fragments = split_cut5(text)
+    results = run_pipelined(fragments, t2s_stage, vits_stage, queue_size=queue_size)
+
+    if return_fragment:
+        for _, _, audio in results:
+            yield sample_rate, audio
+        return
+
+    gap = np.zeros(int(sample_rate * fragment_interval), dtype=np.float32)
+    pieces = []
+    for _, _, audio in results:
+        pieces.append(np.asarray(audio, dtype=np.float32))
+        pieces.append(gap)
+    yield sample_rate, np.concatenate(pieces) if pieces else np.zeros(0, dtype=np.float32)
+
+
+def _make_synthetic_stages(t2s_seconds, vits_seconds, sample_rate):
+    """모델 없이 단계 지연만 흉내내는 합성 단계"""
+
+    def t2s_stage(fragment, _):
+        time.sleep(t2s_seconds)
+        return len(fragment)
+
+    def vits_stage(fragment, semantic):
+        time.sleep(vits_seconds)
+        return np.zeros(int(sample_rate * 0.05 * semantic), dtype=np.float32)
+
+    return t2s_stage, vits_stage
+
+
+def main():
+    print("🎭 T2S / VITS 파이프라이닝 벤치마크 🎭\n")
+
+    text = ("북극해로 가시면 닭다리 튀김 소보로를 드실 수 있고, 남극해로 가시면 연유 듬뿍 얼음빙수를 드실 수 있습니다. "
+            "성심당 북극해점으로 가느냐, 설빙 남극해점으로 가느냐, 그것이 문제로다.")
+    fragments = split_cut5(text)
+    print(f"📝 조각 수: {len(fragments)}")
+    for i, fragment in enumerate(fragments, 1):
+        print(f"   {i}. {fragment}")
+
+    t2s_stage, vits_stage = _make_synthetic_stages(0.05, 0.04, 32000)
+
+    start = time.perf_counter()
+    serial = [audio for _, _, audio in run_serial(fragments, t2s_stage, vits_stage)]
+    serial_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    pipelined = [audio for _, _, audio in run_pipelined(fragments, t2s_stage, vits_stage)]
+    pipelined_time = time.perf_counter() - start
+
+    same = len(serial) == len(pipelined) and all(np.array_equal(a, b) for a, b in zip(serial, pipelined))
+
+    print(f"\n⏱️ 순차 실행: {serial_time:.3f}초")
+    print(f"⏱️ 파이프라인: {pipelined_time:.3f}초 ({serial_time / pipelined_time:.2f}x)")
+    print(f"✅ 출력 순서/내용 일치: {same}")
+
+
+if __name__ == "__main__":
+    main()
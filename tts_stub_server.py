@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+로컬 스텁 TTS 서버 - api.py (레거시) / api_v2.py 스키마를 모델 없이 흉내내는 부하 테스트용 서버
+"""
+
+import argparse
+import io
+import json
+import random
+import threading
+import time
+import wave
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+
+SAMPLE_RATE = 32000
+SECONDS_PER_CHAR = 0.12
+MIN_SECONDS = 0.5
+
+# 레거시 api.py 언어 값 (test_tdm_llj_script.generate_tts 의 lang_map 과 동일 + 코드 표기)
+LEGACY_LANGUAGES = {"中文", "英文", "日文", "韩文", "粤语", "中英混合", "日英混合", "多语种混合",
+                    "zh", "en", "ja", "ko", "yue", "auto"}
+V2_LANGUAGES = {"zh", "en", "ja", "ko", "yue", "auto", "auto_yue", "all_zh", "all_ja", "all_ko", "all_yue"}
+V2_MEDIA_TYPES = {"wav", "raw", "ogg", "aac"}
+
+
+def parse_latency(spec):
+    """지연 분포 문자열 파싱: fixed:0.5 / uniform:0.2,0.8 / lognormal:-1.0,0.5"""
+    kind, _, params = spec.partition(":")
+    values = [float(v) for v in params.split(",") if v]
+    if kind == "fixed" and len(values) == 1:
+        return lambda rng: values[0]
+    if kind == "uniform" and len(values) == 2:
+        return lambda rng: rng.uniform(values[0], values[1])
+    if kind == "lognormal" and len(values) == 2:
+        return lambda rng: rng.lognormvariate(values[0], values[1])
+    raise ValueError(f"지원하지 않는 지연 분포: {spec}")
+
+
+def synth_audio(text, sample_rate=SAMPLE_RATE):
+    """텍스트 길이에 비례하는 합성 음성 (int16 사인파 + 감쇠 포락선)"""
+    duration = max(MIN_SECONDS, len(text) * SECONDS_PER_CHAR)
+    t = np.arange(int(duration * sample_rate), dtype=np.float32) / sample_rate
+    # 같은 텍스트는 항상 같은 음높이
+    freq = 160.0 + (sum(map(ord, text)) % 120)
+    envelope = np.minimum(1.0, np.minimum(t, t[-1] - t) * 20.0)
+    return (0.3 * envelope * np.sin(2 * np.pi * freq * t) * 32767).astype(np.int16)
+
+
+def wav_bytes(audio, sample_rate=SAMPLE_RATE):
+    """int16 배열을 WAV 바이트로 변환"""
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(sample_rate)
+        f.writeframes(audio.tobytes())
+    return buffer.getvalue()
+
+
+def streaming_wav_header(sample_rate=SAMPLE_RATE):
+    """길이를 모르는 스트리밍용 WAV 헤더 (api_v2 와 같이 첫 청크로 전송)"""
+    return wav_bytes(np.zeros(0, dtype=np.int16), sample_rate)
+
+
+class TokenBucket:
+    """초당 요청 수 상한"""
+
+    def __init__(self, rate):
+        self.rate = rate
+        # 1 RPS 미만이어도 토큰 하나는 쌓일 수 있어야 요청이 통과함
+        self.capacity = max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class StubState:
+    """서버 설정과 통계"""
+
+    def __init__(self, latency="fixed:0.2", latency_per_char=0.0, error_rate=0.0,
+                 max_concurrency=0, max_rps=0.0, chunk_seconds=0.5, switch_penalty=0.0, seed=None):
+        self.latency = parse_latency(latency)
+        self.latency_per_char = latency_per_char
+        self.error_rate = error_rate
+        self.chunk_seconds = chunk_seconds
+        self.switch_penalty = switch_penalty
+        self.frontend = None  # 마지막으로 사용한 (언어, 참조 음성)
+        self.slots = threading.BoundedSemaphore(max_concurrency) if max_concurrency > 0 else None
+        self.bucket = TokenBucket(max_rps) if max_rps > 0 else None
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.stats = {"requests": 0, "errors": 0, "bytes": 0, "in_flight": 0, "max_in_flight": 0, "switches": 0}
+
+    def sample(self):
+        """지연 시간과 오류 여부 샘플링 (rng 는 스레드 간 공유)"""
+        with self.lock:
+            return max(0.0, self.latency(self.rng)), self.rng.random() < self.error_rate
+
+    def switch_cost(self, params):
+        """언어 / 참조 음성이 바뀌면 프론트엔드 (g2p, BERT, 참조 특징) 재준비 비용"""
+        lang = params.get("text_lang") or params.get("text_language")
+        ref = params.get("ref_audio_path") or params.get("refer_wav_path")
+        with self.lock:
+            switched = self.frontend is not None and self.frontend != (lang, ref)
+            self.frontend = (lang, ref)
+            if switched:
+                self.stats["switches"] += 1
+        return self.switch_penalty if switched else 0.0
+
+    def count(self, key, value=1):
+        with self.lock:
+            self.stats[key] += value
+            if key == "in_flight":
+                self.stats["max_in_flight"] = max(self.stats["max_in_flight"], self.stats["in_flight"])
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """레거시 / 와 v2 /tts 요청 처리"""
+
+    protocol_version = "HTTP/1.1"
+    state = None  # start_stub_server 에서 주입
+
+    def log_message(self, format, *args):
+        # 부하 테스트 중 콘솔 출력 억제
+        pass
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = {k: v[0] for k, v in parse_qs(url.query).items()}
+        if url.path == "/stats":
+            with self.state.lock:
+                return self._send_json(200, dict(self.state.stats))
+        self._dispatch(url.path, params)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            params = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            return self._send_json(400, {"message": "invalid json"})
+        self._dispatch(urlparse(self.path).path, params)
+
+    def _dispatch(self, path, params):
+        if path == "/tts":
+            error = self._validate_v2(params)
+        elif path == "/":
+            error = self._validate_legacy(params)
+        else:
+            return self._send_json(404, {"message": "not found"})
+
+        if error:
+            # api.py 와 같이 파라미터 오류는 400
+            return self._send_json(400, {"code": 400, "message": error})
+
+        state = self.state
+        if state.bucket:
+            state.bucket.acquire()
+        if state.slots:
+            state.slots.acquire()
+        state.count("in_flight")
+        try:
+            self._synthesize(path, params)
+        finally:
+            state.count("in_flight", -1)
+            if state.slots:
+                state.slots.release()
+
+    def _validate_legacy(self, params):
+        if not params.get("text"):
+            return "text is required"
+        for key in ("text_language", "prompt_language"):
+            if params.get(key) and params[key] not in LEGACY_LANGUAGES:
+                return f"{key}: {params[key]} is not supported"
+        return None
+
+    def _validate_v2(self, params):
+        if not params.get("text"):
+            return "text is required"
+        if not params.get("ref_audio_path"):
+            return "ref_audio_path is required"
+        for key in ("text_lang", "prompt_lang"):
+            if str(params.get(key, "")).lower() not in V2_LANGUAGES:
+                return f"{key}: {params.get(key)} is not supported"
+        if params.get("media_type", "wav") not in V2_MEDIA_TYPES:
+            return f"media_type: {params.get('media_type')} is not supported"
+        return None
+
+    def _synthesize(self, path, params):
+        state = self.state
+        state.count("requests")
+        latency, fail = state.sample()
+        text = str(params["text"])
+        time.sleep(latency + state.latency_per_char * len(text) + state.switch_cost(params))
+
+        if fail:
+            state.count("errors")
+            return self._send_json(500, {"message": "tts failed", "Exception": "stub injected error"})
+
+        audio = synth_audio(text)
+        if path == "/tts" and str(params.get("streaming_mode", False)).lower() in ("true", "1"):
+            return self._send_stream(audio, params.get("media_type", "wav"), latency)
+
+        body = audio.tobytes() if params.get("media_type") == "raw" else wav_bytes(audio)
+        state.count("bytes", len(body))
+        self.send_response(200)
+        self.send_header("Content-Type", f"audio/{params.get('media_type', 'wav')}")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_stream(self, audio, media_type, latency):
+        """chunked 전송: (wav 이면) 헤더 다음 chunk_seconds 단위 PCM"""
+        self.send_response(200)
+        self.send_header("Content-Type", f"audio/{media_type}")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        chunks = [streaming_wav_header()] if media_type == "wav" else []
+        step = max(1, int(self.state.chunk_seconds * SAMPLE_RATE))
+        chunks += [audio[i:i + step].tobytes() for i in range(0, len(audio), step)]
+        for i, chunk in enumerate(chunks):
+            if i > 1:
+                # 조각마다 합성 시간이 걸리는 것처럼 나눠서 전송
+                time.sleep(latency / max(1, len(chunks) - 1))
+            self.wfile.write(f"{len(chunk):X}\r\n".encode() + chunk + b"\r\n")
+            self.state.count("bytes", len(chunk))
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def start_stub_server(host="127.0.0.1", port=0, **options):
+    """백그라운드 스레드로 스텁 서버 시작 (port=0 이면 빈 포트) -> (server, url)"""
+    handler = type("BoundStubHandler", (StubHandler,), {"state": StubState(**options)})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="모델 없이 api.py / api_v2.py 를 흉내내는 스텁 TTS 서버")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9880)
+    parser.add_argument("--latency", default="fixed:0.2", help="fixed:S / uniform:A,B / lognormal:MU,SIGMA")
+    parser.add_argument("--latency-per-char", type=float, default=0.0, help="글자당 추가 지연 (초)")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--max-concurrency", type=int, default=0, help="동시 합성 수 상한 (0=무제한)")
+    parser.add_argument("--max-rps", type=float, default=0.0, help="초당 요청 수 상한 (0=무제한)")
+    parser.add_argument("--chunk-seconds", type=float, default=0.5, help="스트리밍 청크 길이")
+    parser.add_argument("--switch-penalty", type=float, default=0.0, help="언어 / 참조 음성 전환 시 추가 지연 (초)")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    server, url = start_stub_server(
+        args.host, args.port,
+        latency=args.latency, latency_per_char=args.latency_per_char, error_rate=args.error_rate,
+        max_concurrency=args.max_concurrency, max_rps=args.max_rps,
+        chunk_seconds=args.chunk_seconds, switch_penalty=args.switch_penalty, seed=args.seed,
+    )
+
+    print("🧪 스텁 TTS 서버 실행 중 🧪")
+    print(f"🔗 레거시: POST {url}/   |   v2: POST {url}/tts   |   통계: GET {url}/stats")
+    print(f"⏱️ 지연: {args.latency} (+{args.latency_per_char}s/글자), 오류율: {args.error_rate:.0%}")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.shutdown()
+        print("\n👋 종료")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+TTS 요청 기록 / 재생 도구 - JSONL 트레이스 기록과 속도 제어 재생
+"""
+
+import argparse
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse, urlunparse
+
+import numpy as np
+import requests
+
+# 이 환경 변수가 있으면 클라이언트의 모든 TTS 요청을 기록
+RECORD_ENV = "TTS_RECORD_PATH"
+DEFAULT_TRACE_PATH = "tts_traffic.jsonl"
+
+
+class TrafficRecorder:
+    """요청 하나당 한 줄씩 JSONL 로 기록 (스레드 안전)"""
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+
+    def record(self, url, payload, started, latency, status=None, response_bytes=0, error=None):
+        entry = {
+            "ts": started,
+            "url": url,
+            "path": urlparse(url).path or "/",
+            "payload": payload,
+            "status": status,
+            "latency": round(latency, 6),
+            "response_bytes": response_bytes,
+            "error": error,
+        }
+        line = json.dumps(entry, ensure_ascii=False)
+        with self.lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+
+
+_recorder = None
+_recorder_lock = threading.Lock()
+
+
+def get_recorder():
+    """TTS_RECORD_PATH 가 설정된 경우에만 전역 기록기 반환"""
+    global _recorder
+    path = os.environ.get(RECORD_ENV)
+    if not path:
+        return None
+    with _recorder_lock:
+        if _recorder is None or _recorder.path != path:
+            _recorder = TrafficRecorder(path)
+    return _recorder
+
+
+def post_tts(url, payload, timeout=None, recorder=None, **kwargs):
+    """requests.post 와 같지만 기록기가 있으면 요청/응답 정보를 남김
+
+    recorder 가 None 이면 TTS_RECORD_PATH 의 전역 기록기, False 면 기록하지 않음
+    """
+    if recorder is None:
+        recorder = get_recorder()
+    started = time.time()
+    start = time.perf_counter()
+    try:
+        response = requests.post(url, json=payload, timeout=timeout, **kwargs)
+    except Exception as e:
+        if recorder:
+            recorder.record(url, payload, started, time.perf_counter() - start, error=str(e))
+        raise
+    if recorder:
+        recorder.record(url, payload, started, time.perf_counter() - start,
+                        status=response.status_code, response_bytes=len(response.content))
+    return response
+
+
+def load_trace(path):
+    """JSONL 트레이스 읽기 (시작 시각 순)"""
+    entries = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                entries.append(json.loads(line))
+    return sorted(entries, key=lambda e: e["ts"])
+
+
+def retarget(url, target):
+    """기록된 URL 의 경로는 유지하고 호스트만 target 으로 교체"""
+    if not target:
+        return url
+    src, dst = urlparse(url), urlparse(target)
+    return urlunparse(src._replace(scheme=dst.scheme, netloc=dst.netloc))
+
+
+def build_schedule(entries, speed=1.0, rps=None):
+    """재생 시작부터 각 요청을 보낼 시각(초) 목록: 원래 간격 / speed 또는 고정 RPS"""
+    if rps:
+        return [i / rps for i in range(len(entries))]
+    if not entries:
+        return []
+    t0 = entries[0]["ts"]
+    return [(e["ts"] - t0) / speed for e in entries]
+
+
+def replay(entries, target=None, speed=1.0, rps=None, concurrency=32, timeout=60, recorder=None):
+    """트레이스를 open-loop 로 재생하고 요청별 결과 목록 반환
+
+    재생 요청은 recorder 로만 기록한다 (TTS_RECORD_PATH 가 설정돼 있어도 원본 트레이스에 다시 쓰지 않음).
+    동시에 진행 중인 요청은 concurrency 개로 제한되며, 서버가 느려 이 한도에 닿으면 이후 요청은
+    예정 시각보다 늦게 나가고 그 지연이 lag 로 집계된다. concurrency 가 0 이면 제한 없이
+    요청마다 스레드를 띄운다 (--rps 로 순수 open-loop 부하를 걸 때).
+    """
+    schedule = build_schedule(entries, speed, rps)
+    results = [None] * len(entries)
+
+    def send(index, scheduled, start_time):
+        entry = entries[index]
+        url = retarget(entry["url"], target)
+        lag = time.perf_counter() - start_time - scheduled
+        begin = time.perf_counter()
+        try:
+            response = post_tts(url, entry["payload"], timeout=timeout, recorder=recorder or False)
+            status, size, error = response.status_code, len(response.content), None
+        except Exception as e:
+            status, size, error = None, 0, str(e)
+        end = time.perf_counter()
+        results[index] = {"status": status, "latency": end - begin, "bytes": size,
+                          "error": error, "lag": lag, "finished": end - start_time}
+
+    def dispatch(submit):
+        start_time = time.perf_counter()
+        for index, scheduled in enumerate(schedule):
+            delay = start_time + scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            submit(send, index, scheduled, start_time)
+
+    if concurrency:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            dispatch(pool.submit)
+        return results
+
+    threads = []
+
+    def spawn(fn, *args):
+        thread = threading.Thread(target=fn, args=args, daemon=True)
+        thread.start()
+        threads.append(thread)
+
+    dispatch(spawn)
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def summarize(results):
+    """지연 백분위와 처리량 요약"""
+    ok = [r for r in results if r and r["status"] == 200]
+    latencies = np.array([r["latency"] for r in ok]) if ok else np.zeros(1)
+    duration = max((r["finished"] for r in results if r), default=0.0)
+    return {
+        "requests": len(results),
+        "ok": len(ok),
+        "errors": len(results) - len(ok),
+        "p50": float(np.percentile(latencies, 50)),
+        "p90": float(np.percentile(latencies, 90)),
+        "p99": float(np.percentile(latencies, 99)),
+        "max": float(latencies.max()),
+        "throughput": len(ok) / duration if duration > 0 else 0.0,
+        "bytes_per_sec": sum(r["bytes"] for r in ok) / duration if duration > 0 else 0.0,
+        "max_lag": max((r["lag"] for r in results if r), default=0.0),
+    }
+
+
+def print_summary(summary):
+    """요약 출력"""
+    print(f"📊 요청: {summary['requests']}개 (성공 {summary['ok']}, 실패 {summary['errors']})")
+    print(f"⏱️ 지연 p50 {summary['p50'] * 1000:.0f}ms / p90 {summary['p90'] * 1000:.0f}ms / "
+          f"p99 {summary['p99'] * 1000:.0f}ms / max {summary['max'] * 1000:.0f}ms")
+    print(f"🚀 처리량: {summary['throughput']:.2f} req/s ({summary['bytes_per_sec'] / 1024:.0f} KB/s)")
+    print(f"🕒 최대 발송 지연: {summary['max_lag'] * 1000:.0f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="기록된 TTS 트레이스를 속도 제어하여 재생")
+    parser.add_argument("trace", nargs="?", default=DEFAULT_TRACE_PATH)
+    parser.add_argument("--target", help="재생할 서버 (예: http://127.0.0.1:9880), 없으면 기록된 URL")
+    pacing = parser.add_mutually_exclusive_group()
+    pacing.add_argument("--speed", type=float, default=1.0, help="원래 간격 대비 배속 (2 = 2배 빠르게)")
+    pacing.add_argument("--rps", type=float, help="고정 초당 요청 수")
+    parser.add_argument("--concurrency", type=int, default=32,
+                        help="동시 요청 상한 (한도에 닿으면 발송이 밀려 최대 발송 지연에 나타남, 0 = 제한 없음)")
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--output", help="재생 결과도 JSONL 로 기록")
+    args = parser.parse_args()
+
+    entries = load_trace(args.trace)
+    if not entries:
+        print(f"❌ 트레이스가 비어 있습니다: {args.trace}")
+        return
+
+    pacing = f"{args.rps} RPS 고정" if args.rps else f"{args.speed}x"
+    print("🔁 TTS 트레이스 재생 🔁\n")
+    print(f"📄 {args.trace}: {len(entries)}개 요청, 재생 속도 {pacing}")
+    print(f"🔗 대상: {args.target or '기록된 URL'}\n")
+
+    recorder = TrafficRecorder(args.output) if args.output else None
+    results = replay(entries, args.target, args.speed, args.rps, args.concurrency, args.timeout, recorder)
+    print_summary(summarize(results))
+
+
+if __name__ == "__main__":
+    main()